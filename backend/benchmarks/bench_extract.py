@@ -0,0 +1,215 @@
+"""
+Extraction Benchmark
+Compares the lxml extraction layer against the previous BeautifulSoup parsers
+on saved page fixtures.
+
+Usage:
+    python -m backend.benchmarks.bench_extract                 # run on fixtures
+    python -m backend.benchmarks.bench_extract --save-fixtures # copy raw pages from the scrape cache first
+
+Fixtures are raw HTML files in backend/benchmarks/fixtures/ named after the
+page they came from (doj_news.html, ecourts_info.html, njdg_stats.html,
+case_<CNR>.html). When no fixtures are present, synthetic
+portal-sized pages are generated so the benchmark still runs.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from backend.utils import scrape_cache
+from backend.utils import web_scraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+NEW_PARSERS: Dict[str, Callable[[bytes], object]] = {
+    "doj_news": web_scraper._parse_doj_news,
+    "ecourts_info": web_scraper._parse_ecourts_info,
+    "case": web_scraper._parse_case_details,
+    "njdg_stats": web_scraper._parse_njdg_stats,
+}
+
+
+# ===============================
+# REFERENCE (BeautifulSoup) PARSERS
+# ===============================
+# Verbatim logic of the parsers this layer replaced, kept for comparison only
+
+def _legacy_clean_text(text: str) -> str:
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\w\s.,;:!?()-]', '', text)
+    return text.strip()
+
+
+def _legacy_doj_news(raw: bytes):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(raw.decode("utf-8", "replace"), 'html.parser')
+    news_items = []
+    for selector in ['.news-ticker', '.marquee', '.latest-news', '.announcements']:
+        for el in soup.select(selector):
+            text = _legacy_clean_text(el.get_text())
+            if len(text) > 20:
+                news_items.append(text)
+    if news_items:
+        return "Latest from DoJ:\n" + "\n- ".join(news_items[:5])
+    return None
+
+
+def _legacy_ecourts_info(raw: bytes):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(raw.decode("utf-8", "replace"), 'html.parser')
+    info_parts = []
+    for heading in soup.find_all(['h2', 'h3', 'h4']):
+        text = _legacy_clean_text(heading.get_text())
+        if any(keyword in text.lower() for keyword in ['service', 'case', 'filing', 'court']):
+            info_parts.append(text)
+    if info_parts:
+        return "eCourts Services:\n- " + "\n- ".join(info_parts[:5])
+    return None
+
+
+def _legacy_case(raw: bytes):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(raw.decode("utf-8", "replace"), 'html.parser')
+    case_info = {}
+    case_table = soup.find('table', {'id': 'caseDetails'})
+    if case_table:
+        for row in case_table.find_all('tr'):
+            cells = row.find_all('td')
+            if len(cells) >= 2:
+                key = _legacy_clean_text(cells[0].get_text())
+                case_info[key.lower().replace(' ', '_')] = _legacy_clean_text(cells[1].get_text())
+    return case_info or None
+
+
+def _legacy_njdg_stats(raw: bytes):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(raw.decode("utf-8", "replace"), 'html.parser')
+    stats = {}
+    for container in soup.find_all(['div', 'span'], class_=re.compile(r'stat|count|number')):
+        text = _legacy_clean_text(container.get_text())
+        if any(keyword in text.lower() for keyword in ['pending', 'disposed', 'total', 'civil', 'criminal']):
+            stats[text.split()[0].lower()] = text
+    pending_element = soup.find(string=re.compile(r'\d+[,\s]*\d*\s*(Cr|crore|lakh)', re.I))
+    if pending_element:
+        stats['total_pending_display'] = _legacy_clean_text(pending_element)
+    return stats or None
+
+
+LEGACY_PARSERS = {
+    "doj_news": _legacy_doj_news,
+    "ecourts_info": _legacy_ecourts_info,
+    "case": _legacy_case,
+    "njdg_stats": _legacy_njdg_stats,
+}
+
+
+# ===============================
+# FIXTURES
+# ===============================
+
+def _synthetic_page(kind: str, filler_blocks: int = 1500) -> bytes:
+    """Build a heavy, portal-like page with the markup each scraper looks for."""
+    blocks = [
+        f'<div class="row menu-item-{i}"><ul><li><a href="/page/{i}">Link {i} &amp; more</a></li>'
+        f'<li><span class="label">Item {i}</span></li></ul><p>Lorem ipsum dolor sit amet {i}.</p></div>'
+        for i in range(filler_blocks)
+    ]
+    half = filler_blocks // 2
+    targets = {
+        "doj_news": '<div class="latest-news"><ul>' + "".join(
+            f"<li>Notification {i}: Department of Justice announces scheme update number {i}</li>" for i in range(20)
+        ) + "</ul></div>",
+        "ecourts_info": "".join(
+            f"<h3>Court service {i}</h3><h4>Unrelated heading {i}</h4>" for i in range(20)
+        ),
+        "case": '<table id="caseDetails">' + "".join(
+            f"<tr><td>Field {i}</td><td>Value {i}</td></tr>" for i in range(12)
+        ) + "</table>",
+        "njdg_stats": "".join(
+            f'<div class="stat-box"><span class="count">{kind} {i}</span> Pending cases {i}</div>' for i in range(10)
+        ) + "<p>Total 4.5 Cr cases</p>",
+    }
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Portal</title>"
+        "<script>var x = 1;</script></head><body>"
+        + "".join(blocks[:half]) + targets[kind] + "".join(blocks[half:])
+        + "</body></html>"
+    ).encode("utf-8")
+
+
+def _kind_for(cache_key: str) -> str:
+    return "case" if cache_key.startswith("case_") else cache_key
+
+
+def save_fixtures_from_cache() -> int:
+    """Copy raw pages stored in the persistent scrape cache into the fixtures directory."""
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    saved = 0
+    for key, cache_key in [("doj_news", web_scraper.DOJ_NEWS_KEY), ("ecourts_info", web_scraper.ECOURTS_INFO_KEY),
+                           ("njdg_stats", "njdg_stats")]:
+        entry = scrape_cache.get_entry(cache_key)
+        if entry and entry["raw"]:
+            with open(os.path.join(FIXTURES_DIR, f"{key}.html"), "wb") as f:
+                f.write(entry["raw"])
+            saved += 1
+    return saved
+
+
+def load_fixtures() -> List[tuple]:
+    fixtures = []
+    if os.path.isdir(FIXTURES_DIR):
+        for name in sorted(os.listdir(FIXTURES_DIR)):
+            if name.endswith(".html"):
+                kind = _kind_for(name[:-len(".html")])
+                if kind in NEW_PARSERS:
+                    with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+                        fixtures.append((name, kind, f.read()))
+    if not fixtures:
+        fixtures = [(f"synthetic:{kind}", kind, _synthetic_page(kind)) for kind in NEW_PARSERS]
+    return fixtures
+
+
+# ===============================
+# BENCHMARK
+# ===============================
+
+def _time(fn, raw: bytes, repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(raw)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def run(repeat: int = 20):
+    try:
+        import bs4  # noqa: F401
+        has_bs4 = True
+    except ImportError:
+        has_bs4 = False
+        print("beautifulsoup4 not installed - reporting the lxml path only")
+
+    print(f"{'fixture':<28} {'size':>9} {'lxml ms':>9} {'bs4 ms':>9} {'speedup':>8}")
+    for name, kind, raw in load_fixtures():
+        new_ms = statistics.median(_time(NEW_PARSERS[kind], raw, repeat))
+        row = f"{name:<28} {len(raw) // 1024:>7}KB {new_ms:>9.2f}"
+        if has_bs4:
+            old_ms = statistics.median(_time(LEGACY_PARSERS[kind], raw, max(3, repeat // 4)))
+            row += f" {old_ms:>9.2f} {old_ms / new_ms:>7.1f}x"
+        print(row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save-fixtures", action="store_true", help="copy raw pages from the scrape cache into fixtures/")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.save_fixtures:
+        print(f"Saved {save_fixtures_from_cache()} fixture(s) to {FIXTURES_DIR}")
+    run(args.repeat)
@@ -0,0 +1,112 @@
+"""
+Lawyer Directory Benchmark
+Times filtered, paged lawyer queries on the indexed directory against the
+previous copy-and-scan lookup, on a synthetic panel directory.
+
+Usage:
+    python -m backend.benchmarks.bench_lawyers --lawyers 50000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from backend.utils.lawyer_directory import LawyerDirectory
+
+SPECIALIZATIONS = [
+    "Family Law", "Criminal Law", "Property & Land Disputes", "Labour Law", "Consumer Protection",
+    "Constitutional Law", "Cyber Law", "Motor Accident Claims", "Domestic Violence", "Revenue & Tenancy"
+]
+LANGUAGES = [
+    "Hindi", "English", "Bengali", "Marathi", "Telugu", "Tamil", "Gujarati", "Urdu",
+    "Kannada", "Odia", "Malayalam", "Punjabi", "Assamese", "Bhojpuri"
+]
+STATES = [
+    "Uttar Pradesh", "Maharashtra", "Bihar", "West Bengal", "Madhya Pradesh", "Tamil Nadu", "Rajasthan",
+    "Karnataka", "Gujarat", "Andhra Pradesh", "Odisha", "Telangana", "Kerala", "Jharkhand", "Assam",
+    "Punjab", "Chhattisgarh", "Haryana", "Delhi", "Jammu and Kashmir"
+]
+
+QUERIES: List[Dict] = [
+    {},
+    {"specialization": "family"},
+    {"specialization": "criminal", "language": "Hindi"},
+    {"language": "Tamil", "state": "Tamil Nadu", "available": True},
+    {"specialization": "land", "state": "Bihar", "page": 3},
+]
+
+
+def synthetic_lawyers(count: int, seed: int = 7) -> List[Dict]:
+    rng = random.Random(seed)
+    lawyers = []
+    for i in range(count):
+        available = rng.random() < 0.4
+        lawyers.append({
+            "id": f"LAW{i:06d}",
+            "name": f"Adv. Panel Lawyer {i}",
+            "specialization": rng.choice(SPECIALIZATIONS),
+            "languages": rng.sample(LANGUAGES, rng.randint(1, 3)),
+            "state": rng.choice(STATES),
+            "experience_years": rng.randint(1, 35),
+            "rating": round(rng.uniform(3.0, 5.0), 1),
+            "available": available,
+            "next_available": None if available else f"{rng.randint(1, 5)}:30 PM",
+            "profile_image": "👩‍⚖️"
+        })
+    return lawyers
+
+
+def legacy_search(lawyers: List[Dict], specialization=None, language=None, state=None,
+                  available=None, page=1, page_size=20) -> Dict:
+    """The previous lookup (copy, substring scan, randomised next_available), extended with the new filters."""
+    result = lawyers.copy()
+    if specialization:
+        result = [l for l in result if specialization.lower() in l["specialization"].lower()]
+    if language:
+        result = [l for l in result if language in l["languages"]]
+    if state:
+        result = [l for l in result if l["state"] == state]
+    for lawyer in result:
+        if not lawyer["available"]:
+            lawyer["next_available"] = f"{random.randint(1, 5)}:{random.choice(['00', '15', '30', '45'])} PM"
+    if available is not None:
+        result = [l for l in result if l["available"] == available]
+    result.sort(key=lambda l: -l["rating"])
+    start = (page - 1) * page_size
+    return {"total": len(result), "lawyers": result[start:start + page_size]}
+
+
+def _time(func: Callable, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def run(count: int, repeats: int):
+    lawyers = synthetic_lawyers(count)
+
+    start = time.perf_counter()
+    directory = LawyerDirectory(lawyers)
+    print(f"Indexed {count} lawyers in {(time.perf_counter() - start) * 1000:.0f} ms\n")
+
+    print("| Query | Matches | Scan (ms) | Indexed (ms) | Speedup |")
+    print("|---|---|---|---|---|")
+    for query in QUERIES:
+        matches = directory.search(**query)["total"]
+        legacy_ms = _time(lambda: legacy_search(lawyers, **query), repeats)
+        indexed_ms = _time(lambda: directory.search(**query), repeats)
+        label = ", ".join(f"{k}={v}" for k, v in query.items()) or "(none)"
+        print(f"| {label} | {matches} | {legacy_ms:.2f} | {indexed_ms:.3f} | {legacy_ms / indexed_ms:.0f}x |")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Tele-Law lawyer directory")
+    parser.add_argument("--lawyers", type=int, default=50000)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+    run(args.lawyers, args.repeats)
@@ -0,0 +1,142 @@
+"""
+Worker Scaling Benchmark
+Starts backend.server with increasing worker counts and reports memory per
+worker (RSS and PSS, which splits copy-on-write shared pages fairly) and
+request throughput.
+
+Usage (Linux, needs /proc):
+    python -m backend.benchmarks.bench_workers --workers 1 2 4 --duration 20
+
+The default load is POST /chat with Ollama stopped, which exercises intent
+detection, embedding and vector retrieval without waiting on generation.
+API rate limiting is turned off for the benchmarked server.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List
+
+PORT = 8765
+CHAT_BODY = json.dumps({"message": "How can I check my case status online?", "history": []})
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def _memory_kb(pid: int) -> Dict[str, int]:
+    """RSS and PSS of a process from /proc/<pid>/smaps_rollup."""
+    memory = {"rss": 0, "pss": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss"):
+                    memory[key.lower()] = int(value.split()[0])
+    except OSError:
+        pass
+    return memory
+
+
+def _wait_until_up(timeout: float = 300) -> bool:
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", PORT, timeout=2)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            time.sleep(0.5)
+    return False
+
+
+def _load(duration: float, concurrency: int, path: str) -> float:
+    """Drive keep-alive load from several threads; returns successful (200) requests per second."""
+    counts = [0] * concurrency
+    stop_at = time.monotonic() + duration
+
+    def client(i: int):
+        conn = http.client.HTTPConnection("127.0.0.1", PORT, timeout=30)
+        while time.monotonic() < stop_at:
+            try:
+                if path == "/chat":
+                    conn.request("POST", path, body=CHAT_BODY, headers={"Content-Type": "application/json"})
+                else:
+                    conn.request("GET", path)
+                response = conn.getresponse()
+                response.read()
+                if response.status == 200:
+                    counts[i] += 1
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", PORT, timeout=30)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts) / duration
+
+
+def run(worker_counts: List[int], duration: float, concurrency: int, path: str):
+    rows = []
+    for workers in worker_counts:
+        master = subprocess.Popen(
+            [sys.executable, "-m", "backend.server", "--workers", str(workers), "--port", str(PORT)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            # Measure the server's capacity, not the per-client API budgets
+            env={**os.environ, "NEETHI_RATE_LIMIT": "0"}
+        )
+        try:
+            if not _wait_until_up():
+                print(f"Server with {workers} worker(s) did not come up")
+                continue
+            time.sleep(2)  # let every worker finish warm-up
+            rps = _load(duration, concurrency, path)
+
+            worker_mem = [_memory_kb(pid) for pid in _children(master.pid)]
+            master_mem = _memory_kb(master.pid)
+            rows.append({
+                "workers": workers,
+                "rps": rps,
+                "master_rss_mb": master_mem["rss"] / 1024,
+                "worker_rss_mb": sum(m["rss"] for m in worker_mem) / max(len(worker_mem), 1) / 1024,
+                "worker_pss_mb": sum(m["pss"] for m in worker_mem) / max(len(worker_mem), 1) / 1024,
+                "total_pss_mb": (master_mem["pss"] + sum(m["pss"] for m in worker_mem)) / 1024
+            })
+        finally:
+            master.send_signal(signal.SIGTERM)
+            master.wait(timeout=60)
+
+    print(f"\nLoad: {path}, {concurrency} concurrent clients, {duration:.0f}s per run\n")
+    print("| Workers | Req/s | Master RSS (MB) | RSS / worker (MB) | PSS / worker (MB) | Total PSS (MB) |")
+    print("|---|---|---|---|---|---|")
+    for r in rows:
+        print(f"| {r['workers']} | {r['rps']:.1f} | {r['master_rss_mb']:.0f} | {r['worker_rss_mb']:.0f} "
+              f"| {r['worker_pss_mb']:.0f} | {r['total_pss_mb']:.0f} |")
+
+
+if __name__ == "__main__":
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        sys.exit("This benchmark needs Linux /proc (smaps_rollup).")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--path", default="/chat", help="/chat (POST) or any GET path, e.g. /health")
+    args = parser.parse_args()
+    run(args.workers, args.duration, args.concurrency, args.path)
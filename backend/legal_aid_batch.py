@@ -0,0 +1,282 @@
+"""
+Bulk NALSA Eligibility Screening
+Evaluates the legal aid rules in services.py over whole columns of applicants
+at once with numpy, for screening CSV / NDJSON exports of tens of thousands
+of rows.
+
+The rules match check_legal_aid_eligibility(): an applicant in a priority
+category (by an is_* flag or by the 'category' field, e.g. child or
+industrial_worker) is eligible regardless of income, anyone else when their
+income is within the general limit. Case types outside ELIGIBLE_CASE_TYPES
+are flagged but do not change eligibility.
+"""
+
+import codecs
+import csv
+import json
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from backend.services import ELIGIBLE_CASE_TYPES, NALSA_INCOME_LIMITS, PRIORITY_CATEGORIES
+
+# Boolean applicant columns and the priority category each one stands for,
+# in the order check_legal_aid_eligibility() reports them
+FLAG_COLUMNS = {
+    "is_woman": "woman",
+    "is_sc_st": "sc_st",
+    "is_senior_citizen": "senior_citizen",
+    "is_specially_abled": "specially_abled",
+    "is_in_custody": "custody",
+}
+
+# Result codes for the 'basis' of each row's decision
+BASIS_INVALID = -1
+BASIS_INCOME = 0
+BASIS_INCOME_EXCEEDS = 1
+BASIS_CATEGORY = 2
+BASIS_NAMES = ["income", "income_exceeds", "category"] + list(FLAG_COLUMNS.values())
+
+TRUE_VALUES = ["1", "true", "True", "TRUE", "yes", "Yes", "YES", "y", "Y", "t", "T"]
+
+# Rows evaluated per vectorised batch
+BATCH_ROWS = 50000
+
+
+def _to_float(values: Sequence) -> np.ndarray:
+    """Parse a column of numbers; unparseable entries become NaN."""
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        parsed = np.empty(len(values), dtype=np.float64)
+        for i, value in enumerate(values):
+            try:
+                parsed[i] = float(value)
+            except (TypeError, ValueError):
+                parsed[i] = np.nan
+        return parsed
+
+
+def _to_bool(values: Sequence) -> np.ndarray:
+    array = np.asarray(values)
+    if array.dtype == bool:
+        return array
+    if array.dtype.kind in "iuf":
+        return array != 0
+    return np.isin(array.astype(str), TRUE_VALUES)
+
+
+def _in_set(values: Sequence, allowed: set, normalize) -> np.ndarray:
+    """Membership of normalised values, computed once per distinct value."""
+    uniques, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    lookup = np.array([normalize(value) in allowed for value in uniques], dtype=bool)
+    return lookup[inverse.reshape(-1)]
+
+
+def _case_type_key(value: str) -> str:
+    return value.lower().replace(" ", "_")
+
+
+def _category_key(value: str) -> str:
+    return value.strip().lower()
+
+
+class EligibilityRules:
+    """The NALSA rules compiled into lookup sets and thresholds."""
+
+    def __init__(self, income_limit: float = NALSA_INCOME_LIMITS["general"],
+                 priority_categories: Iterable[str] = PRIORITY_CATEGORIES,
+                 case_types: Iterable[str] = ELIGIBLE_CASE_TYPES):
+        self.income_limit = income_limit
+        self.priority_categories = set(priority_categories)
+        self.case_types = set(case_types)
+        # Flags whose category is not a priority category do not grant eligibility
+        self.flags = [(column, category) for column, category in FLAG_COLUMNS.items()
+                      if category in self.priority_categories]
+
+    def evaluate(self, columns: Dict[str, Sequence]) -> Dict[str, np.ndarray]:
+        """
+        Evaluate a batch of applicants given as columns.
+
+        Returns dict of arrays: 'eligible', 'basis' (codes, see BASIS_NAMES)
+        and 'case_type_covered'. Rows with a missing or invalid income get
+        basis BASIS_INVALID and are not eligible.
+        """
+        income = _to_float(columns["annual_income"])
+        rows = income.size
+        valid = ~np.isnan(income)
+
+        # Later conditions take precedence, so apply them from least to most specific
+        basis = np.where(income <= self.income_limit, BASIS_INCOME, BASIS_INCOME_EXCEEDS)
+        if "category" in columns:
+            in_category = _in_set(columns["category"], self.priority_categories, _category_key)
+            basis = np.where(in_category, BASIS_CATEGORY, basis)
+        for column, category in reversed(self.flags):
+            if column in columns:
+                basis = np.where(_to_bool(columns[column]), BASIS_NAMES.index(category), basis)
+        basis = np.where(valid, basis, BASIS_INVALID)
+
+        if "case_type" in columns:
+            covered = _in_set(columns["case_type"], self.case_types, _case_type_key)
+        else:
+            covered = np.zeros(rows, dtype=bool)
+
+        return {"eligible": valid & (basis != BASIS_INCOME_EXCEEDS), "basis": basis, "case_type_covered": covered}
+
+
+RULES = EligibilityRules()
+
+
+# ===============================
+# STREAMED INPUT
+# ===============================
+
+class LineSplitter:
+    """Turns a stream of byte chunks into complete text lines."""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._tail = ""
+
+    def feed(self, chunk: bytes) -> List[str]:
+        text = self._tail + self._decoder.decode(chunk)
+        lines = text.split("\n")
+        self._tail = lines.pop()
+        return lines
+
+    def close(self) -> List[str]:
+        text = self._tail + self._decoder.decode(b"", final=True)
+        self._tail = ""
+        return [text] if text.strip() else []
+
+
+def csv_columns(lines: List[str], header: List[str]) -> Dict[str, list]:
+    rows = [row for row in csv.reader(lines) if row]
+    width = len(header)
+    rows = [row + [""] * (width - len(row)) if len(row) < width else row for row in rows]
+    return {name: list(values) for name, values in zip(header, zip(*rows))} if rows else {}
+
+
+def ndjson_columns(lines: List[str]) -> Dict[str, list]:
+    records = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = {}
+        records.append(record if isinstance(record, dict) else {})
+    return record_columns(records)
+
+
+def record_columns(records: List[Dict]) -> Dict[str, list]:
+    """Columns from applicant dicts (same fields as EligibilityRequest)."""
+    names = set(FLAG_COLUMNS) | {"id", "annual_income", "case_type", "state", "category"}
+    columns = {name: [record.get(name) for record in records] for name in names}
+    if not any(v is not None for v in columns["id"]):
+        del columns["id"]
+    # Booleans are not incomes (JSON true would otherwise read as 1)
+    columns["annual_income"] = ["nan" if isinstance(v, bool) else (v if isinstance(v, (int, float)) else (v or "nan"))
+                                for v in columns["annual_income"]]
+    for name in ("case_type", "state", "category", "id"):
+        if name in columns:
+            columns[name] = ["" if v is None else str(v) for v in columns[name]]
+    for name in FLAG_COLUMNS:
+        columns[name] = [bool(v) if not isinstance(v, str) else v in TRUE_VALUES for v in columns[name]]
+    return columns
+
+
+# ===============================
+# SCREENING
+# ===============================
+
+class BatchScreener:
+    """
+    Screens a streamed upload batch by batch: each batch yields NDJSON result
+    lines, and aggregate counts are kept for a final summary.
+    """
+
+    def __init__(self, fmt: str = "csv", rules: EligibilityRules = RULES, with_rows: bool = True):
+        self.format = fmt
+        self.rules = rules
+        self.with_rows = with_rows
+        self.header: Optional[List[str]] = None
+        self.rows = 0
+        self.basis_counts = np.zeros(len(BASIS_NAMES) + 1, dtype=np.int64)   # last slot: invalid
+        self.not_covered = 0
+        self.by_state: Dict[str, List[int]] = {}
+        # Pre-rendered result suffixes for every (basis, covered) combination
+        self._suffixes = {
+            (code, covered): json.dumps({
+                "eligible": code not in (BASIS_INCOME_EXCEEDS, BASIS_INVALID),
+                "basis": BASIS_NAMES[code] if code >= 0 else None,
+                "case_type_covered": bool(covered),
+                **({"error": "missing or invalid annual_income"} if code == BASIS_INVALID else {})
+            }, separators=(",", ":"))[1:]
+            for code in range(BASIS_INVALID, len(BASIS_NAMES)) for covered in (False, True)
+        }
+
+    def _columns(self, lines: List[str]) -> Dict[str, list]:
+        if self.format == "ndjson":
+            return ndjson_columns(lines)
+        if self.header is None:
+            while lines and not lines[0].strip():
+                lines = lines[1:]
+            if not lines:
+                return {}
+            self.header = [name.strip().lower() for name in next(csv.reader(lines[:1]))]
+            if "annual_income" not in self.header:
+                raise ValueError("CSV header must include an 'annual_income' column")
+            lines = lines[1:]
+        return csv_columns(lines, self.header)
+
+    def feed(self, lines: List[str]) -> str:
+        """Evaluate a batch of input lines; returns their NDJSON result lines."""
+        columns = self._columns(lines)
+        if not columns or not columns.get("annual_income"):
+            return ""
+        result = self.rules.evaluate(columns)
+        basis, covered, eligible = result["basis"], result["case_type_covered"], result["eligible"]
+        first_row = self.rows
+        self.rows += basis.size
+
+        self.basis_counts += np.bincount(np.where(basis >= 0, basis, len(BASIS_NAMES)), minlength=self.basis_counts.size)
+        self.not_covered += int(np.count_nonzero(~covered & (basis != BASIS_INVALID)))
+        if "state" in columns:
+            states, inverse = np.unique(np.asarray(columns["state"], dtype=str), return_inverse=True)
+            inverse = inverse.reshape(-1)
+            totals = np.bincount(inverse, minlength=states.size)
+            eligible_counts = np.bincount(inverse, weights=eligible, minlength=states.size)
+            for state, total, count in zip(states.tolist(), totals.tolist(), eligible_counts.tolist()):
+                entry = self.by_state.setdefault(state or "unknown", [0, 0])
+                entry[0] += total
+                entry[1] += int(count)
+
+        if not self.with_rows:
+            return ""
+        suffixes = self._suffixes
+        ids = columns.get("id")
+        if ids is not None:
+            lines_out = [f'{{"row":{first_row + i},"id":{json.dumps(ids[i])},{suffixes[(b, c)]}'
+                         for i, (b, c) in enumerate(zip(basis.tolist(), covered.tolist()))]
+        else:
+            lines_out = [f'{{"row":{first_row + i},{suffixes[(b, c)]}'
+                         for i, (b, c) in enumerate(zip(basis.tolist(), covered.tolist()))]
+        return "\n".join(lines_out) + "\n"
+
+    def summary(self) -> Dict:
+        counts = self.basis_counts.tolist()
+        invalid = counts[-1]
+        not_eligible = counts[BASIS_INCOME_EXCEEDS]
+        return {
+            "total": self.rows,
+            "invalid": invalid,
+            "eligible": self.rows - invalid - not_eligible,
+            "not_eligible": not_eligible,
+            "by_basis": {name: counts[code] for code, name in enumerate(BASIS_NAMES)},
+            "case_type_not_covered": self.not_covered,
+            "by_state": {state: {"total": total, "eligible": eligible}
+                         for state, (total, eligible) in sorted(self.by_state.items())}
+        }
@@ -1,21 +1,52 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, WebSocket
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, NamedTuple, Optional, Union
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+# Startup phase timings (seconds), reported by /ready; imports include loading the embedding model
+_startup = {"phases": {}, "done": False, "llm": None}
+_imports_started = time.perf_counter()
+
+from backend.utils.deadline import Deadline
+from backend.utils.worker import is_indexer, notify_ready
+from backend.utils.response_cache import get_cache as get_response_cache, respond as respond_cached
+from backend.utils.chat_sessions import ChatConnection, get_registry as get_chat_sessions
+from backend.utils import answer_gate, indexer_route, profiling, rate_limit
 
 # Import Utils
 try:
     from backend.utils.intent import get_intent
-    from backend.utils.vector_db import query_knowledge, initialize_db
-    from backend.utils.ai_response import generate_response, check_ollama_status
+    from backend.utils.vector_db import query_knowledge, initialize_db, warm_up, read_kb_index, get_kb_version
+    from backend.utils.vector_db import get_snapshot as get_kb_snapshot
+    from backend.utils.vector_db import add_swap_listener as add_kb_swap_listener
+    from backend.utils import kb_reload
+    from backend.utils.faq_answers import get_store as get_faq_answers, refresh_in_background as refresh_faq_answers
+    from backend.utils.ai_response import generate_response, generate_response_by_deadline, check_ollama_status, get_llm_stats
+    from backend.utils.ai_response import warm_up_llm
     from backend.utils.web_scraper import scrape_for_query, get_source_urls, scrape_case_status, scrape_njdg_stats
+    from backend.utils.web_scraper import cache_version as get_scrape_version
+    from backend.utils.http_client import get_metrics as get_http_metrics
+    from backend.utils.politeness import get_stats as get_politeness_stats
+    from backend.utils.case_store import get_case as get_stored_case, get_cases as get_stored_cases, cases_with_prefix
+    from backend.utils.njdg_cube import get_stats as get_njdg_cube_stats, get_version as get_njdg_cube_version
+    from backend.utils import njdg_history
+    from backend.utils.live_index import start_refresher, request_refresh, search_live, get_status as get_live_index_status
     from backend.services import (
-        get_available_lawyers, simulate_lawyer_connection,
+        get_available_lawyers, get_lawyer_directory, simulate_lawyer_connection, connect_any_lawyer, get_matching_engine,
         check_legal_aid_eligibility, EligibilityRequest,
         get_mock_case_status, get_mock_njdg_stats
     )
+    from backend import legal_aid_batch
     AI_ENABLED = True
 except ImportError as e:
     print(f"Some dependencies missing: {e}")
@@ -23,26 +54,63 @@ except ImportError as e:
     def get_intent(q): return "unknown"
     def query_knowledge(q): return []
     def initialize_db(): pass
-    def generate_response(q, c=None, s=None): return None
-    def check_ollama_status(): return False
-    def scrape_for_query(q): return {"content": "", "sources": []}
+    def warm_up(): pass
+    def read_kb_index(): return {}
+    def get_kb_version(): return None
+    def get_kb_snapshot(): return None
+    def add_kb_swap_listener(listener): pass
+    kb_reload = None
+    def get_faq_answers(): return None
+    def refresh_faq_answers(): pass
+    def generate_response(q, c=None, s=None, intent=None): return None
+    def generate_response_by_deadline(user_query, context=None, scraped_data=None, deadline=None, intent=None, history=None, on_token=None, session_id=None): return None, False
+    def check_ollama_status(timeout=5): return False
+    def warm_up_llm(timeout=120): return False
+    def get_llm_stats(): return {}
+    def scrape_for_query(q, deadline=None): return {"content": "", "sources": []}
     def get_source_urls(q): return []
+    def get_http_metrics(): return {}
+    def get_politeness_stats(): return {}
+    def start_refresher(): pass
+    def request_refresh(): pass
+    def search_live(q): return {"content": "", "sources": []}
+    def get_live_index_status(): return {}
     def scrape_case_status(cnr): return None
+    def get_stored_case(cnr): return None
+    def get_stored_cases(cnrs): return {}
+    def cases_with_prefix(prefix, limit=50, after=None): return []
+    def get_njdg_cube_stats(state=None, case_type=None, court=None): return None
+    def get_njdg_cube_version(): return None
     def scrape_njdg_stats(): return None
-    def get_available_lawyers(s=None): return []
-    def simulate_lawyer_connection(lid): return {"success": False}
+    def get_scrape_version(key): return None
+    def get_available_lawyers(specialization=None, language=None, state=None, available=None, page=1, page_size=20):
+        return {"total": 0, "available_now": 0, "page": page, "page_size": page_size, "lawyers": []}
+    def get_lawyer_directory(): return None
+    def simulate_lawyer_connection(lid, client=None): return {"success": False}
+    def connect_any_lawyer(specialization=None, language=None, client=None): return {"success": False}
+    def get_matching_engine(): return None
     def check_legal_aid_eligibility(r): return {"eligible": False}
     def get_mock_case_status(cnr): return None
     def get_mock_njdg_stats(): return {}
     class EligibilityRequest: pass
+    legal_aid_batch = None
+    njdg_history = None
     AI_ENABLED = False
 
+_startup["phases"]["imports"] = round(time.perf_counter() - _imports_started, 3)
+
 app = FastAPI(
     title="Neethi API",
     description="AI-powered legal assistant for Department of Justice, India",
     version="2.0.0"
 )
 
+# Tele-Law requests are served by the indexer worker, where the matching engine lives (utils/indexer_route.py)
+app.add_middleware(indexer_route.IndexerRouteMiddleware)
+
+# Per-client rate limits and fair-share admission (utils/rate_limit.py); inside CORS so refusals carry its headers
+app.add_middleware(rate_limit.RateLimitMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -52,25 +120,75 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Startup Event
-@app.on_event("startup")
-async def startup_event():
-    initialize_db()
-    if check_ollama_status():
+# Per-request CPU profiles (X-Profile header or NEETHI_PROFILE_RATE, see utils/profiling.py)
+app.add_middleware(profiling.ProfilingMiddleware)
+
+def _on_knowledge_base_swap(version: str):
+    """A new knowledge base build is being served: stored answers built from the old one are re-checked."""
+    faq_answers = get_faq_answers()
+    if faq_answers is not None:
+        faq_answers.invalidate()
+    if is_indexer():
+        refresh_faq_answers()
+
+@contextmanager
+def _phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _startup["phases"][name] = round(time.perf_counter() - started, 3)
+
+async def _warm_up_llm():
+    """Load the LLM in the background; /ready waits for it, requests meanwhile get what is available."""
+    with _phase("llm_warm_up"):
+        _startup["llm"] = await run_in_threadpool(warm_up_llm)
+    if _startup["llm"]:
         print("✅ Ollama AI is available")
     else:
         print("⚠️ Ollama not running - using fallback responses")
 
+# Startup Event
+@app.on_event("startup")
+async def startup_event():
+    add_kb_swap_listener(_on_knowledge_base_swap)
+    # Only the designated indexer writes to the vector store (see backend/server.py)
+    if is_indexer():
+        with _phase("knowledge_base"):
+            initialize_db()
+        refresh_faq_answers()
+        if kb_reload is not None:
+            kb_reload.start_watcher()
+        start_refresher()
+        if njdg_history is not None:
+            njdg_history.start_sampler()
+    engine = get_matching_engine()
+    if engine is not None:
+        asyncio.create_task(engine.run_sweeper())
+    with _phase("retrieval_warm_up"):
+        warm_up()
+    _startup["done"] = True
+    asyncio.create_task(_warm_up_llm())
+    notify_ready()
+
 # Models
 class ChatRequest(BaseModel):
     message: str
     history: Optional[List[dict]] = []
+    session_id: Optional[str] = None   # keeps a conversation on one LLM host
 
 class ChatResponse(BaseModel):
     response: str
     sources: Optional[List[str]] = []
     intent: Optional[str] = None
     ai_generated: Optional[bool] = False
+    # True when the request deadline cut a stage short and this is the best partial answer
+    degraded: Optional[bool] = False
+    degraded_stages: Optional[List[str]] = []
+    # generated | precomputed (stored FAQ answer) | knowledge_base (curated answer, confident match)
+    # | retrieved (closest document) | rule_based
+    answer_type: Optional[str] = None
+    confidence: Optional[float] = None
 
 # Fallback responses for common queries
 FALLBACK_RESPONSES = {
@@ -129,6 +247,41 @@ For specific vacancy announcements, check doj.gov.in regularly.""",
     }
 }
 
+# Answer when neither the AI, the fallbacks nor the knowledge base have anything
+NO_ANSWER_RESPONSE = {
+    "response": """I apologize, but I couldn't find specific information on that topic. 
+
+I can help you with:
+- **Case Status:** Check your case online
+- **Tele-Law:** Free legal consultation
+- **eCourts Services:** e-Filing, e-Payment
+- **Traffic Challans:** Pay fines online
+- **Legal Aid:** NALSA free lawyer services
+
+Please try rephrasing your question or visit doj.gov.in for more information.""",
+    "sources": ["https://doj.gov.in"]
+}
+
+def _fixed_answer(intent: str, degraded_stages: List[str]) -> ChatResponse:
+    fallback = FALLBACK_RESPONSES.get(intent, NO_ANSWER_RESPONSE)
+    return ChatResponse(
+        response=fallback["response"],
+        sources=fallback["sources"],
+        intent=intent,
+        ai_generated=False,
+        degraded=bool(degraded_stages),
+        degraded_stages=degraded_stages,
+        answer_type="rule_based"
+    )
+
+def _fallback_chat_response(intent: str, degraded_stages: List[str], headers) -> Response:
+    """A fixed /chat answer from the response cache (they never change while running)."""
+    def build():
+        return jsonable_encoder(_fixed_answer(intent, degraded_stages))
+
+    entry = get_response_cache().get(("chat", intent, tuple(degraded_stages)), 0, build)
+    return respond_cached(entry, headers, "no-store", conditional=False)
+
 @app.get("/")
 def read_root():
         return {
@@ -144,26 +297,139 @@ def health_check():
         "ollama": check_ollama_status()
     }
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
-    user_query = request.message
+@app.get("/ready")
+def readiness(response: Response):
+    """
+    Readiness probe: 200 once this worker has its embedding model and a
+    knowledge base index, and has tried to load the LLM; 503 until then.
+    llm says whether one is up now (re-checked after the warm-up, cached by
+    the model router for a few seconds). Includes the startup phase timings.
+    """
+    warmed_up = "llm_warm_up" in _startup["phases"]
+    llm = check_ollama_status(timeout=2) if warmed_up else _startup["llm"]
+    checks = {"embedding_model": AI_ENABLED, "knowledge_base": get_kb_version(), "llm": llm}
+    ready = (_startup["done"] and warmed_up
+             and (not AI_ENABLED or checks["knowledge_base"] is not None))
+    if not ready:
+        response.status_code = 503
+    return {"ready": ready, "pid": os.getpid(), "checks": checks, "phases": _startup["phases"]}
+
+@app.get("/metrics")
+async def metrics():
+    """Operational metrics for the scraping layer, the LLM routes, chat sessions, rate limits and the Tele-Law queue."""
+    engine = get_matching_engine()
+    return {
+        "scraper_http": get_http_metrics(),
+        "scraper_politeness": get_politeness_stats(),
+        "live_index": get_live_index_status(),
+        "llm_routes": get_llm_stats(),
+        "faq_answers": get_faq_answers().get_stats() if get_faq_answers() is not None else {},
+        "tele_law_queue": engine.get_stats() if engine is not None else {},
+        "response_cache": get_response_cache().get_stats(),
+        "chat_sessions": get_chat_sessions().get_stats(),
+        "rate_limits": rate_limit.get_stats()
+    }
+
+async def _within(deadline: Deadline, func, /, *args, default=None, **kwargs):
+    """Run a blocking stage in the threadpool, giving up when the request deadline expires."""
+    if deadline.expired:
+        return default, False
+    try:
+        result = await asyncio.wait_for(run_in_threadpool(func, *args, **kwargs), timeout=deadline.remaining())
+        return result, True
+    except asyncio.TimeoutError:
+        return default, False
+
+def _precomputed_response(stored: Dict, intent: str, degraded_stages: List[str] = (),
+                          confidence: Optional[float] = None) -> ChatResponse:
+    return ChatResponse(
+        response=stored["answer"],
+        sources=stored.get("sources", []),
+        intent=intent,
+        ai_generated=True,
+        degraded=bool(degraded_stages),
+        degraded_stages=list(degraded_stages),
+        answer_type="precomputed",
+        confidence=confidence
+    )
+
+# Partial generations shorter than this are replaced by the rule-based answer
+MIN_PARTIAL_RESPONSE_CHARS = 200
+
+class FixedAnswer(NamedTuple):
+    """A /chat outcome answered with one of the fixed responses (served from the response cache)."""
+    intent: str
+    degraded_stages: List[str]
+
+
+async def _answer_chat(user_query: str, deadline: Deadline, history: Optional[List[dict]] = None,
+                       on_token=None, on_stage=None, session_id: Optional[str] = None) -> Union[ChatResponse, FixedAnswer]:
+    """
+    The chat pipeline shared by /chat and /ws/chat. on_token receives
+    generated text as it streams (from a worker thread); on_stage is told
+    when retrieval, live search and generation start. session_id keeps a
+    conversation on one LLM host.
+    """
+    def stage(name: str):
+        if on_stage is not None:
+            on_stage(name)
+    
+    degraded_stages = []
     
     # 1. Intent Detection
     intent = get_intent(user_query)
     
-    # 2. RAG Retrieval from Knowledge Base
-    context_docs = query_knowledge(user_query)
-    
-    # 3. Check if we need web scraping (for fresh/live data queries)
+    # Fresh/live data queries need web scraping, so they never get a stored answer
     needs_scraping = any(word in user_query.lower() for word in [
         'latest', 'news', 'update', 'current', 'today', 'recent', 'new'
     ])
+    faq_answers = get_faq_answers()
+    
+    # A known FAQ question is answered from the precomputed store: no retrieval, no generation
+    stored = faq_answers.lookup(user_query) if faq_answers is not None and not needs_scraping else None
+    if stored:
+        return _precomputed_response(stored, intent)
+    
+    # 2. RAG Retrieval from Knowledge Base
+    stage("retrieving")
+    context_docs, ok = await _within(deadline, query_knowledge, user_query, default=[])
+    if not ok:
+        degraded_stages.append("retrieval")
+    
+    # A confident knowledge base match is answered without generation: with the
+    # precomputed answer to that FAQ if there is one, else as curated
+    gate = answer_gate.decide(user_query, intent, context_docs)
+    if gate["direct"] and not needs_scraping:
+        stored = faq_answers.for_document(context_docs[0]["id"]) if faq_answers is not None else None
+        if stored:
+            return _precomputed_response(stored, intent, degraded_stages, gate["confidence"])
+        response_text, sources = answer_gate.direct_answer(context_docs[0])
+        return ChatResponse(
+            response=response_text,
+            sources=sources,
+            intent=intent,
+            ai_generated=False,
+            degraded=bool(degraded_stages),
+            degraded_stages=degraded_stages,
+            answer_type="knowledge_base",
+            confidence=gate["confidence"]
+        )
     
+    # 3. Web scraping for fresh/live data queries
     scraped_data = None
     scraped_sources = []
     
     if needs_scraping:
-        scrape_result = scrape_for_query(user_query)
+        stage("searching")
+        # Prefer live content already indexed by the background refresher
+        scrape_result, ok = await _within(deadline, search_live, user_query, default={})
+        if ok and not scrape_result.get("content"):
+            # Nothing indexed yet: scrape synchronously (blocking I/O, possibly queued
+            # behind the host's politeness budget, so keep it off the event loop)
+            scrape_result, ok = await _within(deadline, scrape_for_query, user_query, deadline=deadline, default={})
+            request_refresh()
+        if not ok:
+            degraded_stages.append("scraping")
         scraped_data = scrape_result.get("content")
         scraped_sources = scrape_result.get("sources", [])
     
@@ -172,12 +438,28 @@ async def chat_endpoint(request: ChatRequest):
     ai_generated = False
     sources = []
     
-    if check_ollama_status():
-        response_text = generate_response(
+    ollama_up, _ = await _within(deadline, check_ollama_status, timeout=deadline.timeout(5), default=False)
+    if ollama_up:
+        stage("generating")
+        (response_text, complete), ok = await _within(
+            deadline,
+            generate_response_by_deadline,
             user_query=user_query,
             context=context_docs,
-            scraped_data=scraped_data
+            scraped_data=scraped_data,
+            deadline=deadline,
+            intent=intent,
+            history=history,
+            on_token=on_token,
+            session_id=session_id,
+            default=(None, False)
         )
+        if not (ok and complete):
+            degraded_stages.append("generation")
+            if response_text and len(response_text) >= MIN_PARTIAL_RESPONSE_CHARS:
+                response_text = response_text.rstrip() + " …"
+            else:
+                response_text = None
         if response_text:
             ai_generated = True
             # Add relevant sources
@@ -186,39 +468,75 @@ async def chat_endpoint(request: ChatRequest):
                 sources.extend(scraped_sources)
             # Deduplicate sources
             sources = list(dict.fromkeys(sources))
+    elif deadline.expired:
+        degraded_stages.append("generation")
     
     # 5. Fallback to rule-based responses if AI fails
     if not response_text:
-        if intent in FALLBACK_RESPONSES:
-            fallback = FALLBACK_RESPONSES[intent]
-            response_text = fallback["response"]
-            sources = fallback["sources"]
-        elif context_docs:
-            # Use best match from Knowledge Base
-            best_doc = context_docs[0]
-            response_text = best_doc['content']
-            if best_doc['metadata'].get('url'):
-                sources.append(best_doc['metadata']['url'])
-        else:
-            response_text = """I apologize, but I couldn't find specific information on that topic. 
-
-I can help you with:
-- **Case Status:** Check your case online
-- **Tele-Law:** Free legal consultation
-- **eCourts Services:** e-Filing, e-Payment
-- **Traffic Challans:** Pay fines online
-- **Legal Aid:** NALSA free lawyer services
-
-Please try rephrasing your question or visit doj.gov.in for more information."""
-            sources = ["https://doj.gov.in"]
+        if intent in FALLBACK_RESPONSES or not context_docs:
+            return FixedAnswer(intent, degraded_stages)
+        # Use best match from Knowledge Base
+        response_text, sources = answer_gate.direct_answer(context_docs[0])
     
     return ChatResponse(
         response=response_text,
         sources=sources,
         intent=intent,
-        ai_generated=ai_generated
+        ai_generated=ai_generated,
+        degraded=bool(degraded_stages),
+        degraded_stages=degraded_stages,
+        answer_type="generated" if ai_generated else "retrieved",
+        confidence=gate["confidence"] if context_docs else None
     )
 
+@app.post("/chat", response_model=ChatResponse)
+async def chat_endpoint(request: ChatRequest, http_request: Request, x_request_timeout: Optional[str] = Header(None)):
+    # Every stage only uses the time left in this budget
+    deadline = Deadline.from_header(x_request_timeout)
+    # A /ws/chat session continued over POST (the socket dropped): its history is kept here when the
+    # session lives in this worker, otherwise the client's copy in request.history is used
+    session = get_chat_sessions().get(request.session_id) if request.session_id else None
+    history = request.history or (list(session.history) if session is not None else [])
+    result = await _answer_chat(request.message, deadline, history, session_id=request.session_id)
+    if session is not None:
+        answer = _fixed_answer(result.intent, result.degraded_stages) if isinstance(result, FixedAnswer) else result
+        session.add_turn(request.message, answer.response)
+    if isinstance(result, FixedAnswer):
+        # Fixed answers: served as pre-serialized bytes
+        return _fallback_chat_response(result.intent, result.degraded_stages, http_request.headers)
+    return result
+
+
+async def _answer_socket_chat(user_query: str, history: List[dict], deadline: Deadline,
+                              on_token, on_stage, session_id: str) -> Dict:
+    result = await _answer_chat(user_query, deadline, history, on_token, on_stage, session_id)
+    if isinstance(result, FixedAnswer):
+        result = _fixed_answer(result.intent, result.degraded_stages)
+    return jsonable_encoder(result)
+
+
+@app.websocket("/ws/chat")
+async def chat_socket(websocket: WebSocket, session_id: Optional[str] = None):
+    """
+    Persistent chat channel: multiplexed requests with streamed tokens,
+    server-held history and pushed status / Tele-Law queue updates.
+    The frame protocol is described in utils/chat_sessions.py.
+    """
+    client = rate_limit.client_key(websocket.scope)
+    await websocket.accept()
+    registry = get_chat_sessions()
+    session, resumed = registry.attach(session_id)
+
+    async def answer(query, history, deadline, on_token, on_stage):
+        # Each message is charged to the chat budget, like a POST /chat
+        async with rate_limit.admit(client, "chat"):
+            return await _answer_socket_chat(query, history, deadline, on_token, on_stage, session.session_id)
+
+    try:
+        await ChatConnection(websocket, session, answer, _ticket_updates).run(resumed)
+    finally:
+        registry.detach(session)
+
 
 # ===============================
 # QUICK LINKS ENDPOINTS
@@ -228,15 +546,24 @@ Please try rephrasing your question or visit doj.gov.in for more information."""
 async def get_case_status(cnr: str):
     """
     Lookup case status by CNR number.
-    Attempts live scraping, falls back to mock data.
+    Answers from the local case store, then attempts live scraping,
+    then falls back to mock data.
     """
     # Validate CNR format
     cnr = cnr.strip().upper()
     if len(cnr) < 16:
         raise HTTPException(status_code=400, detail="Invalid CNR format. CNR should be at least 16 characters.")
     
-    # Try live scraping first
-    case_data = scrape_case_status(cnr)
+    stored = get_stored_case(cnr)
+    if stored:
+        return {
+            "success": True,
+            "source": "store",
+            "data": stored
+        }
+    
+    # Try live scraping (kept in the scrape cache, never in the case store: it is not synced data)
+    case_data = await run_in_threadpool(scrape_case_status, cnr)
     
     if case_data:
         return {
@@ -263,34 +590,204 @@ async def get_case_status(cnr: str):
     }
 
 
-@app.get("/tele-law/lawyers")
-async def list_lawyers(specialization: Optional[str] = None):
+# Most CNRs accepted by one /case-status/batch request
+MAX_BATCH_CNRS = 1000
+
+
+class CaseBatchRequest(BaseModel):
+    cnrs: List[str]
+
+
+@app.post("/case-status/batch")
+async def get_case_status_batch(request: CaseBatchRequest):
     """
-    Get list of available Tele-Law lawyers.
+    Lookup many CNRs at once from the local case store (and demo data).
+    Cases not in the store are reported as not found rather than scraped.
     """
-    lawyers = get_available_lawyers(specialization)
-    available_count = sum(1 for l in lawyers if l["available"])
+    if len(request.cnrs) > MAX_BATCH_CNRS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_CNRS} CNRs per request.")
+    
+    cnrs = list(dict.fromkeys(cnr.strip().upper() for cnr in request.cnrs))
+    found = await run_in_threadpool(get_stored_cases, cnrs)
+    results = {}
+    for cnr in cnrs:
+        record = found.get(cnr)
+        if record:
+            results[cnr] = {"source": "store", "data": record}
+        else:
+            mock_data = get_mock_case_status(cnr)
+            results[cnr] = {"source": "demo", "data": mock_data} if mock_data else None
     
     return {
         "success": True,
-        "total": len(lawyers),
-        "available_now": available_count,
-        "lawyers": lawyers,
-        "note": "This is a demonstration of Tele-Law service. For real consultations, visit tele-law.in or your nearest CSC."
+        "found": sum(1 for result in results.values() if result),
+        "results": results
     }
 
 
+@app.get("/case-status/prefix/{prefix}")
+async def list_cases_by_prefix(prefix: str, limit: int = 50, after: Optional[str] = None):
+    """
+    Cases from the local store whose CNR starts with a prefix: a state (DL),
+    district (DLCT) or court establishment (DLCT01). Page with 'after' set
+    to the last CNR of the previous page.
+    """
+    prefix = prefix.strip().upper()
+    if len(prefix) < 2:
+        raise HTTPException(status_code=400, detail="Prefix should be at least a 2-letter state code.")
+    limit = min(max(limit, 1), 500)
+    
+    cases = await run_in_threadpool(cases_with_prefix, prefix, limit, after)
+    return {
+        "success": True,
+        "prefix": prefix,
+        "count": len(cases),
+        "cases": cases,
+        "next_after": cases[-1]["cnr"] if len(cases) == limit else None
+    }
+
+
+@app.get("/tele-law/lawyers")
+async def list_lawyers(
+    request: Request,
+    specialization: Optional[str] = None,
+    language: Optional[str] = None,
+    state: Optional[str] = None,
+    available: Optional[bool] = None,
+    page: int = 1,
+    page_size: int = 20
+):
+    """
+    Get a page of Tele-Law lawyers, best rated first.
+    Filter by specialization, language, state and current availability.
+    Served from the response cache until any lawyer's availability changes.
+    """
+    directory = get_lawyer_directory()
+    key = ("tele-law/lawyers", specialization, language, state, available, page, page_size)
+
+    def build():
+        return {
+            "success": True,
+            **get_available_lawyers(specialization, language, state, available, page, page_size),
+            "note": "This is a demonstration of Tele-Law service. For real consultations, visit tele-law.in or your nearest CSC."
+        }
+
+    entry = get_response_cache().get(key, directory.version if directory is not None else 0, build)
+    # Availability changes at any moment: always revalidate, the ETag makes that cheap
+    return respond_cached(entry, request.headers, "no-cache")
+
+
 @app.post("/tele-law/connect/{lawyer_id}")
-async def connect_to_lawyer(lawyer_id: str):
+async def connect_to_lawyer(lawyer_id: str, http_request: Request):
     """
-    Simulate connecting to a lawyer.
+    Connect to a specific lawyer, or join their queue if they are busy.
+    A client may hold a few open tickets at a time (see utils/matching.py).
     """
-    result = simulate_lawyer_connection(lawyer_id)
+    result = simulate_lawyer_connection(lawyer_id, client=rate_limit.client_key(http_request.scope))
     return result
 
 
+class ConnectRequest(BaseModel):
+    specialization: Optional[str] = None
+    language: Optional[str] = None
+
+
+@app.post("/tele-law/connect")
+async def connect_to_any_lawyer(http_request: Request, request: Optional[ConnectRequest] = None):
+    """
+    Connect to the first free lawyer matching the filters, or join the queue.
+    Queued clients follow their position at /tele-law/queue/{ticket_id}/events.
+    """
+    request = request or ConnectRequest()
+    return connect_any_lawyer(request.specialization, request.language,
+                              client=rate_limit.client_key(http_request.scope))
+
+
+def _ticket_or_404(ticket_id: str):
+    engine = get_matching_engine()
+    ticket = engine.tickets.get(ticket_id) if engine is not None else None
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="Queue ticket not found")
+    return engine, ticket
+
+
+@app.get("/tele-law/queue/{ticket_id}")
+async def queue_status(ticket_id: str):
+    """Current position and estimated wait of a queue ticket."""
+    engine, ticket = _ticket_or_404(ticket_id)
+    return engine.snapshot(ticket)
+
+
+# Seconds between status events while nothing changes (keeps proxies from closing the stream)
+QUEUE_EVENT_HEARTBEAT = 15
+
+
+async def _ticket_statuses(engine, ticket):
+    """The ticket's status now, after each change (or heartbeat) and a last time when it leaves the queue."""
+    ticket.subscribers += 1
+    try:
+        while True:
+            ticket.updated.clear()
+            status = engine.snapshot(ticket)
+            yield status
+            if status["status"] != "waiting":
+                return
+            try:
+                await asyncio.wait_for(ticket.updated.wait(), timeout=QUEUE_EVENT_HEARTBEAT)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        ticket.subscribers -= 1
+        ticket.last_seen = time.monotonic()
+
+
+def _ticket_updates(ticket_id: str):
+    """Status updates of a queue ticket for /ws/chat subscribers, None for unknown tickets."""
+    if indexer_route.should_forward("/tele-law/queue"):
+        return indexer_route.ticket_statuses(ticket_id)
+    engine = get_matching_engine()
+    ticket = engine.tickets.get(ticket_id) if engine is not None else None
+    return _ticket_statuses(engine, ticket) if ticket is not None else None
+
+
+@app.get("/tele-law/queue/{ticket_id}/events")
+async def queue_events(ticket_id: str):
+    """
+    Server-sent events with the ticket's status: one on connect, one per
+    change in position, and a final one when connected, cancelled or expired.
+    """
+    engine, ticket = _ticket_or_404(ticket_id)
+
+    async def events():
+        async for status in _ticket_statuses(engine, ticket):
+            yield f"event: status\ndata: {json.dumps(status)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.delete("/tele-law/queue/{ticket_id}")
+async def leave_queue(ticket_id: str):
+    """Leave the queue."""
+    engine, _ = _ticket_or_404(ticket_id)
+    return {"success": engine.cancel(ticket_id)}
+
+
+@app.post("/tele-law/sessions/{session_id}/end")
+async def end_consultation(session_id: str):
+    """End a consultation; the lawyer is matched with the next waiting citizen."""
+    engine = get_matching_engine()
+    if engine is None or not engine.end_session(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"success": True}
+
+
 class LegalAidCheckRequest(BaseModel):
     annual_income: int
+    category: Optional[str] = "general"   # a NALSA priority category grants aid regardless of income
     case_type: str
     state: str
     is_woman: bool = False
@@ -307,6 +804,7 @@ async def check_legal_aid(request: LegalAidCheckRequest):
     """
     eligibility_request = EligibilityRequest(
         annual_income=request.annual_income,
+        category=request.category,
         case_type=request.case_type,
         state=request.state,
         is_woman=request.is_woman,
@@ -323,14 +821,105 @@ async def check_legal_aid(request: LegalAidCheckRequest):
     }
 
 
+@app.post("/legal-aid/check/batch")
+async def check_legal_aid_batch(request: Request, format: Optional[str] = None, summary_only: bool = False):
+    """
+    Screen many applicants for NALSA legal aid eligibility at once.
+
+    The body is a streamed CSV (with a header row) or NDJSON upload, one
+    applicant per row with the /legal-aid/check fields plus optional 'id' and
+    'category'. Returns NDJSON: one result per row, then a final line with
+    the aggregate counts. With summary_only=true, returns just the counts.
+    """
+    if legal_aid_batch is None:
+        raise HTTPException(status_code=503, detail="Batch screening is unavailable")
+    fmt = (format or ("ndjson" if "json" in request.headers.get("content-type", "") else "csv")).lower()
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'")
+    screener = legal_aid_batch.BatchScreener(fmt, with_rows=not summary_only)
+
+    # Evaluate the upload in fixed-size batches as it arrives; per-row results
+    # are spooled (to disk past a few MB) and streamed back once the upload ends
+    output = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    splitter = legal_aid_batch.LineSplitter()
+    pending = []
+    try:
+        async for chunk in request.stream():
+            pending += splitter.feed(chunk)
+            if len(pending) >= legal_aid_batch.BATCH_ROWS:
+                output.write((await run_in_threadpool(screener.feed, pending)).encode())
+                pending = []
+        pending += splitter.close()
+        output.write((await run_in_threadpool(screener.feed, pending)).encode())
+    except ValueError as e:
+        output.close()
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if summary_only:
+        output.close()
+        return {"success": True, "summary": screener.summary()}
+
+    output.write((json.dumps({"summary": screener.summary()}) + "\n").encode())
+    output.seek(0)
+
+    def results():
+        with output:
+            while True:
+                block = output.read(64 * 1024)
+                if not block:
+                    return
+                yield block
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+# Statistics move slowly: let clients reuse them briefly, then revalidate by ETag
+NJDG_CACHE_CONTROL = "public, max-age=60"
+
 @app.get("/njdg/stats")
-async def get_njdg_statistics():
+async def get_njdg_statistics(request: Request, state: Optional[str] = None, type: Optional[str] = None,
+                              court: Optional[str] = None):
     """
     Get National Judicial Data Grid statistics.
-    Attempts live scraping, falls back to mock data.
+    Built from the local case store when it has cases (filterable by state,
+    type=civil|criminal and court=district|high_court); otherwise attempts
+    live scraping, falls back to mock data.
+    Responses are cached until the case store or the scraped page changes.
     """
-    # Try live scraping first
-    live_stats = scrape_njdg_stats()
+    cache = get_response_cache()
+
+    store_version = await run_in_threadpool(get_njdg_cube_version)
+    if store_version is not None:
+        def build_store():
+            return {
+                "success": True,
+                "source": "store",
+                "filters": {"state": state, "type": type, "court": court},
+                "data": get_njdg_cube_stats(state, type, court)
+            }
+        try:
+            entry = await run_in_threadpool(cache.get, ("njdg/stats", "store", state, type, court), store_version, build_store)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return respond_cached(entry, request.headers, NJDG_CACHE_CONTROL)
+    
+    # Try live scraping (only when the scraped page is not already cached)
+    live_version = get_scrape_version("njdg_stats")
+    live_stats = None
+    if live_version is None:
+        live_stats = await run_in_threadpool(scrape_njdg_stats)
+        live_version = get_scrape_version("njdg_stats")
+    
+    if live_version is not None:
+        def build_live():
+            return {
+                "success": True,
+                "source": "live",
+                "data": live_stats or scrape_njdg_stats()
+            }
+        # build_live may scrape (the page can expire from this worker's cache meanwhile): keep it off the event loop
+        entry = await run_in_threadpool(cache.get, ("njdg/stats", "live"), live_version, build_live)
+        return respond_cached(entry, request.headers, NJDG_CACHE_CONTROL)
     
     if live_stats:
         return {
@@ -340,14 +929,164 @@ async def get_njdg_statistics():
         }
     
     # Fall back to mock data
-    mock_stats = get_mock_njdg_stats()
+    def build_demo():
+        return {
+            "success": True,
+            "source": "demo",
+            "data": get_mock_njdg_stats(),
+            "note": "For real-time statistics, visit njdg.ecourts.gov.in"
+        }
+    # The demo figures are stamped with the current minute
+    entry = cache.get(("njdg/stats", "demo"), int(time.time() // 60), build_demo)
+    return respond_cached(entry, request.headers, NJDG_CACHE_CONTROL)
+
+
+@app.get("/njdg/stats/history")
+async def get_njdg_history(metric: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None,
+                           resolution: str = "auto", max_points: int = Query(500, ge=10, le=5000)):
+    """
+    Recorded NJDG statistics over time.
+    metric is one or more comma-separated names (e.g. total_pending_cases,
+    disposal_rate.disposal_percentage); without it the available metrics are
+    listed. start / end take epoch seconds or ISO dates (default: last 30 days);
+    resolution is raw, hourly, daily or auto.
+    """
+    if njdg_history is None:
+        raise HTTPException(status_code=503, detail="Statistics history is unavailable")
+    store = njdg_history.get_store()
+    if not metric:
+        return {"success": True, "metrics": await run_in_threadpool(store.metrics)}
+    if resolution not in ("auto", "raw", "hourly", "daily"):
+        raise HTTPException(status_code=400, detail="resolution must be auto, raw, hourly or daily")
+    try:
+        end_ts = njdg_history.parse_time(end, time.time())
+        start_ts = njdg_history.parse_time(start, end_ts - 30 * 86400)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start and end must be epoch seconds or ISO dates")
+    if start_ts >= end_ts:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    metrics = [name.strip().lower() for name in metric.split(",") if name.strip()]
+    result = await run_in_threadpool(store.query, metrics, start_ts, end_ts, resolution, max_points)
+    return {"success": True, "start": int(start_ts), "end": int(end_ts), **result}
+
+
+# ===============================
+# DEBUG ENDPOINTS
+# ===============================
+# Enabled only when NEETHI_DEBUG_TOKEN is set; every call must send it as
+# X-Debug-Token. State is per worker process, so each response names its pid.
+
+def require_debug_token(x_debug_token: Optional[str] = Header(None)):
+    if not profiling.DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiling.token_valid(x_debug_token):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
+
+
+@app.get("/debug/profiles", dependencies=[Depends(require_debug_token)])
+async def list_debug_profiles():
+    """Stored CPU profiles, newest first."""
+    return {"success": True, "profiles": await run_in_threadpool(profiling.list_profiles)}
+
+
+@app.get("/debug/profiles/{profile_id}", dependencies=[Depends(require_debug_token)])
+async def get_debug_profile(profile_id: str):
+    """A CPU profile as folded stacks (input for flamegraph.pl, speedscope or inferno)."""
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    with open(path, "r", encoding="utf-8") as f:
+        return PlainTextResponse(f.read())
+
+
+@app.post("/debug/profile", dependencies=[Depends(require_debug_token)])
+async def profile_debug_process(seconds: float = Query(5.0, gt=0, le=profiling.MAX_PROFILE_SECONDS)):
+    """Sample every thread of this worker for a number of seconds."""
+    profile_id = await run_in_threadpool(profiling.profile_process, seconds)
+    return {"success": True, "id": profile_id, "pid": os.getpid()}
+
+
+@app.post("/debug/tracemalloc/start", dependencies=[Depends(require_debug_token)])
+async def start_debug_tracemalloc(frames: int = Query(25, ge=1, le=100)):
+    return {"success": True, **profiling.tracemalloc_start(frames)}
+
+
+@app.post("/debug/tracemalloc/stop", dependencies=[Depends(require_debug_token)])
+async def stop_debug_tracemalloc():
+    return {"success": True, **profiling.tracemalloc_stop()}
+
+
+@app.post("/debug/tracemalloc/snapshot", dependencies=[Depends(require_debug_token)])
+async def take_debug_snapshot(top: int = Query(25, ge=0, le=500), group_by: str = "lineno"):
+    """Snapshot traced allocations; returns its id and the largest allocation sites."""
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    try:
+        return {"success": True, **await run_in_threadpool(profiling.take_snapshot, top, group_by)}
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.get("/debug/tracemalloc/diff", dependencies=[Depends(require_debug_token)])
+async def diff_debug_snapshots(base: int, target: Optional[int] = None, top: int = Query(25, ge=1, le=500),
+                               group_by: str = "lineno"):
+    """Allocation growth between two snapshots (target defaults to a new one)."""
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    try:
+        return {"success": True, **await run_in_threadpool(profiling.diff_snapshots, base, target, top, group_by)}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.get("/debug/tracemalloc/snapshots/{snapshot_id}/folded", dependencies=[Depends(require_debug_token)])
+async def get_debug_snapshot_folded(snapshot_id: int):
+    """A snapshot's live allocations as folded stacks weighted by bytes."""
+    try:
+        return PlainTextResponse(await run_in_threadpool(profiling.snapshot_folded, snapshot_id))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@app.get("/debug/memory", dependencies=[Depends(require_debug_token)])
+async def get_debug_memory():
+    """Process memory and the estimated size of the model, indexes and caches."""
+    return {"success": True, **await run_in_threadpool(profiling.memory_report)}
+
+
+# ===============================
+# ADMIN ENDPOINTS
+# ===============================
+# Protected by the same NEETHI_DEBUG_TOKEN as the debug endpoints.
+
+@app.get("/admin/knowledge-base", dependencies=[Depends(require_debug_token)])
+async def get_knowledge_base_status():
+    """The knowledge base build being served, as recorded and as seen by this worker."""
     return {
         "success": True,
-        "source": "demo",
-        "data": mock_stats,
-        "note": "For real-time statistics, visit njdg.ecourts.gov.in"
+        "pid": os.getpid(),
+        "serving": get_kb_version(),
+        "snapshot": get_kb_snapshot().get_stats() if get_kb_snapshot() is not None else None,
+        "index": read_kb_index(),
+        "reload": kb_reload.get_status() if kb_reload is not None and is_indexer() else None
     }
 
 
+@app.post("/admin/knowledge-base/reload", status_code=202, dependencies=[Depends(require_debug_token)])
+async def reload_knowledge_base(force: bool = False):
+    """
+    Rebuild the knowledge base index from knowledge_base.json in the
+    background and switch to it once it checks out. Unchanged content is
+    not rebuilt unless force is set. Poll GET /admin/knowledge-base for the result.
+    """
+    if kb_reload is None:
+        raise HTTPException(status_code=503, detail="The knowledge base is unavailable")
+    await run_in_threadpool(kb_reload.request_reload, force, is_indexer())
+    return {"success": True, "queued": True, "serving": get_kb_version()}
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
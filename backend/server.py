@@ -0,0 +1,286 @@
+"""
+Production Server
+Pre-forking multi-worker server for the Neethi API.
+
+The master imports the app (loading the embedding model) once, freezes the
+heap and then forks the workers, so the model's memory is shared
+copy-on-write instead of loaded N times. Each worker opens its own Chroma
+client and warms up before it reports ready. Worker 0 is the designated
+indexer: only it writes to the vector store and runs background refreshers.
+It also listens on a private Unix socket, through which the other workers
+forward requests for state kept in the indexer alone (utils/indexer_route.py).
+
+Usage:
+    python -m backend.server --workers 4 --port 8000
+
+Signals (to the master):
+    SIGHUP            rolling restart, one worker at a time
+    SIGTERM / SIGINT  graceful shutdown
+
+Rolling restarts re-fork from the already loaded master (e.g. to reclaim
+memory); deploying new code needs a restart of the master itself.
+"""
+
+import argparse
+import gc
+import os
+import select
+import signal
+import socket
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+import uvicorn
+
+from backend.utils.worker import INDEXER_ENV, INDEXER_SOCKET_ENV, READY_FD_ENV, WORKER_COUNT_ENV, WORKER_ID_ENV
+
+DEFAULT_WORKERS = int(os.environ.get("NEETHI_WORKERS", "2"))
+
+# Seconds a new worker gets to load, warm up and report ready
+READY_TIMEOUT = 180
+
+# Seconds a stopping worker gets to finish in-flight requests before SIGKILL
+GRACEFUL_TIMEOUT = 30
+
+# Crash-restart backoff per worker slot
+RESTART_BACKOFF_MIN = 1.0
+RESTART_BACKOFF_MAX = 60.0
+
+
+class Master:
+    def __init__(self, host: str, port: int, workers: int):
+        self.host = host
+        self.port = port
+        self.num_workers = workers
+        self.app = None
+        self.sock: Optional[socket.socket] = None
+        self.indexer_sock: Optional[socket.socket] = None
+        self.workers: Dict[int, Dict] = {}   # slot -> {"pid", "ready_fd", "started"} or {"pid": None, "respawn_at"}
+        self.exited: Dict[int, int] = {}     # pid -> exit status, for pids not yet claimed
+        self.backoff: Dict[int, float] = {}
+        self.shutting_down = False
+        self.restart_requested = False
+
+    # ---- setup ----
+
+    def preload(self):
+        """Import the app (and with it the embedding model) before forking."""
+        start = time.perf_counter()
+        os.environ[WORKER_COUNT_ENV] = str(self.num_workers)
+        from backend.main import app
+        self.app = app
+        # Keep the GC from touching (and so copying) pre-fork objects in workers
+        gc.collect()
+        gc.freeze()
+        print(f"📦 App and embedding model preloaded in {time.perf_counter() - start:.1f}s")
+
+    def bind(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+        if self.num_workers > 1:
+            path = os.path.join(tempfile.mkdtemp(prefix="neethi-"), "indexer.sock")
+            self.indexer_sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.indexer_sock.bind(path)
+            self.indexer_sock.listen(2048)
+            self.indexer_sock.set_inheritable(True)
+            os.environ[INDEXER_SOCKET_ENV] = path
+
+    # ---- workers ----
+
+    def spawn(self, slot: int) -> int:
+        ready_r, ready_w = os.pipe()
+        pid = os.fork()
+
+        if pid == 0:
+            # Worker process
+            os.close(ready_r)
+            for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+                signal.signal(sig, signal.SIG_DFL)
+            os.environ[WORKER_ID_ENV] = str(slot)
+            os.environ[INDEXER_ENV] = "1" if slot == 0 else "0"
+            os.environ[READY_FD_ENV] = str(ready_w)
+            sockets = [self.sock]
+            if self.indexer_sock is not None:
+                if slot == 0:
+                    sockets.append(self.indexer_sock)
+                else:
+                    self.indexer_sock.close()
+            status = 0
+            try:
+                config = uvicorn.Config(
+                    self.app,
+                    lifespan="on",
+                    timeout_graceful_shutdown=GRACEFUL_TIMEOUT
+                )
+                uvicorn.Server(config).run(sockets=sockets)
+            except BaseException as e:
+                print(f"Worker {slot} failed: {e}")
+                status = 1
+            finally:
+                os._exit(status)
+
+        os.close(ready_w)
+        self.workers[slot] = {"pid": pid, "ready_fd": ready_r, "started": time.monotonic()}
+        print(f"🔹 Worker {slot} started (pid {pid}{', indexer' if slot == 0 else ''})")
+        return pid
+
+    def wait_ready(self, slot: int, timeout: float = READY_TIMEOUT) -> bool:
+        worker = self.workers[slot]
+        fd = worker.pop("ready_fd", None)
+        if fd is None:
+            return True
+        try:
+            readable, _, _ = select.select([fd], [], [], timeout)
+            ready = bool(readable) and os.read(fd, 1) == b"1"
+        finally:
+            os.close(fd)
+        if ready:
+            print(f"✅ Worker {slot} ready in {time.monotonic() - worker['started']:.1f}s")
+        else:
+            print(f"❌ Worker {slot} did not become ready within {timeout:.0f}s")
+        return ready
+
+    def poll_ready(self):
+        """Log readiness of workers respawned after a crash without blocking the loop."""
+        for slot, worker in list(self.workers.items()):
+            fd = worker.get("ready_fd")
+            if fd is not None and select.select([fd], [], [], 0)[0]:
+                self.wait_ready(slot, timeout=0)
+
+    def reap(self):
+        """Collect exited children and schedule crashed workers for a respawn after their back-off."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            slot = next((s for s, w in self.workers.items() if w["pid"] == pid), None)
+            if slot is None or self.shutting_down:
+                # Worker we are stopping on purpose (rolling restart / shutdown)
+                self.exited[pid] = status
+                continue
+
+            uptime = time.monotonic() - self.workers[slot]["started"]
+            delay = self.backoff.get(slot, RESTART_BACKOFF_MIN) if uptime < RESTART_BACKOFF_MAX else RESTART_BACKOFF_MIN
+            print(f"⚠️ Worker {slot} (pid {pid}) exited with status {status}; restarting in {delay:.0f}s")
+            fd = self.workers[slot].get("ready_fd")
+            if fd is not None:
+                os.close(fd)
+            # Respawned by the main loop, which keeps handling signals and other workers meanwhile
+            self.workers[slot] = {"pid": None, "respawn_at": time.monotonic() + delay}
+            self.backoff[slot] = min(delay * 2, RESTART_BACKOFF_MAX)
+
+    def respawn_due(self):
+        """Restart crashed workers whose back-off has elapsed."""
+        now = time.monotonic()
+        for slot, worker in list(self.workers.items()):
+            if worker.get("respawn_at") is not None and worker["respawn_at"] <= now:
+                self.spawn(slot)
+
+    def stop(self, pid: int, timeout: float = GRACEFUL_TIMEOUT):
+        """SIGTERM a worker (uvicorn drains in-flight requests), SIGKILL it if it lingers."""
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            self.reap()
+            if self.exited.pop(pid, None) is not None:
+                return
+            time.sleep(0.1)
+        print(f"Worker pid {pid} did not stop in {timeout:.0f}s; killing")
+        try:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+
+    def rolling_restart(self):
+        """Replace workers one at a time so serving capacity never drops to zero."""
+        print("🔄 Rolling restart")
+        for slot in sorted(self.workers):
+            old_pid = self.workers[slot]["pid"]
+            if old_pid is None:
+                # Crashed and waiting out its back-off; it is re-forked from this master anyway
+                continue
+            if slot == 0 and self.num_workers > 1:
+                # Keep a single indexer: stop the old one before starting its replacement
+                self.workers[slot]["pid"] = None
+                self.stop(old_pid)
+                self.spawn(slot)
+                self.wait_ready(slot)
+            else:
+                # Start the replacement first, retire the old worker once it is ready
+                self.workers[slot]["pid"] = None
+                self.spawn(slot)
+                self.wait_ready(slot)
+                self.stop(old_pid)
+        print("🔄 Rolling restart complete")
+
+    def shutdown(self):
+        self.shutting_down = True
+        print("\n🛑 Stopping workers...")
+        for worker in self.workers.values():
+            try:
+                os.kill(worker["pid"], signal.SIGTERM)
+            except (ProcessLookupError, TypeError):
+                pass
+        for worker in self.workers.values():
+            if worker["pid"]:
+                self.stop(worker["pid"])
+        if self.indexer_sock is not None:
+            shutil.rmtree(os.path.dirname(os.environ.pop(INDEXER_SOCKET_ENV)), ignore_errors=True)
+        print("Server stopped.")
+
+    # ---- main loop ----
+
+    def run(self):
+        self.preload()
+        self.bind()
+
+        signal.signal(signal.SIGHUP, lambda *_: setattr(self, "restart_requested", True))
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, "shutting_down", True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, "shutting_down", True))
+
+        for slot in range(self.num_workers):
+            self.spawn(slot)
+        for slot in range(self.num_workers):
+            self.wait_ready(slot)
+        print(f"🚀 Serving on http://{self.host}:{self.port} with {self.num_workers} worker(s)")
+
+        while not self.shutting_down:
+            if self.restart_requested:
+                self.restart_requested = False
+                self.rolling_restart()
+            self.reap()
+            self.respawn_due()
+            self.poll_ready()
+            time.sleep(0.5)
+
+        self.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Neethi pre-forking production server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        sys.exit("backend.server needs a POSIX system (fork); use `python -m backend.main` instead.")
+
+    Master(args.host, args.port, max(1, args.workers)).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,9 @@ Mock data, eligibility rules, and helper functions for interactive features
 from typing import Dict, List, Optional
 from pydantic import BaseModel
 from datetime import datetime, timedelta
-import random
+
+from backend.utils.lawyer_directory import DEFAULT_PAGE_SIZE, LawyerDirectory, load_lawyers
+from backend.utils.matching import MAX_OPEN_TICKETS_PER_CLIENT, MatchingEngine, TicketLimit
 
 # ===============================
 # TELE-LAW MOCK DATA
@@ -18,6 +20,7 @@ MOCK_LAWYERS = [
         "name": "Adv. Priya Sharma",
         "specialization": "Family Law",
         "languages": ["Hindi", "English"],
+        "state": "Delhi",
         "experience_years": 12,
         "rating": 4.8,
         "available": True,
@@ -29,6 +32,7 @@ MOCK_LAWYERS = [
         "name": "Adv. Rajesh Kumar",
         "specialization": "Criminal Law",
         "languages": ["Hindi", "Punjabi", "English"],
+        "state": "Punjab",
         "experience_years": 18,
         "rating": 4.9,
         "available": True,
@@ -40,6 +44,7 @@ MOCK_LAWYERS = [
         "name": "Adv. Sunita Devi",
         "specialization": "Property & Land Disputes",
         "languages": ["Hindi", "Bhojpuri"],
+        "state": "Bihar",
         "experience_years": 8,
         "rating": 4.6,
         "available": False,
@@ -51,6 +56,7 @@ MOCK_LAWYERS = [
         "name": "Adv. Mohammed Farid",
         "specialization": "Labour Law",
         "languages": ["Hindi", "Urdu", "English"],
+        "state": "Uttar Pradesh",
         "experience_years": 15,
         "rating": 4.7,
         "available": True,
@@ -62,6 +68,7 @@ MOCK_LAWYERS = [
         "name": "Adv. Lakshmi Iyer",
         "specialization": "Consumer Protection",
         "languages": ["Tamil", "English", "Hindi"],
+        "state": "Tamil Nadu",
         "experience_years": 10,
         "rating": 4.5,
         "available": False,
@@ -70,41 +77,80 @@ MOCK_LAWYERS = [
     }
 ]
 
-def get_available_lawyers(specialization: Optional[str] = None) -> List[Dict]:
-    """Get list of lawyers, optionally filtered by specialization."""
-    lawyers = MOCK_LAWYERS.copy()
-    
-    if specialization:
-        lawyers = [l for l in lawyers if specialization.lower() in l["specialization"].lower()]
-    
-    # Randomize availability slightly for realism
-    for lawyer in lawyers:
-        if not lawyer["available"]:
-            lawyer["next_available"] = f"{random.randint(1, 5)}:{random.choice(['00', '15', '30', '45'])} PM"
-    
-    return lawyers
+_directory: Optional[LawyerDirectory] = None
 
-def simulate_lawyer_connection(lawyer_id: str) -> Dict:
-    """Simulate connecting to a lawyer via Tele-Law."""
-    lawyer = next((l for l in MOCK_LAWYERS if l["id"] == lawyer_id), None)
-    
-    if not lawyer:
-        return {"success": False, "message": "Lawyer not found"}
-    
-    if not lawyer["available"]:
+def get_lawyer_directory() -> LawyerDirectory:
+    """The indexed lawyer directory, built on first use."""
+    global _directory
+    if _directory is None:
+        _directory = LawyerDirectory(load_lawyers(MOCK_LAWYERS))
+    return _directory
+
+def get_available_lawyers(
+    specialization: Optional[str] = None,
+    language: Optional[str] = None,
+    state: Optional[str] = None,
+    available: Optional[bool] = None,
+    page: int = 1,
+    page_size: int = DEFAULT_PAGE_SIZE
+) -> Dict:
+    """Get a page of lawyers, best rated first, optionally filtered."""
+    return get_lawyer_directory().search(specialization, language, state, available, page, page_size)
+
+_engine: Optional[MatchingEngine] = None
+
+def get_matching_engine() -> MatchingEngine:
+    """The Tele-Law consultation queue (event loop thread only), built on first use."""
+    global _engine
+    if _engine is None:
+        _engine = MatchingEngine(get_lawyer_directory())
+    return _engine
+
+def _connection_result(engine: MatchingEngine, ticket) -> Dict:
+    status = engine.snapshot(ticket)
+    if ticket.status == "connected":
         return {
-            "success": False,
-            "message": f"Lawyer is currently busy. Next available at {lawyer['next_available']}",
-            "queue_position": random.randint(1, 5)
+            "success": True,
+            "message": f"Connecting you with {status['lawyer_name']}...",
+            **status,
+            "estimated_wait": "Connecting now"
         }
-    
+    minutes = max(1, round(status["estimated_wait_seconds"] / 60))
     return {
-        "success": True,
-        "message": f"Connecting you with {lawyer['name']}...",
-        "session_id": f"TL{datetime.now().strftime('%Y%m%d%H%M%S')}",
-        "estimated_wait": "30 seconds"
+        "success": False,
+        "message": f"All matching lawyers are busy. You are number {status['position']} in the queue "
+                   f"(about {minutes} min). We will connect you as soon as a lawyer is free.",
+        **status,
+        "estimated_wait": f"{minutes} minutes",
+        "events_url": f"/tele-law/queue/{ticket.id}/events"
     }
 
+_TICKET_LIMIT_MESSAGE = (f"You already have {MAX_OPEN_TICKETS_PER_CLIENT} open consultation requests. "
+                         "End a consultation or leave a queue before starting another.")
+
+def simulate_lawyer_connection(lawyer_id: str, client: Optional[str] = None) -> Dict:
+    """Connect to a specific lawyer via Tele-Law, or join their queue if they are busy."""
+    engine = get_matching_engine()
+    try:
+        ticket = engine.request(lawyer_id=lawyer_id, client=client)
+    except KeyError:
+        return {"success": False, "message": "Lawyer not found"}
+    except TicketLimit:
+        return {"success": False, "message": _TICKET_LIMIT_MESSAGE}
+    return _connection_result(engine, ticket)
+
+def connect_any_lawyer(specialization: Optional[str] = None, language: Optional[str] = None,
+                       client: Optional[str] = None) -> Dict:
+    """Connect to the first free lawyer matching the filters, or join the matching queue."""
+    engine = get_matching_engine()
+    try:
+        ticket = engine.request(specialization=specialization, language=language, client=client)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    except TicketLimit:
+        return {"success": False, "message": _TICKET_LIMIT_MESSAGE}
+    return _connection_result(engine, ticket)
+
 
 # ===============================
 # NALSA ELIGIBILITY RULES
@@ -180,6 +226,11 @@ def check_legal_aid_eligibility(request: EligibilityRequest) -> Dict:
         eligible = True
         reasons.append("Persons in custody are entitled to free legal aid under Section 12(g)")
     
+    category = (request.category or "").strip().lower()
+    if category in PRIORITY_CATEGORIES:
+        eligible = True
+        reasons.append(f"The '{category}' category is entitled to free legal aid under Section 12 of LSA Act")
+    
     # Check income eligibility if not already eligible
     if not eligible:
         if request.annual_income <= NALSA_INCOME_LIMITS["general"]:
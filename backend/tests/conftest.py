@@ -0,0 +1,15 @@
+import pytest
+
+from backend.utils import case_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """An empty case store in a temporary directory."""
+    monkeypatch.setattr(case_store, "CASE_STORE_PATH", str(tmp_path / "cases.db"))
+    case_store._local.conn = None
+    yield case_store
+    conn = getattr(case_store._local, "conn", None)
+    if conn is not None:
+        conn.close()
+    case_store._local.conn = None
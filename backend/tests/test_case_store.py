@@ -0,0 +1,89 @@
+import pytest
+
+from backend.utils import case_store
+
+
+def case(cnr, **fields):
+    return {"cnr": cnr, "case_type": "Civil Suit", "status": "Pending", "filing_date": "2023-04-10", **fields}
+
+
+def counts(store):
+    rows = store._connect().execute(
+        "SELECT state, court_level, category, pending, SUM(count) FROM case_counts "
+        "GROUP BY state, court_level, category, pending HAVING SUM(count) > 0"
+    ).fetchall()
+    return {row[:4]: row[4] for row in rows}
+
+
+def test_parse_cnr():
+    codes = case_store.parse_cnr(" dlct010012342023 ")
+    assert codes == {"cnr": "DLCT010012342023", "state": "DL", "district": "CT", "establishment": "01",
+                     "serial": "001234", "year": 2023}
+    assert case_store.parse_cnr("DLCT01") is None
+    assert case_store.parse_cnr("DLCT010012341899") is None
+
+
+def test_upsert_reports_changed_and_skipped_records(store):
+    result = store.upsert_cases([case("DLCT010000012023"), case("DLCT010000022023"), {"cnr": "bad"}, {}])
+    assert result == {"changed": 2, "skipped": 2}
+
+    # Unchanged records are not rewritten; modified ones are
+    result = store.upsert_cases([case("DLCT010000012023"), case("DLCT010000022023", status="Disposed")])
+    assert result == {"changed": 1, "skipped": 0}
+    assert store.get_case("dlct010000022023")["status"] == "Disposed"
+    assert store.get_case("DLCT010000992023") is None
+
+
+def test_counters_follow_inserts_updates_and_deletes(store):
+    store.upsert_cases([
+        case("DLCT010000012023"),
+        case("DLCT010000022023", case_type="Bail Application"),
+        case("MHHC010000012022", court="Bombay High Court"),
+    ])
+    assert counts(store) == {
+        ("DL", "district", "civil", 1): 1,
+        ("DL", "district", "criminal", 1): 1,
+        ("MH", "high_court", "civil", 1): 1,
+    }
+
+    store.upsert_cases([case("DLCT010000012023", status="Disposed", disposal_date="2024-01-15")])
+    assert counts(store)[("DL", "district", "civil", 0)] == 1
+    assert ("DL", "district", "civil", 1) not in counts(store)
+
+    assert store.delete_cases(["MHHC010000012022"]) == 1
+    assert ("MH", "high_court", "civil", 1) not in counts(store)
+
+    # The rebuilt counters match the ones the triggers kept
+    before = counts(store)
+    store.rebuild_counts()
+    assert counts(store) == before
+
+
+def test_prefix_queries_page_in_cnr_order(store):
+    cnrs = [f"DLCT01{n:06d}2023" for n in range(1, 6)] + ["DLNW010000012023", "DMCT010000012023"]
+    store.upsert_cases([case(cnr) for cnr in cnrs])
+
+    assert store.count_with_prefix("DL") == 6
+    assert store.count_with_prefix("dlct01") == 5
+    assert store.count_with_prefix("") == 0
+
+    first = store.cases_with_prefix("DLCT", limit=3)
+    assert [c["cnr"] for c in first] == cnrs[:3]
+    rest = store.cases_with_prefix("DLCT", limit=3, after=first[-1]["cnr"])
+    assert [c["cnr"] for c in rest] == cnrs[3:5]
+    assert all("synced_at" in c for c in first + rest)
+
+    assert set(store.get_cases([cnrs[0], cnrs[-1].lower(), "DLCT019999992023"])) == {cnrs[0], cnrs[-1]}
+
+
+def test_live_lookups_are_not_stored(store, monkeypatch):
+    pytest.importorskip("chromadb")   # backend.main serves stubs without the vector store
+    from fastapi.testclient import TestClient
+
+    from backend import main
+
+    monkeypatch.setattr(main, "scrape_case_status", lambda cnr: {"cnr": cnr, "case_status": "Pending",
+                                                                 "source": "ecourts_live"})
+    response = TestClient(main.app).get("/case-status/DLCT010000012023").json()
+    assert response["source"] == "live"
+    assert store.is_empty()
@@ -0,0 +1,89 @@
+from backend.utils import indexer_route, rate_limit
+from backend.utils.worker import INDEXER_ENV, INDEXER_SOCKET_ENV
+
+
+def test_only_other_workers_forward_tele_law(monkeypatch):
+    monkeypatch.setenv(INDEXER_SOCKET_ENV, "/tmp/neethi-test/indexer.sock")
+    monkeypatch.setenv(INDEXER_ENV, "0")
+    assert indexer_route.should_forward("/tele-law/queue/abc/events")
+    assert indexer_route.should_forward("/tele-law")
+    assert not indexer_route.should_forward("/tele-lawyers")
+    assert not indexer_route.should_forward("/chat")
+
+    monkeypatch.setenv(INDEXER_ENV, "1")
+    assert not indexer_route.should_forward("/tele-law/connect")
+
+
+def test_single_process_does_not_forward(monkeypatch):
+    monkeypatch.delenv(INDEXER_SOCKET_ENV, raising=False)
+    monkeypatch.setenv(INDEXER_ENV, "0")
+    assert not indexer_route.should_forward("/tele-law/connect")
+
+
+def test_forwarded_requests_are_recognised_by_socket(monkeypatch):
+    monkeypatch.setenv(INDEXER_SOCKET_ENV, "/tmp/neethi-test/indexer.sock")
+    assert indexer_route.is_forwarded({"server": ("/tmp/neethi-test/indexer.sock", None)})
+    assert not indexer_route.is_forwarded({"server": ("127.0.0.1", 8000)})
+    assert not indexer_route.is_forwarded({})
+
+
+def front_app(monkeypatch, indexer_transport):
+    """A non-indexer worker whose indexer is reached through the given transport."""
+    import httpx
+    from fastapi import FastAPI
+
+    monkeypatch.setenv(INDEXER_SOCKET_ENV, "/tmp/neethi-test/indexer.sock")
+    monkeypatch.setenv(INDEXER_ENV, "0")
+    monkeypatch.setitem(indexer_route._client, "client",
+                        httpx.AsyncClient(transport=indexer_transport, base_url="http://indexer"))
+
+    app = FastAPI()
+    app.add_middleware(indexer_route.IndexerRouteMiddleware)
+
+    @app.post("/tele-law/{path:path}")
+    async def local():
+        return {"served_by": "front"}
+
+    @app.get("/chat")
+    async def chat():
+        return {"served_by": "front"}
+
+    return app
+
+
+def test_tele_law_requests_are_relayed_to_the_indexer(monkeypatch):
+    import httpx
+    from fastapi import FastAPI, Request
+    from fastapi.testclient import TestClient
+
+    # The indexer sees forwarded requests as coming in over its socket
+    monkeypatch.setattr(indexer_route, "is_forwarded", lambda scope: scope["server"][0] == "indexer")
+    indexer = FastAPI()
+
+    @indexer.post("/tele-law/{path:path}")
+    async def queue(path: str, request: Request):
+        return {"served_by": "indexer", "path": path, "query": request.url.query,
+                "body": (await request.body()).decode(), "origin": request.headers.get("origin"),
+                "auth": request.headers.get("authorization"), "client": rate_limit.client_key(request.scope)}
+
+    client = TestClient(front_app(monkeypatch, httpx.ASGITransport(app=indexer)))
+    response = client.post("/tele-law/connect?lang=hi", content=b'{"issue": "rent"}',
+                           headers={"Origin": "http://localhost:5173", "Authorization": "Bearer t",
+                                    "X-Neethi-Client": "ip:spoofed"})
+    assert response.status_code == 200
+    assert response.json() == {"served_by": "indexer", "path": "connect", "query": "lang=hi",
+                               "body": '{"issue": "rent"}', "origin": None, "auth": "Bearer t",
+                               "client": "ip:testclient"}
+    assert client.get("/chat").json() == {"served_by": "front"}
+
+
+def test_unreachable_indexer_answers_503(monkeypatch):
+    import httpx
+    from fastapi.testclient import TestClient
+
+    def refuse(request):
+        raise httpx.ConnectError("indexer restarting", request=request)
+
+    client = TestClient(front_app(monkeypatch, httpx.MockTransport(refuse)))
+    response = client.post("/tele-law/connect", json={})
+    assert response.status_code == 503
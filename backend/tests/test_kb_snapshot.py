@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from backend.utils import kb_snapshot
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(50, 16)).astype(np.float32)
+    ids = [f"doc_{i}" for i in range(50)]
+    documents = [f"Section {i} — निःशुल्क विधिक सहायता" for i in range(50)]
+    metadatas = [{"source": "test", "n": i} for i in range(50)]
+    return ids, documents, metadatas, vectors
+
+
+@pytest.mark.parametrize("dtype, tolerance", [("int8", 0.05), ("float16", 0.005)])
+def test_round_trip(tmp_path, corpus, dtype, tolerance):
+    ids, documents, metadatas, vectors = corpus
+    path = kb_snapshot.write_snapshot(str(tmp_path / f"kb.{dtype}.kbsnap"), ids, documents, metadatas,
+                                      vectors, dtype=dtype)
+    snapshot = kb_snapshot.Snapshot(path)
+
+    assert (snapshot.count, snapshot.dim, snapshot.dtype.name) == (50, 16, dtype)
+    assert snapshot.record(7) == {"id": "doc_7", "content": documents[7], "metadata": {"source": "test", "n": 7}}
+
+    query = vectors[7] + 0.01
+    expected = ((vectors - query) ** 2).sum(axis=1)
+    np.testing.assert_allclose(snapshot.distances(query), expected, rtol=tolerance, atol=tolerance)
+
+    results = snapshot.search(query, n_results=3)
+    assert results[0]["id"] == "doc_7"
+    assert [r["distance"] for r in results] == sorted(r["distance"] for r in results)
+    assert len(snapshot.search(query, n_results=100)) == 50
+
+
+def test_search_blocks_match_a_single_pass(tmp_path, corpus, monkeypatch):
+    ids, documents, metadatas, vectors = corpus
+    snapshot = kb_snapshot.Snapshot(kb_snapshot.write_snapshot(str(tmp_path / "kb.kbsnap"), ids, documents,
+                                                               metadatas, vectors, dtype="float16"))
+    whole = snapshot.distances(vectors[0])
+    monkeypatch.setattr(kb_snapshot, "SEARCH_BLOCK_ROWS", 7)
+    np.testing.assert_allclose(snapshot.distances(vectors[0]), whole, rtol=1e-6, atol=1e-6)
+
+
+def test_open_snapshot_rejects_other_files(tmp_path):
+    other = tmp_path / "other.kbsnap"
+    other.write_bytes(b"not a snapshot" * 10)
+    assert kb_snapshot.open_snapshot(str(other)) is None
+    assert kb_snapshot.open_snapshot(str(tmp_path / "missing.kbsnap")) is None
+    assert kb_snapshot.open_snapshot(None) is None
+    with pytest.raises(ValueError):
+        kb_snapshot.write_snapshot(str(tmp_path / "kb.kbsnap"), [], [], [], np.zeros((0, 4)), dtype="int4")
@@ -0,0 +1,61 @@
+import itertools
+import json
+
+import pytest
+
+from backend import legal_aid_batch
+from backend.services import EligibilityRequest, check_legal_aid_eligibility
+
+APPLICANTS = [
+    dict(annual_income=income, category=category, case_type=case_type, state="Tamil Nadu",
+         is_woman=woman, is_in_custody=custody)
+    for income, category, case_type, woman, custody in itertools.product(
+        [0, 300000, 300001, 400000], ["general", "child", " Industrial_Worker ", "student"],
+        ["civil", "Family Matrimonial", "tax"], [False, True], [False, True])
+]
+
+
+def test_batch_matches_single_check():
+    columns = legal_aid_batch.record_columns(APPLICANTS)
+    result = legal_aid_batch.RULES.evaluate(columns)
+
+    expected = [check_legal_aid_eligibility(EligibilityRequest(**a))["eligible"] for a in APPLICANTS]
+    assert result["eligible"].tolist() == expected
+
+
+def test_category_grants_eligibility_in_single_check():
+    request = EligibilityRequest(annual_income=400000, category="child", case_type="civil", state="Delhi")
+    assert check_legal_aid_eligibility(request)["eligible"]
+
+
+@pytest.mark.parametrize("income", [True, False, None, "", "abc"])
+def test_invalid_incomes_are_rejected(income):
+    columns = legal_aid_batch.ndjson_columns(
+        [json.dumps({"annual_income": income, "case_type": "civil"})])
+    result = legal_aid_batch.RULES.evaluate(columns)
+    assert result["basis"].tolist() == [legal_aid_batch.BASIS_INVALID]
+    assert not result["eligible"][0]
+
+
+def test_screener_streams_csv_in_batches():
+    screener = legal_aid_batch.BatchScreener("csv")
+    splitter = legal_aid_batch.LineSplitter()
+    data = b"id,annual_income,category,state\na,100,general,Delhi\nb,500000,child,Delhi\nc,500000,,Goa\n"
+    out = "".join(screener.feed(splitter.feed(data[i:i + 7])) for i in range(0, len(data), 7))
+    out += screener.feed(splitter.close())
+
+    rows = [json.loads(line) for line in out.splitlines()]
+    assert [(r["id"], r["eligible"]) for r in rows] == [("a", True), ("b", True), ("c", False)]
+
+
+def test_check_endpoint_accepts_the_category():
+    pytest.importorskip("chromadb")   # backend.main serves stubs without the vector store
+    from fastapi.testclient import TestClient
+
+    from backend.main import app
+
+    client = TestClient(app)
+    applicant = {"annual_income": 400000, "case_type": "civil", "state": "Delhi"}
+    assert not client.post("/legal-aid/check", json=applicant).json()["eligible"]
+    response = client.post("/legal-aid/check", json={**applicant, "category": "industrial_worker"}).json()
+    assert response["success"] and response["eligible"]
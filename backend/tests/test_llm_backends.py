@@ -0,0 +1,38 @@
+import requests
+
+from backend.utils import llm_backends
+from backend.utils.deadline import Deadline
+
+
+class SlowBackend(llm_backends.StubBackend):
+    """Answers its health check only after the timeout it was given has run out."""
+
+    def __init__(self):
+        super().__init__()
+        self.timeouts = []
+
+    def check(self, timeout):
+        self.timeouts.append(timeout)
+        raise requests.Timeout()
+
+
+def test_availability_checks_stay_within_the_deadline():
+    backend = SlowBackend()
+    router = llm_backends.ModelRouter([llm_backends.Route("main", backend)])
+
+    assert router.choose("general", "question", Deadline(0.5)) is None
+    assert backend.timeouts and backend.timeouts[-1] <= 0.5
+    # A check cut short by a deadline is not remembered as the backend being down
+    assert router.routes[0]._available is None
+
+    expired = Deadline(0)
+    assert router.choose("general", "question", expired) is None
+    assert len(backend.timeouts) == 1
+
+
+def test_expired_deadline_uses_the_last_check():
+    route = llm_backends.Route("main", llm_backends.StubBackend())
+    router = llm_backends.ModelRouter([route])
+    assert router.choose("general", "question") is route
+    route._checked_at -= llm_backends.AVAILABILITY_TTL + 1
+    assert router.choose("general", "question", Deadline(0)) is route
@@ -0,0 +1,44 @@
+import pytest
+
+from backend.utils.lawyer_directory import LawyerDirectory
+from backend.utils.matching import MAX_OPEN_TICKETS_PER_CLIENT, MatchingEngine, TicketLimit
+
+
+def lawyer(lawyer_id, available=True):
+    return {"id": lawyer_id, "name": f"Adv. {lawyer_id}", "specialization": "Family Law", "languages": ["Hindi"],
+            "state": "Delhi", "experience_years": 5, "rating": 4.0, "available": available,
+            "next_available": None, "profile_image": ""}
+
+
+@pytest.fixture
+def engine():
+    return MatchingEngine(LawyerDirectory([lawyer("LAW001"), lawyer("LAW002", available=False)]))
+
+
+def test_open_tickets_are_capped_per_client(engine):
+    tickets = [engine.request(lawyer_id="LAW002", client="ip:1") for _ in range(MAX_OPEN_TICKETS_PER_CLIENT)]
+    with pytest.raises(TicketLimit):
+        engine.request(specialization="family", client="ip:1")
+    # Other clients are not affected
+    assert engine.request(lawyer_id="LAW002", client="ip:2").status == "waiting"
+
+    assert engine.cancel(tickets[0].id)
+    assert engine.request(lawyer_id="LAW002", client="ip:1").status == "waiting"
+
+
+def test_ending_a_session_frees_the_lawyer_and_the_clients_slot(engine):
+    connected = engine.request(lawyer_id="LAW001", client="ip:1")
+    waiting = [engine.request(lawyer_id="LAW001", client="ip:1") for _ in range(MAX_OPEN_TICKETS_PER_CLIENT - 1)]
+    assert connected.status == "connected" and all(t.status == "waiting" for t in waiting)
+    with pytest.raises(TicketLimit):
+        engine.request(lawyer_id="LAW001", client="ip:1")
+
+    # The lawyer moves on to the next waiting ticket; the ended one no longer counts
+    assert engine.end_session(connected.session_id)
+    assert waiting[0].status == "connected"
+    assert engine.request(lawyer_id="LAW001", client="ip:1").status == "waiting"
+    assert engine.get_stats()["completed"] == 1
+
+    engine.end_session(waiting[0].session_id)
+    engine.sweep()
+    assert len(engine.client_tickets["ip:1"]) == MAX_OPEN_TICKETS_PER_CLIENT - 1
@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import pytest
+
+from backend.utils.njdg_cube import NJDGCube
+
+
+def months_ago(months):
+    index = datetime.now().year * 12 + datetime.now().month - 1 - months
+    return f"{index // 12}-{index % 12 + 1:02d}-15"
+
+
+@pytest.fixture
+def cube(store):
+    store.upsert_cases([
+        {"cnr": "DLCT010000012020", "case_type": "Civil Suit", "status": "Pending", "filing_date": months_ago(1)},
+        {"cnr": "DLCT010000022020", "case_type": "Bail Application", "status": "Pending", "filing_date": months_ago(30)},
+        {"cnr": "MHHC010000012010", "case_type": "Writ Petition", "status": "Pending", "filing_date": months_ago(180),
+         "court_level": "high_court"},
+        {"cnr": "DLCT010000032020", "case_type": "Civil Suit", "status": "Disposed", "filing_date": months_ago(2),
+         "disposal_date": months_ago(1)},
+    ])
+    cube = NJDGCube()
+    assert cube.refresh()
+    yield cube
+    cube._conn.close()
+
+
+def test_stats_over_all_cases(cube):
+    stats = cube.stats()
+    assert stats["total_pending_cases"] == 3
+    assert stats["district_courts"] == {"pending": 2, "civil": 1, "criminal": 1}
+    assert stats["high_courts"] == {"pending": 1, "civil": 1, "criminal": 0}
+    assert stats["age_wise"] == {"under_1_year": 1, "1_to_3_years": 1, "3_to_5_years": 0,
+                                 "5_to_10_years": 0, "above_10_years": 1}
+    assert stats["disposal_rate"]["disposal_percentage"] == 50.0
+    assert stats["pending_by_state"] == {"Delhi": 2, "Maharashtra": 1}
+    assert stats["top_states"][0] == {"name": "Delhi", "pending": 2}
+
+
+def test_stats_filters(cube):
+    assert cube.stats(state="Maharashtra")["total_pending_cases"] == 1
+    assert cube.stats(state="dl", case_type="Criminal")["total_pending_cases"] == 1
+    assert cube.stats(court="hc")["total_pending_cases"] == 1
+    assert cube.stats(state="DL", court="high court")["total_pending_cases"] == 0
+    for bad in ({"state": "Atlantis"}, {"case_type": "family"}, {"court": "supreme"}):
+        with pytest.raises(ValueError):
+            cube.stats(**bad)
+
+
+def test_refresh_reloads_only_after_a_write(cube, store):
+    assert not cube.refresh()
+    store.upsert_cases([{"cnr": "DLCT010000012020", "case_type": "Civil Suit", "status": "Disposed",
+                         "filing_date": months_ago(1), "disposal_date": months_ago(0)}])
+    assert cube.refresh()
+    assert cube.stats()["total_pending_cases"] == 2
+
+
+def test_implausible_dates_do_not_stretch_the_month_axis(cube, store):
+    months = cube._cube[2].shape[3]
+    result = store.upsert_cases([
+        {"cnr": "DLCT010000042020", "case_type": "Civil Suit", "status": "Pending", "filing_date": "1000-01-15"},
+        {"cnr": "DLCT010000052020", "case_type": "Civil Suit", "status": "Pending", "filing_date": "2020-13-01"},
+        {"cnr": "DLCT010000012099", "case_type": "Civil Suit", "status": "Pending"},
+    ])
+    assert result == {"changed": 2, "skipped": 1}
+    assert cube.refresh()
+    # Both fall back to the CNR's filing year (2020), already inside the axis
+    assert cube._cube[2].shape[3] == months
+    assert cube.stats()["total_pending_cases"] == 5
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from backend.utils import njdg_history
+
+
+def test_flatten_stats_slugifies_multi_word_keys():
+    stats = {"total_pending_cases": 10, "pending_by_state": {"Tamil Nadu": 5, "Jammu & Kashmir": 2, "Delhi": 1},
+             "live": True, "note": "text"}
+    assert njdg_history.flatten_stats(stats) == {
+        "total_pending_cases": 10.0,
+        "pending_by_state.tamil_nadu": 5.0,
+        "pending_by_state.jammu_kashmir": 2.0,
+        "pending_by_state.delhi": 1.0,
+    }
+
+
+def test_append_drops_rows_left_by_a_crashed_append(tmp_path):
+    tier = njdg_history.Tier(str(tmp_path), "raw", 0, 86400)
+    tier.append(np.array([100, 200]), {"a": np.array([1.0, 2.0]), "b": np.array([10.0, 20.0])})
+    # A crash after writing a metric column but before the timestamps
+    with open(tier._file("a"), "ab") as f:
+        np.array([99.0]).tofile(f)
+
+    tier.append(np.array([300]), {"a": np.array([3.0]), "b": np.array([30.0])})
+    timestamps, columns = tier.read(["a", "b"], 0, 1000)
+    assert timestamps.tolist() == [100, 200, 300]
+    assert columns["a"].tolist() == [1.0, 2.0, 3.0]
+    assert columns["b"].tolist() == [10.0, 20.0, 30.0]
+
+
+def test_append_pads_metrics_that_appear_later(tmp_path):
+    tier = njdg_history.Tier(str(tmp_path), "raw", 0, 86400)
+    tier.append(np.array([100]), {"a": np.array([1.0])})
+    tier.append(np.array([200]), {"b": np.array([2.0])})
+    _, columns = tier.read(["a", "b"], 0, 1000)
+    assert np.isnan(columns["a"][1]) and columns["a"][0] == 1.0
+    assert np.isnan(columns["b"][0]) and columns["b"][1] == 2.0
+
+
+def test_record_rolls_completed_buckets_up_into_means(tmp_path):
+    store = njdg_history.HistoryStore(str(tmp_path))
+    day = 19676 * 86400
+    store.record({"a": 1.0}, day)
+    store.record({"a": 3.0}, day + 1800)
+    store.record({"a": 10.0, "b": 4.0}, day + 3600)     # completes the first hour
+    store.record({"a": 20.0}, day + 5400)
+    assert store.tier("hourly").read(["a"], 0, day * 2)[1]["a"].tolist() == [2.0]
+    assert store.tier("daily").last_timestamp() is None
+
+    store.record({"a": 7.0}, day + 86400)               # completes the day
+    timestamps, columns = store.tier("hourly").read(["a", "b"], 0, day * 2)
+    assert timestamps.tolist() == [day, day + 3600]
+    assert columns["a"].tolist() == [2.0, 15.0]
+    assert np.isnan(columns["b"][0]) and columns["b"][1] == 4.0
+
+    timestamps, columns = store.tier("daily").read(["a", "b"], 0, day * 2)
+    assert timestamps.tolist() == [day]
+    assert columns["a"].tolist() == [8.5] and columns["b"].tolist() == [4.0]
+
+    series = store.query(["a"], day, day + 86400, resolution="hourly")
+    assert series == {"resolution": "hourly", "series": {"a": [[day, 2.0], [day + 3600, 15.0]]}}
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", "Infinity", "yesterday"])
+def test_parse_time_rejects_non_times(value):
+    with pytest.raises(ValueError):
+        njdg_history.parse_time(value, 0)
+
+
+def test_parse_time():
+    assert njdg_history.parse_time("1700000000.5", 0) == 1700000000.5
+    assert njdg_history.parse_time(None, 42) == 42
+    assert njdg_history.parse_time("2024-01-01", 0) == datetime(2024, 1, 1).timestamp()
+
+
+def test_history_endpoint_answers_400_for_non_finite_times():
+    pytest.importorskip("chromadb")   # backend.main serves stubs without the vector store
+    from fastapi.testclient import TestClient
+
+    from backend.main import app
+
+    client = TestClient(app)
+    for query in ("start=nan", "end=inf", "start=-inf&end=0"):
+        assert client.get(f"/njdg/stats/history?metric=total_pending_cases&{query}").status_code == 400
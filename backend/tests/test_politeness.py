@@ -0,0 +1,32 @@
+import pytest
+
+from backend.utils import politeness
+from backend.utils.worker import WORKER_ID_ENV, worker_share
+
+POLICY = {"rate_limit": 1.0, "burst": 2, "max_concurrency": 1, "max_queue_wait": 0.1, "max_queued": 8}
+
+
+@pytest.mark.parametrize("total, share", [(1, 2), (2, 2), (3, 2), (8, 3), (2, 4)])
+def test_worker_shares_add_up_to_the_total(monkeypatch, total, share):
+    parts = []
+    for worker in range(share):
+        monkeypatch.setenv(WORKER_ID_ENV, str(worker))
+        parts.append(worker_share(total, share))
+    assert sum(parts) == total
+    assert max(parts) - min(parts) <= 1
+
+
+def test_single_slot_host_is_fetched_by_one_worker_only(monkeypatch):
+    schedulers = []
+    for worker in range(3):
+        monkeypatch.setenv(WORKER_ID_ENV, str(worker))
+        schedulers.append(politeness.HostScheduler("njdg.example", POLICY, share=3))
+
+    assert [s.slots for s in schedulers] == [1, 0, 0]
+    assert schedulers[0].rate == POLICY["rate_limit"]
+    with schedulers[0].slot():
+        pass
+    with pytest.raises(politeness.HostBusy):
+        with schedulers[1].slot():
+            pass
+    assert schedulers[1].stats["rejected"] == 1
@@ -0,0 +1,54 @@
+import asyncio
+
+from backend.utils import rate_limit
+from backend.utils.worker import WORKER_ID_ENV
+
+POLICY = {"rate_limit": 100.0, "burst": 100, "max_concurrency": 2, "max_per_client": 1,
+          "max_queue_wait": 1.0, "max_queued": 16}
+
+
+def test_only_the_overall_cap_is_split(monkeypatch):
+    limiters = []
+    for worker in range(3):
+        monkeypatch.setenv(WORKER_ID_ENV, str(worker))
+        limiters.append(rate_limit.ClassLimiter("chat", POLICY, share=3))
+
+    assert [l.slots for l in limiters] == [1, 1, 1]
+    assert [l.max_per_client for l in limiters] == [1, 1, 1]
+    assert all(l.rate == 100.0 and l.burst == 100 for l in limiters)
+
+
+def test_every_worker_admits_each_class(monkeypatch):
+    monkeypatch.setenv(WORKER_ID_ENV, "1")
+    limiter = rate_limit.ClassLimiter("chat", POLICY, share=4)
+
+    asyncio.run(limiter.acquire("ip:1"))
+    assert limiter.get_stats()["admitted"] == 1
+
+
+def test_free_slots_go_to_the_client_with_fewest_in_progress():
+    limiter = rate_limit.ClassLimiter("chat", {**POLICY, "max_per_client": 2}, share=1)
+    granted = []
+
+    async def request(client):
+        await limiter.acquire(client)
+        granted.append(client)
+
+    async def scenario():
+        await request("ip:heavy")
+        await request("ip:other")
+        # Both slots are taken; the heavy client queues before the light one
+        waiting = [asyncio.ensure_future(request("ip:heavy")), asyncio.ensure_future(request("ip:light"))]
+        await asyncio.sleep(0)
+        assert limiter.get_stats()["waiting"] == 2
+
+        limiter.release("ip:other")
+        await asyncio.wait_for(waiting[1], 1)
+        assert granted[2:] == ["ip:light"] and not waiting[0].done()
+
+        limiter.release("ip:heavy")
+        await asyncio.gather(*waiting)
+        assert granted[2:] == ["ip:light", "ip:heavy"]
+
+    asyncio.run(scenario())
+    assert limiter.get_stats()["admitted"] == 4
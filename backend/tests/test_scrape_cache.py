@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+from backend.utils import scrape_cache, web_scraper
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(scrape_cache, "CACHE_DB_PATH", str(tmp_path / "scrape_cache.sqlite3"))
+    monkeypatch.setattr(web_scraper, "_cache", {})
+    scrape_cache._local.conn = None
+    yield scrape_cache
+    scrape_cache._connect().close()
+    scrape_cache._local.conn = None
+
+
+def test_purge_removes_entries_not_revalidated(cache):
+    cache.store_response("old", "https://example.org/old", b"<html/>", ["old"])
+    cache.store_response("new", "https://example.org/new", b"<html/>", ["new"])
+    cache._connect().execute("UPDATE pages SET validated_at = ? WHERE cache_key = 'old'", (time.time() - 3600,))
+
+    assert cache.purge_older_than(600) == 1
+    assert cache.get_entry("old") is None
+    assert cache.get_entry("new")["parsed"] == ["new"]
+
+
+def test_case_status_page_is_cached_once_for_every_cnr(cache, monkeypatch):
+    page = b"<table id='caseDetails'><tr><td>Case Status</td><td>Pending</td></tr></table>"
+    fetches = []
+
+    class Response:
+        status_code = 200
+        content = page
+        headers = {}
+
+    def get(url, **kwargs):
+        fetches.append(url)
+        return Response()
+
+    monkeypatch.setattr(web_scraper.http_client, "get", get)
+    first = web_scraper.scrape_case_status("DLCT010000012023")
+    second = web_scraper.scrape_case_status("MHHC010000012022")
+
+    assert len(fetches) == 1
+    assert first["cnr"] == "DLCT010000012023" and second["cnr"] == "MHHC010000012022"
+    assert cache._connect().execute("SELECT cache_key FROM pages").fetchall() == [(web_scraper.CASE_STATUS_KEY,)]
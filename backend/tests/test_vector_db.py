@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip("chromadb")
+from backend.utils import vector_db  # noqa: E402
+
+
+class FakeCollection:
+    def __init__(self):
+        self.calls = []
+
+    def upsert(self, documents, ids, metadatas):
+        if len(set(ids)) != len(ids):
+            raise ValueError("duplicate ids in upsert")
+        self.calls.append((documents, ids, metadatas))
+
+
+def test_index_live_items_skips_duplicate_chunks(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(vector_db, "get_live_collection", lambda: collection)
+    items = [
+        {"source": "doj", "url": "https://doj.gov.in", "text": "New legal aid clinics opened."},
+        {"source": "doj", "url": "https://doj.gov.in", "text": "New legal aid clinics opened."},
+        {"source": "ecourts", "url": "https://ecourts.gov.in", "text": "New legal aid clinics opened."},
+    ]
+
+    assert vector_db.index_live_items(items, fetched_at=1000.0, ttl_seconds=60) == 2
+    documents, ids, metadatas = collection.calls[0]
+    assert len(ids) == 2 and all(i.startswith("live_") for i in ids)
+    assert [m["source"] for m in metadatas] == ["doj", "ecourts"]
+    assert metadatas[0]["expires_at"] == 1060.0
+
+
+def test_index_live_items_ids_are_stable(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(vector_db, "get_live_collection", lambda: collection)
+    item = {"source": "doj", "text": "Same text"}
+
+    vector_db.index_live_items([item])
+    vector_db.index_live_items([item])
+    assert collection.calls[0][1] == collection.calls[1][1]
@@ -0,0 +1,305 @@
+"""
+Retrieval Evaluation
+Runs the labelled query set against the retrieval stack in several
+configurations (embedding model x vector backend) and reports, for each,
+recall@k and MRR over the queries with an expected document, query latency
+percentiles, and the time and memory it took to build the index. Nothing
+is written to the served index: every configuration is built from
+knowledge_base.json into a temporary directory.
+
+Backends:
+    exact            float32 brute force (the reference ranking)
+    chroma           Chroma's HNSW index, as queried without a snapshot
+    snapshot-int8    memory-mapped int8 snapshot (utils/kb_snapshot.py)
+    snapshot-float16 memory-mapped float16 snapshot
+
+Each line of the labelled set is {"query": ..., "expected_id": ...} (or
+"expected_ids": [...] when several documents answer it); queries without
+one only count towards latency.
+
+The report is JSON (--output, default backend/data/eval/reports/) with the
+run's git commit, knowledge base and label hashes, so runs on the same data
+can be compared with --compare.
+
+Usage:
+    python -m backend.tools.eval_retrieval [--labels backend/data/eval/labelled_queries.jsonl]
+        [--models all-MiniLM-L6-v2,paraphrase-multilingual-MiniLM-L12-v2]
+        [--backends exact,chroma,snapshot-int8,snapshot-float16] [--k 1,2,3,5]
+        [--repeat 5] [--output report.json] [--compare previous.json]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from backend.tools.tune_answer_gate import DEFAULT_LABELS, load_labels
+from backend.utils import kb_snapshot
+from backend.utils.profiling import model_bytes, process_memory
+from backend.utils.vector_db import EMBEDDING_MODEL_NAME, KNOWLEDGE_BASE_PATH, kb_content_hash, load_kb_documents
+
+BACKENDS = ["exact", "chroma", "snapshot-int8", "snapshot-float16"]
+REPORTS_DIR = "backend/data/eval/reports"
+
+
+def _rss() -> int:
+    memory = process_memory()
+    return memory.get("rss_bytes", memory.get("peak_rss_bytes", 0))
+
+
+def _percentiles(seconds: List[float]) -> Dict[str, float]:
+    ms = np.array(seconds) * 1000
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 3), "p90_ms": round(float(np.percentile(ms, 90)), 3),
+            "p99_ms": round(float(np.percentile(ms, 99)), 3), "mean_ms": round(float(ms.mean()), 3)}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+# ===============================
+# BACKENDS
+# ===============================
+# Each builder indexes (ids, documents, metadatas, embeddings) and returns
+# (search(query_embedding, k) -> ranked ids, index bytes or None).
+
+def _build_exact(ids, documents, metadatas, embeddings, workdir):
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.einsum("ij,ij->i", vectors, vectors)
+
+    def search(query, k):
+        distances = norms - 2 * (vectors @ query) + float(query @ query)
+        return [ids[i] for i in np.argsort(distances, kind="stable")[:k]]
+    return search, vectors.nbytes
+
+
+def _build_chroma(ids, documents, metadatas, embeddings, workdir):
+    import chromadb
+    client = chromadb.PersistentClient(path=os.path.join(workdir, "chroma"))
+    collection = client.create_collection(name=f"eval_{time.monotonic_ns()}")
+    collection.add(ids=ids, documents=documents, metadatas=metadatas,
+                   embeddings=[list(map(float, e)) for e in embeddings])
+
+    def search(query, k):
+        return collection.query(query_embeddings=[list(map(float, query))], n_results=min(k, len(ids)))["ids"][0]
+    return search, None
+
+
+def _snapshot_builder(dtype: str):
+    def build(ids, documents, metadatas, embeddings, workdir):
+        path = kb_snapshot.write_snapshot(os.path.join(workdir, f"eval.{dtype}.kbsnap"), ids, documents, metadatas,
+                                          embeddings, dtype)
+        snapshot = kb_snapshot.Snapshot(path)
+
+        def search(query, k):
+            return [hit["id"] for hit in snapshot.search(query, k)]
+        return search, os.path.getsize(path)
+    return build
+
+
+BUILDERS = {
+    "exact": _build_exact,
+    "chroma": _build_chroma,
+    "snapshot-int8": _snapshot_builder("int8"),
+    "snapshot-float16": _snapshot_builder("float16"),
+}
+
+
+# ===============================
+# EVALUATION
+# ===============================
+
+def _relevant(label: Dict) -> List[str]:
+    if label.get("expected_ids"):
+        return list(label["expected_ids"])
+    return [label["expected_id"]] if label.get("expected_id") else []
+
+
+def quality(rankings: List[List[str]], labels: List[Dict], ks: List[int]) -> Dict:
+    """recall@k (share of answerable queries with a relevant document in the top k) and MRR."""
+    answerable = [(ranking, set(_relevant(label))) for ranking, label in zip(rankings, labels) if _relevant(label)]
+    result = {"answerable": len(answerable)}
+    for k in ks:
+        hits = sum(1 for ranking, relevant in answerable if relevant & set(ranking[:k]))
+        result[f"recall@{k}"] = round(hits / len(answerable), 4) if answerable else None
+    reciprocal = []
+    for ranking, relevant in answerable:
+        rank = next((i + 1 for i, doc_id in enumerate(ranking) if doc_id in relevant), None)
+        reciprocal.append(1 / rank if rank else 0.0)
+    result["mrr"] = round(float(np.mean(reciprocal)), 4) if reciprocal else None
+    return result
+
+
+def load_model(name: str):
+    """The embedding function for a model, with its load time and memory."""
+    from chromadb.utils import embedding_functions
+    before, started = _rss(), time.perf_counter()
+    function = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=name)
+    function(["warm up"])
+    return function, {
+        "load_seconds": round(time.perf_counter() - started, 3),
+        "parameter_bytes": model_bytes(function),
+        "rss_delta_bytes": _rss() - before,
+    }
+
+
+def evaluate_model(name: str, backends: List[str], labels: List[Dict], ks: List[int], repeat: int,
+                   workdir: str) -> List[Dict]:
+    function, model_stats = load_model(name)
+    documents, ids, metadatas = load_kb_documents(KNOWLEDGE_BASE_PATH)
+
+    started = time.perf_counter()
+    embeddings = [np.asarray(e, dtype=np.float32) for e in function(documents)]
+    embed_documents_seconds = time.perf_counter() - started
+
+    queries = [label["query"] for label in labels]
+    embed_times = []
+    query_embeddings = []
+    for query in queries:
+        started = time.perf_counter()
+        query_embeddings.append(np.asarray(function([query])[0], dtype=np.float32))
+        embed_times.append(time.perf_counter() - started)
+
+    results = []
+    max_k = max(ks)
+    for backend in backends:
+        before, started = _rss(), time.perf_counter()
+        search, index_bytes = BUILDERS[backend](ids, documents, metadatas, embeddings, workdir)
+        build_seconds = time.perf_counter() - started
+        build_rss = _rss() - before
+
+        rankings = [search(q, max_k) for q in query_embeddings]
+        search_times = []
+        for _ in range(repeat):
+            for q in query_embeddings:
+                started = time.perf_counter()
+                search(q, max_k)
+                search_times.append(time.perf_counter() - started)
+        end_to_end = [embed + search_time for embed, search_time in
+                      zip(embed_times * repeat, search_times)]
+
+        results.append({
+            "config": f"{backend}/{name}",
+            "backend": backend,
+            "model": name,
+            "documents": len(ids),
+            "queries": len(queries),
+            "quality": quality(rankings, labels, ks),
+            "latency": {"search": _percentiles(search_times), "end_to_end": _percentiles(end_to_end),
+                        "embed_query": _percentiles(embed_times)},
+            "build": {"embed_documents_seconds": round(embed_documents_seconds, 3),
+                      "index_seconds": round(build_seconds, 4), "index_bytes": index_bytes,
+                      "rss_delta_bytes": build_rss},
+            "model_stats": model_stats,
+            "misses": [{"query": label["query"], "expected": _relevant(label), "got": ranking[:max_k]}
+                       for ranking, label in zip(rankings, labels)
+                       if _relevant(label) and not set(_relevant(label)) & set(ranking[:max_k])],
+        })
+    return results
+
+
+def print_table(results: List[Dict], ks: List[int]):
+    recall_columns = " | ".join(f"R@{k}" for k in ks)
+    print(f"| config | {recall_columns} | MRR | search p50 / p99 ms | end-to-end p50 / p99 ms | build s | index bytes |")
+    print("|---|" + "---:|" * (len(ks) + 5))
+    for r in results:
+        q, lat = r["quality"], r["latency"]
+        recalls = " | ".join(f"{q[f'recall@{k}']:.3f}" if q[f"recall@{k}"] is not None else "-" for k in ks)
+        mrr = f"{q['mrr']:.3f}" if q["mrr"] is not None else "-"
+        print(f"| {r['config']} | {recalls} | {mrr} "
+              f"| {lat['search']['p50_ms']:.3f} / {lat['search']['p99_ms']:.3f} "
+              f"| {lat['end_to_end']['p50_ms']:.2f} / {lat['end_to_end']['p99_ms']:.2f} "
+              f"| {r['build']['index_seconds']:.3f} | {r['build']['index_bytes'] or '-'} |")
+
+
+def print_comparison(report: Dict, previous: Dict, ks: List[int]):
+    """Changes from a previous report, per configuration present in both."""
+    if previous.get("kb_hash") != report["kb_hash"] or previous.get("labels_hash") != report["labels_hash"]:
+        print("Note: the knowledge base or labels differ from the previous run; quality is not directly comparable.")
+    before = {r["config"]: r for r in previous.get("results", [])}
+    print(f"Compared with {previous.get('commit')} ({previous.get('created')}):")
+    print("| config | " + " | ".join(f"ΔR@{k}" for k in ks) + " | ΔMRR | Δ search p50 ms | Δ end-to-end p50 ms |")
+    print("|---|" + "---:|" * (len(ks) + 3))
+    for r in report["results"]:
+        old = before.get(r["config"])
+        if old is None:
+            continue
+        deltas = []
+        for key in [f"recall@{k}" for k in ks] + ["mrr"]:
+            new_value, old_value = r["quality"].get(key), old["quality"].get(key)
+            deltas.append(f"{new_value - old_value:+.3f}" if None not in (new_value, old_value) else "-")
+        search = r["latency"]["search"]["p50_ms"] - old["latency"]["search"]["p50_ms"]
+        total = r["latency"]["end_to_end"]["p50_ms"] - old["latency"]["end_to_end"]["p50_ms"]
+        print(f"| {r['config']} | " + " | ".join(deltas) + f" | {search:+.3f} | {total:+.2f} |")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", default=DEFAULT_LABELS)
+    parser.add_argument("--models", default=EMBEDDING_MODEL_NAME, help="comma-separated embedding models")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma-separated: " + ", ".join(BACKENDS))
+    parser.add_argument("--k", default="1,2,3,5", help="comma-separated cut-offs for recall@k")
+    parser.add_argument("--repeat", type=int, default=5, help="timed passes over the queries per configuration")
+    parser.add_argument("--output", help="report path (default: backend/data/eval/reports/retrieval-<time>.json)")
+    parser.add_argument("--compare", help="previous report to compare with")
+    args = parser.parse_args()
+
+    ks = sorted({int(k) for k in args.k.split(",")})
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    unknown = [b for b in backends if b not in BUILDERS]
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(unknown)}")
+    labels = load_labels(args.labels)
+    documents, ids, metadatas = load_kb_documents(KNOWLEDGE_BASE_PATH)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for model in [m.strip() for m in args.models.split(",") if m.strip()]:
+            results.extend(evaluate_model(model, backends, labels, ks, max(1, args.repeat), workdir))
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "kb_hash": kb_content_hash(documents, ids, metadatas),
+        "labels": args.labels,
+        "labels_hash": _file_hash(args.labels),
+        "k": ks,
+        "repeat": args.repeat,
+        "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                    "numpy": np.__version__, "cpus": os.cpu_count()},
+        "results": results,
+    }
+    output = args.output or os.path.join(REPORTS_DIR, f"retrieval-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+
+    print_table(results, ks)
+    for r in results:
+        for miss in r["misses"]:
+            print(f"  {r['config']} missed: {miss['query']!r} (expected {miss['expected']}, got {miss['got']})")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print()
+            print_comparison(report, json.load(f), ks)
+    print(f"\nReport written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Ollama Stub Servers
+Minimal stand-ins for Ollama (/api/tags and streaming /api/generate) on one
+or more local ports, for trying out an Ollama pool without models or a GPU.
+Answers are canned text naming the port that served them, streamed word by
+word at a configurable pace; --fail-rate makes a share of requests fail with
+500 so ejection and re-admission can be watched under /metrics.
+
+Usage:
+    python -m backend.tools.ollama_stub --ports 11435 11436 11437 [--delay 0.05] [--fail-rate 0.1]
+    OLLAMA_BASE_URL=http://localhost:11435,http://localhost:11436,http://localhost:11437 python -m backend.main
+
+Stop one with Ctrl+C and restart it with a single --ports to see a host
+ejected and re-admitted.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+DEFAULT_MODELS = ["llama3:8b", "llama3.2:3b"]
+
+
+def make_handler(port: int, models: List[str], delay: float, fail_rate: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _json(self, status: int, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._json(200, {"models": [{"name": model} for model in models]})
+            else:
+                self._json(404, {"error": "not found"})
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if self.path != "/api/generate":
+                self._json(404, {"error": "not found"})
+                return
+            if request.get("model") not in models:
+                self._json(404, {"error": f"model '{request.get('model')}' not found"})
+                return
+            if not request.get("prompt"):
+                # Model load request (warm-up)
+                self._json(200, {"model": request["model"], "response": "", "done": True})
+                return
+            if random.random() < fail_rate:
+                self._json(500, {"error": "stub failure"})
+                return
+
+            question = (request.get("prompt", "").split("User Question:", 1)[-1].strip().splitlines() or [""])[0]
+            words = f"[stub :{port} {request['model']}] This is a stub answer to: {question}".split(" ")
+            words = words[:request.get("options", {}).get("num_predict", len(words))]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            started = time.monotonic()
+            try:
+                for i, word in enumerate(words):
+                    time.sleep(delay)
+                    self._chunk({"model": request["model"], "response": word if i == 0 else " " + word, "done": False})
+                self._chunk({"model": request["model"], "response": "", "done": True, "eval_count": len(words),
+                             "eval_duration": int((time.monotonic() - started) * 1e9)})
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def _chunk(self, payload):
+            data = json.dumps(payload).encode() + b"\n"
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def serve(ports: List[int], models: List[str], delay: float, fail_rate: float) -> List[ThreadingHTTPServer]:
+    """Start a stub server per port in background threads; returns the servers (call shutdown() to stop)."""
+    servers = []
+    for port in ports:
+        server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(port, models, delay, fail_rate))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name=f"ollama-stub-{port}", daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ports", type=int, nargs="+", default=[11435, 11436])
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS), help="comma-separated model names to serve")
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds per streamed word")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of generations answered with 500")
+    args = parser.parse_args()
+
+    servers = serve(args.ports, [m.strip() for m in args.models.split(",") if m.strip()], args.delay, args.fail_rate)
+    urls = ",".join(f"http://localhost:{port}" for port in args.ports)
+    print(f"Ollama stubs listening; OLLAMA_BASE_URL={urls}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+FAQ Answer Precomputation
+Generates and stores answers for the knowledge base FAQs and their
+paraphrases (utils/faq_answers.py). Only missing answers and answers whose
+source documents changed are regenerated, unless --force is given.
+
+Usage:
+    python -m backend.tools.precompute_faq_answers [--force]
+"""
+
+import argparse
+
+from backend.utils import faq_answers
+from backend.utils.ai_response import check_ollama_status
+from backend.utils.vector_db import initialize_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="regenerate every answer")
+    args = parser.parse_args()
+
+    if not check_ollama_status():
+        raise SystemExit("No LLM backend is available (see NEETHI_LLM_BACKEND)")
+    initialize_db()
+    counts = faq_answers.precompute(force=args.force)
+    print(f"{counts['generated']} generated, {counts['kept']} up to date, {counts['failed']} failed "
+          f"-> {faq_answers.FAQ_ANSWERS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
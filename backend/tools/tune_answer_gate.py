@@ -0,0 +1,117 @@
+"""
+Answer Gate Tuning
+Sweeps the direct-answer threshold (utils/answer_gate.py) over a labelled
+query set and reports, per threshold, how many questions would be answered
+straight from the knowledge base and how many of those would be right.
+
+Each line of the labelled set is {"query": ..., "expected_id": ...} where
+expected_id is the knowledge base document that answers the query as is,
+or null when the question needs a generated answer.
+
+Usage:
+    python -m backend.tools.tune_answer_gate [--labels backend/data/eval/labelled_queries.jsonl]
+                                             [--target-precision 0.95] [--verbose]
+"""
+
+import argparse
+import json
+from typing import Dict, List
+
+import numpy as np
+
+from backend.utils import answer_gate
+from backend.utils.intent import get_intent
+from backend.utils.vector_db import initialize_db, query_knowledge
+
+DEFAULT_LABELS = "backend/data/eval/labelled_queries.jsonl"
+
+
+def load_labels(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def score(labels: List[Dict]) -> List[Dict]:
+    """Retrieval and gate features for every labelled query."""
+    rows = []
+    for label in labels:
+        query = label["query"]
+        hits = query_knowledge(query)
+        intent = get_intent(query)
+        confidence, features = answer_gate.score_hits(query, intent, hits)
+        rows.append({
+            "query": query,
+            "expected_id": label.get("expected_id"),
+            "top_id": hits[0]["id"] if hits else None,
+            "intent": intent,
+            "open_ended": answer_gate.is_open_ended(query),
+            "confidence": confidence,
+            **features
+        })
+    return rows
+
+
+def sweep(rows: List[Dict], thresholds: np.ndarray) -> List[Dict]:
+    confidence = np.array([r["confidence"] for r in rows])
+    eligible = ~np.array([r["open_ended"] for r in rows])
+    correct_hit = np.array([r["expected_id"] is not None and r["top_id"] == r["expected_id"] for r in rows])
+    answerable = int(np.count_nonzero(np.array([r["expected_id"] is not None for r in rows])))
+
+    results = []
+    for threshold in thresholds:
+        direct = eligible & (confidence >= threshold)
+        answered = int(np.count_nonzero(direct))
+        right = int(np.count_nonzero(direct & correct_hit))
+        results.append({
+            "threshold": round(float(threshold), 2),
+            "direct": answered,
+            "correct": right,
+            "wrong": answered - right,
+            "precision": right / answered if answered else 1.0,
+            "recall": right / answerable if answerable else 0.0,
+            "coverage": answered / len(rows) if rows else 0.0,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", default=DEFAULT_LABELS)
+    parser.add_argument("--target-precision", type=float, default=0.95,
+                        help="lowest acceptable share of direct answers that are right")
+    parser.add_argument("--verbose", action="store_true", help="print every query's score")
+    args = parser.parse_args()
+
+    initialize_db()
+    rows = score(load_labels(args.labels))
+
+    if args.verbose:
+        print("| confidence | distance | margin | intent | top hit | expected | query |")
+        print("|---:|---:|---:|---|---|---|---|")
+        for r in sorted(rows, key=lambda r: -r["confidence"]):
+            flag = " (open-ended)" if r["open_ended"] else ""
+            print(f"| {r['confidence']:.3f} | {r.get('distance', '')} | {r.get('margin', '')} | {r['intent']} "
+                  f"| {r['top_id']} | {r['expected_id']} | {r['query']}{flag} |")
+        print()
+
+    results = sweep(rows, np.arange(0.30, 0.96, 0.05))
+    print("| threshold | direct | correct | wrong | precision | recall | coverage |")
+    print("|---:|---:|---:|---:|---:|---:|---:|")
+    for r in results:
+        print(f"| {r['threshold']:.2f} | {r['direct']} | {r['correct']} | {r['wrong']} "
+              f"| {r['precision']:.2f} | {r['recall']:.2f} | {r['coverage']:.2f} |")
+
+    fine = sweep(rows, np.arange(0.0, 1.001, 0.01))
+    good = [r for r in fine if r["precision"] >= args.target_precision and r["direct"]]
+    print()
+    print(f"Current threshold: {answer_gate.DIRECT_ANSWER_THRESHOLD}")
+    if good:
+        best = max(good, key=lambda r: (r["recall"], r["threshold"]))
+        print(f"Recommended: NEETHI_DIRECT_ANSWER_THRESHOLD={best['threshold']:.2f} "
+              f"(precision {best['precision']:.2f}, recall {best['recall']:.2f})")
+    else:
+        print(f"No threshold reaches precision {args.target_precision}; keep generating answers")
+
+
+if __name__ == "__main__":
+    main()
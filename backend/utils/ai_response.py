@@ -1,14 +1,15 @@
 """
-Ollama AI Response Generator for Nyaya Bandhu
-Uses local Ollama instance with llama3:8b model
+AI Response Generator for Nyaya Bandhu
+Generates answers through the LLM backends in llm_backends.py (Ollama by
+default), with the model picked per request by intent, prompt size and load
 """
 
-import requests
-import json
-from typing import List, Dict, Optional
+import os
+from typing import Callable, List, Dict, Optional, Tuple
 
-OLLAMA_BASE_URL = "http://localhost:11434"
-MODEL_NAME = "llama3:8b"
+from backend.utils.llm_backends import get_router
+
+DEFAULT_MODEL = os.environ.get("NEETHI_LLM_MODEL", "llama3:8b")
 
 SYSTEM_PROMPT = """You are Neethi (நீதி), the official AI assistant for the Department of Justice, Government of India. Your name means "Justice" in Tamil. 
 
@@ -34,25 +35,38 @@ Key Services to Know:
 - NJDG: National Judicial Data Grid for court statistics (njdg.ecourts.gov.in)
 """
 
-def generate_response(
+# Earlier messages of a conversation included in the prompt, and their longest length
+MAX_HISTORY_MESSAGES = 6
+MAX_HISTORY_MESSAGE_CHARS = 500
+
+def format_history(history: Optional[List[Dict]]) -> str:
+    """The last few {"role", "content"} messages of a conversation as prompt lines."""
+    lines = []
+    for message in (history or [])[-MAX_HISTORY_MESSAGES:]:
+        content = str(message.get("content") or "").strip()
+        if not content:
+            continue
+        if len(content) > MAX_HISTORY_MESSAGE_CHARS:
+            content = content[:MAX_HISTORY_MESSAGE_CHARS] + " …"
+        speaker = "Assistant" if message.get("role") == "assistant" else "User"
+        lines.append(f"{speaker}: {content}")
+    return "\n".join(lines)
+
+def build_prompt(
     user_query: str,
     context: List[Dict] = None,
-    scraped_data: str = None
+    scraped_data: str = None,
+    history: Optional[List[Dict]] = None
 ) -> str:
-    """
-    Generate an AI response using local Ollama.
-    
-    Args:
-        user_query: The user's question
-        context: Retrieved documents from knowledge base
-        scraped_data: Fresh data scraped from web sources
-    
-    Returns:
-        AI-generated response string
-    """
+    """Build the generation prompt from retrieved and scraped context and the conversation so far."""
     # Build context string
     context_parts = []
     
+    conversation = format_history(history)
+    if conversation:
+        context_parts.append("Conversation so far:")
+        context_parts.append(conversation + "\n")
+    
     if context:
         context_parts.append("Relevant Information from Knowledge Base:")
         for doc in context:
@@ -65,7 +79,7 @@ def generate_response(
     context_str = "\n".join(context_parts) if context_parts else ""
     
     # Build the prompt
-    prompt = f"""Based on the following context and your knowledge, answer the user's question.
+    return f"""Based on the following context and your knowledge, answer the user's question.
 
 {context_str}
 
@@ -73,58 +87,69 @@ User Question: {user_query}
 
 Provide a helpful, accurate response. If the information is from official sources, mention them."""
 
-    try:
-        response = requests.post(
-            f"{OLLAMA_BASE_URL}/api/generate",
-            json={
-                "model": MODEL_NAME,
-                "prompt": prompt,
-                "system": SYSTEM_PROMPT,
-                "stream": False,
-                "options": {
-                    "temperature": 0.7,
-                    "top_p": 0.9,
-                    "num_predict": 500
-                }
-            },
-            timeout=60
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            return result.get("response", "I apologize, I couldn't generate a response.")
-        else:
-            print(f"Ollama error: {response.status_code}")
-            return None
-            
-    except requests.exceptions.ConnectionError:
-        print("Ollama is not running. Please start Ollama service.")
-        return None
-    except requests.exceptions.Timeout:
-        print("Ollama request timed out.")
-        return None
-    except Exception as e:
-        print(f"Error calling Ollama: {e}")
-        return None
-
-def check_ollama_status() -> bool:
-    """Check if Ollama is running and the model is available."""
-    try:
-        response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=5)
-        if response.status_code == 200:
-            models = response.json().get("models", [])
-            model_names = [m.get("name", "") for m in models]
-            return any(MODEL_NAME in name for name in model_names)
-        return False
-    except:
-        return False
+def generate_response(
+    user_query: str,
+    context: List[Dict] = None,
+    scraped_data: str = None,
+    intent: Optional[str] = None
+) -> str:
+    """
+    Generate an AI response with the model the router picks for this request.
+    
+    Args:
+        user_query: The user's question
+        context: Retrieved documents from knowledge base
+        scraped_data: Fresh data scraped from web sources
+        intent: Detected intent, used to pick the model
+    
+    Returns:
+        AI-generated response string
+    """
+    prompt = build_prompt(user_query, context, scraped_data)
+    text, _, _ = get_router().generate(prompt, SYSTEM_PROMPT, intent)
+    return text
+
+def generate_response_by_deadline(
+    user_query: str,
+    context: List[Dict] = None,
+    scraped_data: str = None,
+    deadline=None,
+    intent: Optional[str] = None,
+    history: Optional[List[Dict]] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    session_id: Optional[str] = None
+) -> Tuple[Optional[str], bool]:
+    """
+    Generate a response by streaming from the routed model, stopping when the deadline expires.
+    on_token, if given, receives each piece of text as it is generated; session_id
+    keeps a conversation on the same Ollama host when several are configured.
+    
+    Returns (text, complete). If time runs out mid-generation, text is whatever
+    was generated so far and complete is False; text is None if nothing was generated.
+    """
+    prompt = build_prompt(user_query, context, scraped_data, history)
+    text, complete, _ = get_router().generate(prompt, SYSTEM_PROMPT, intent, deadline, on_token, session_id)
+    return text, complete
+
+def check_ollama_status(timeout: float = 5) -> bool:
+    """Check if any configured LLM backend is up with its model available."""
+    return get_router().any_available(timeout)
+
+def warm_up_llm(timeout: float = 120) -> bool:
+    """Load the routed models into memory so the first answer does not wait for it; True if any backend is up."""
+    return get_router().warm_up(timeout)
+
+def get_llm_stats() -> Dict:
+    """Per-route availability, latency and token rate."""
+    return get_router().get_stats()
 
 if __name__ == "__main__":
     # Test the integration
     if check_ollama_status():
-        print("✅ Ollama is running with the required model")
+        print("✅ An LLM backend is running with its model")
         test_response = generate_response("How can I check my case status online?")
         print(f"\nTest Response:\n{test_response}")
+        print(get_llm_stats())
     else:
-        print("❌ Ollama is not running or model not found")
-        print(f"Please run: ollama pull {MODEL_NAME}")
+        print("❌ No LLM backend is running or the models are not found")
+        print(f"Please run: ollama pull {DEFAULT_MODEL}")
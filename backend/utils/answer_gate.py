@@ -0,0 +1,110 @@
+"""
+Answer Gate
+Decides whether a /chat question can be answered straight from the
+knowledge base instead of having the LLM rephrase the closest document.
+
+Retrieval confidence combines how close the best hit is, how far ahead of
+the runner-up it is, and whether its intent agrees with the one detected
+for the question. Above DIRECT_ANSWER_THRESHOLD the curated answer is
+returned as is; open-ended questions (why / explain / compare ...) always go
+to the model. Tune the threshold with:
+
+    python -m backend.tools.tune_answer_gate
+"""
+
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+DIRECT_ANSWER_THRESHOLD = float(os.environ.get("NEETHI_DIRECT_ANSWER_THRESHOLD", "0.75"))
+
+# Squared L2 distance (normalized embeddings) at which a hit counts as unrelated
+MAX_DISTANCE = 1.2
+
+# Lead over the second hit at which the margin feature is fully satisfied
+MARGIN_SCALE = 0.3
+
+WEIGHTS = {"similarity": 0.6, "margin": 0.25, "intent": 0.15}
+
+# Knowledge base intent labels and scheme ids -> intents from utils/intent.py
+KB_INTENTS = {
+    "case_status": "case_status",
+    "info_telelaw": "tele_law",
+    "tele-law": "tele_law",
+    "pay_challan": "ecourts",
+    "ecourts": "ecourts",
+    "legal_aid": "legal_aid",
+}
+
+# Questions that want reasoning rather than a stock answer
+OPEN_ENDED = re.compile(
+    r"\b(why|explain|compare|comparison|difference|differ|should i|what if|pros and cons|advise|opinion)\b",
+    re.IGNORECASE
+)
+MAX_DIRECT_QUERY_WORDS = 20
+
+
+def hit_intent(hit: Dict) -> Optional[str]:
+    """The intent a knowledge base document answers, if known."""
+    meta = hit.get("metadata") or {}
+    label = meta.get("intent") or meta.get("scheme")
+    if not label and str(hit.get("id", "")).startswith("scheme_"):
+        label = hit["id"][len("scheme_"):]
+    return KB_INTENTS.get(label)
+
+
+def score_hits(query: str, intent: Optional[str], hits: List[Dict]) -> Tuple[float, Dict]:
+    """Confidence (0-1) that the first hit answers the query, and the features behind it."""
+    if not hits or hits[0].get("distance") is None:
+        return 0.0, {}
+    best = hits[0]["distance"]
+    runner_up = hits[1]["distance"] if len(hits) > 1 and hits[1].get("distance") is not None else MAX_DISTANCE
+    similarity = max(0.0, 1 - best / MAX_DISTANCE)
+    margin = min(max(runner_up - best, 0.0) / MARGIN_SCALE, 1.0)
+
+    expected = hit_intent(hits[0])
+    if intent in (None, "unknown") or expected is None:
+        agreement = 0.5
+    else:
+        agreement = 1.0 if expected == intent else 0.0
+
+    confidence = (WEIGHTS["similarity"] * similarity + WEIGHTS["margin"] * margin
+                  + WEIGHTS["intent"] * agreement)
+    return confidence, {
+        "distance": round(best, 4),
+        "margin": round(runner_up - best, 4),
+        "intent_agreement": agreement,
+    }
+
+
+def is_open_ended(query: str) -> bool:
+    return bool(OPEN_ENDED.search(query)) or len(query.split()) > MAX_DIRECT_QUERY_WORDS
+
+
+def direct_answer(hit: Dict) -> Tuple[str, List[str]]:
+    """The curated answer text and source URL(s) of a knowledge base document."""
+    meta = hit.get("metadata") or {}
+    text = meta.get("answer")
+    if not text:
+        content = hit.get("content", "")
+        text = content.split(" A: ", 1)[1] if content.startswith("Q: ") and " A: " in content else content
+    return text, [meta["url"]] if meta.get("url") else []
+
+
+def decide(query: str, intent: Optional[str], hits: List[Dict], threshold: Optional[float] = None) -> Dict:
+    """
+    Whether to answer directly from the first hit. Returns dict with
+    'direct', 'confidence', 'reason' and the scoring 'features'.
+    """
+    threshold = DIRECT_ANSWER_THRESHOLD if threshold is None else threshold
+    confidence, features = score_hits(query, intent, hits)
+    if not hits:
+        reason = "no_hits"
+    elif is_open_ended(query):
+        reason = "open_ended"
+    elif confidence < threshold:
+        reason = "low_confidence"
+    else:
+        reason = "confident"
+    return {"direct": reason == "confident", "confidence": round(confidence, 3), "reason": reason,
+            "features": features}
@@ -0,0 +1,448 @@
+"""
+Case Status Store
+Local SQLite snapshot of case records keyed by CNR, so case status lookups
+are answered from disk instead of a (usually blocked) eCourts scrape.
+
+Records live in a WITHOUT ROWID table clustered on the CNR, so the rows of
+one state, district or court establishment are contiguous on disk and a
+prefix query is a single range scan of the primary key.
+
+Triggers keep per-dimension counters (state, court level, civil/criminal,
+filing month, pending) in step with every insert, update and delete, in
+the same transaction, for the NJDG statistics (utils/njdg_cube.py).
+
+CNR layout: SS DD EE NNNNNN YYYY
+    SS    state code            (e.g. DL)
+    DD    district code         (e.g. CT)
+    EE    establishment number  (e.g. 01)
+    N...  case serial number
+    YYYY  filing year
+
+Load a snapshot (NDJSON, one case record per line, optionally .gz):
+    python -m backend.utils.case_store import cases.ndjson.gz
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+CASE_STORE_PATH = os.environ.get("NEETHI_CASE_STORE", "backend/data/case_store.sqlite3")
+
+# How long a writer waits on a lock held by another worker before giving up
+BUSY_TIMEOUT_MS = 5000
+
+# Records per transaction when importing or bulk-updating
+WRITE_BATCH = 10000
+
+# SQLite's default limit on host parameters per statement is 999
+LOOKUP_BATCH = 900
+
+# Earliest filing year accepted; dates outside FIRST_YEAR..next year are treated as unknown
+FIRST_YEAR = 1900
+
+CNR_PATTERN = re.compile(r"^([A-Z]{2})([A-Z0-9]{2})([0-9]{2})([0-9]{6,})((?:19|20)[0-9]{2})$")
+
+# State codes used in CNRs
+STATE_NAMES = {
+    "AN": "Andaman and Nicobar", "AP": "Andhra Pradesh", "AR": "Arunachal Pradesh", "AS": "Assam",
+    "BR": "Bihar", "CG": "Chhattisgarh", "CH": "Chandigarh", "DL": "Delhi", "DN": "Dadra and Nagar Haveli",
+    "GA": "Goa", "GJ": "Gujarat", "HP": "Himachal Pradesh", "HR": "Haryana", "JH": "Jharkhand",
+    "JK": "Jammu and Kashmir", "KA": "Karnataka", "KL": "Kerala", "LA": "Ladakh", "LD": "Lakshadweep",
+    "MH": "Maharashtra", "ML": "Meghalaya", "MN": "Manipur", "MP": "Madhya Pradesh", "MZ": "Mizoram",
+    "NL": "Nagaland", "OR": "Odisha", "PB": "Punjab", "PY": "Puducherry", "RJ": "Rajasthan",
+    "SK": "Sikkim", "TN": "Tamil Nadu", "TR": "Tripura", "TS": "Telangana", "UK": "Uttarakhand",
+    "UP": "Uttar Pradesh", "WB": "West Bengal"
+}
+
+COURT_LEVELS = ("district", "high_court")
+CASE_CATEGORIES = ("civil", "criminal")
+
+_CRIMINAL_WORDS = ("criminal", "crl", "bail", "sessions", "ndps", "pocso", "ipc", "crpc", "bns", "complaint case", "fir")
+_DISPOSED_WORDS = ("disposed", "decided", "dismissed", "closed", "withdrawn", "allowed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cases (
+    cnr            TEXT PRIMARY KEY,
+    state          TEXT NOT NULL,
+    district       TEXT NOT NULL,
+    establishment  TEXT NOT NULL,
+    year           INTEGER NOT NULL,
+    case_type      TEXT,
+    status         TEXT,
+    filing_date    TEXT,
+    data           TEXT NOT NULL,
+    updated_at     REAL NOT NULL,
+    court_level    TEXT NOT NULL,
+    category       TEXT NOT NULL,
+    filing_month   INTEGER NOT NULL,
+    pending        INTEGER NOT NULL,
+    disposal_month INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+
+_COUNTERS = """
+CREATE TABLE IF NOT EXISTS case_counts (
+    state        TEXT NOT NULL,
+    court_level  TEXT NOT NULL,
+    category     TEXT NOT NULL,
+    filing_month INTEGER NOT NULL,
+    pending      INTEGER NOT NULL,
+    count        INTEGER NOT NULL,
+    PRIMARY KEY (state, court_level, category, filing_month, pending)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS disposal_counts (
+    state          TEXT NOT NULL,
+    court_level    TEXT NOT NULL,
+    category       TEXT NOT NULL,
+    disposal_month INTEGER NOT NULL,
+    count          INTEGER NOT NULL,
+    PRIMARY KEY (state, court_level, category, disposal_month)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS cases_counted_insert AFTER INSERT ON cases BEGIN
+    INSERT INTO case_counts VALUES (NEW.state, NEW.court_level, NEW.category, NEW.filing_month, NEW.pending, 1)
+        ON CONFLICT DO UPDATE SET count = count + 1;
+    INSERT INTO disposal_counts SELECT NEW.state, NEW.court_level, NEW.category, NEW.disposal_month, 1
+        WHERE NEW.disposal_month > 0
+        ON CONFLICT DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cases_counted_delete AFTER DELETE ON cases BEGIN
+    UPDATE case_counts SET count = count - 1
+        WHERE state = OLD.state AND court_level = OLD.court_level AND category = OLD.category
+          AND filing_month = OLD.filing_month AND pending = OLD.pending;
+    UPDATE disposal_counts SET count = count - 1
+        WHERE state = OLD.state AND court_level = OLD.court_level AND category = OLD.category
+          AND disposal_month = OLD.disposal_month;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cases_counted_update AFTER UPDATE ON cases BEGIN
+    UPDATE case_counts SET count = count - 1
+        WHERE state = OLD.state AND court_level = OLD.court_level AND category = OLD.category
+          AND filing_month = OLD.filing_month AND pending = OLD.pending;
+    UPDATE disposal_counts SET count = count - 1
+        WHERE state = OLD.state AND court_level = OLD.court_level AND category = OLD.category
+          AND disposal_month = OLD.disposal_month;
+    INSERT INTO case_counts VALUES (NEW.state, NEW.court_level, NEW.category, NEW.filing_month, NEW.pending, 1)
+        ON CONFLICT DO UPDATE SET count = count + 1;
+    INSERT INTO disposal_counts SELECT NEW.state, NEW.court_level, NEW.category, NEW.disposal_month, 1
+        WHERE NEW.disposal_month > 0
+        ON CONFLICT DO UPDATE SET count = count + 1;
+END;
+"""
+
+_COLUMNS = "cnr, data, updated_at"
+
+# One connection per thread (sqlite3 connections are not thread-safe),
+# re-opened after a fork so children never share a parent's handle.
+_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "pid", None) == os.getpid():
+        return conn
+
+    os.makedirs(os.path.dirname(CASE_STORE_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(CASE_STORE_PATH, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(_SCHEMA)
+    conn.executescript(_COUNTERS)
+    _local.conn = conn
+    _local.pid = os.getpid()
+    return conn
+
+
+def _rebuild_counts(conn: sqlite3.Connection):
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("DELETE FROM case_counts")
+    conn.execute("DELETE FROM disposal_counts")
+    conn.execute(
+        "INSERT INTO case_counts SELECT state, court_level, category, filing_month, pending, COUNT(*) "
+        "FROM cases GROUP BY state, court_level, category, filing_month, pending"
+    )
+    conn.execute(
+        "INSERT INTO disposal_counts SELECT state, court_level, category, disposal_month, COUNT(*) "
+        "FROM cases WHERE disposal_month > 0 GROUP BY state, court_level, category, disposal_month"
+    )
+    conn.execute("COMMIT")
+
+
+def rebuild_counts():
+    """Recompute the NJDG counters from the case records (normally kept up to date by triggers)."""
+    try:
+        _rebuild_counts(_connect())
+    except sqlite3.Error as e:
+        print(f"Case store write failed: {e}")
+
+
+def parse_cnr(cnr: str) -> Optional[Dict]:
+    """Split a CNR into its codes, or None if it does not look like one."""
+    cnr = (cnr or "").strip().upper()
+    match = CNR_PATTERN.match(cnr)
+    if not match:
+        return None
+    state, district, establishment, serial, year = match.groups()
+    return {
+        "cnr": cnr,
+        "state": state,
+        "district": district,
+        "establishment": establishment,
+        "serial": serial,
+        "year": int(year)
+    }
+
+
+def valid_year(year: int) -> bool:
+    """A plausible filing or disposal year (the NJDG month axis spans every year that occurs)."""
+    return FIRST_YEAR <= year <= time.localtime().tm_year + 1
+
+
+def month_index(date: Optional[str]) -> int:
+    """Months since year 0 for a 'YYYY-MM[-DD]' date, 0 when unknown or outside the valid years."""
+    if not date or len(date) < 7 or not date[:4].isdigit() or not date[5:7].isdigit():
+        return 0
+    year, month = int(date[:4]), int(date[5:7])
+    if not valid_year(year) or not 1 <= month <= 12:
+        return 0
+    return year * 12 + month - 1
+
+
+def case_dimensions(record: Dict, codes: Dict) -> Dict:
+    """The NJDG dimensions of a case: court level, civil/criminal, filing month and whether it is pending."""
+    court_level = record.get("court_level")
+    if court_level not in COURT_LEVELS:
+        court = str(record.get("court", "")).lower()
+        court_level = "high_court" if codes["district"] == "HC" or "high court" in court else "district"
+
+    category = str(record.get("case_category", "")).lower()
+    if category not in CASE_CATEGORIES:
+        case_type = str(record.get("case_type", "")).lower()
+        category = "criminal" if any(word in case_type for word in _CRIMINAL_WORDS) else "civil"
+
+    disposal_month = month_index(record.get("disposal_date") or record.get("decision_date"))
+    status = str(record.get("status", "")).lower()
+    pending = 0 if disposal_month or any(word in status for word in _DISPOSED_WORDS) else 1
+
+    return {
+        "court_level": court_level,
+        "category": category,
+        "filing_month": month_index(record.get("filing_date")) or codes["year"] * 12,
+        "pending": pending,
+        "disposal_month": disposal_month
+    }
+
+
+def _prefix_range(prefix: str):
+    """[low, high) bounds of the CNRs starting with a prefix."""
+    prefix = prefix.strip().upper()
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _record(row) -> Dict:
+    record = json.loads(row[1])
+    record["synced_at"] = row[2]
+    return record
+
+
+# ===============================
+# LOOKUPS
+# ===============================
+
+def get_case(cnr: str) -> Optional[Dict]:
+    """Stored record for one CNR, or None."""
+    try:
+        row = _connect().execute(
+            f"SELECT {_COLUMNS} FROM cases WHERE cnr = ?", (cnr.strip().upper(),)
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"Case store read failed: {e}")
+        return None
+    return _record(row) if row else None
+
+
+def get_cases(cnrs: Iterable[str]) -> Dict[str, Dict]:
+    """Stored records for many CNRs at once; missing CNRs are left out."""
+    keys = sorted({cnr.strip().upper() for cnr in cnrs})
+    found = {}
+    try:
+        conn = _connect()
+        for start in range(0, len(keys), LOOKUP_BATCH):
+            chunk = keys[start:start + LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(chunk))
+            for row in conn.execute(f"SELECT {_COLUMNS} FROM cases WHERE cnr IN ({placeholders})", chunk):
+                found[row[0]] = _record(row)
+    except sqlite3.Error as e:
+        print(f"Case store read failed: {e}")
+    return found
+
+
+def cases_with_prefix(prefix: str, limit: int = 50, after: Optional[str] = None) -> List[Dict]:
+    """
+    Records whose CNR starts with a prefix (state, state + district, or a
+    court establishment), in CNR order. Pass the last CNR of a page as
+    'after' to get the next page.
+    """
+    if not prefix:
+        return []
+    low, high = _prefix_range(prefix)
+    after = after.strip().upper() if after else None
+    if after and after >= low:
+        query, params = f"SELECT {_COLUMNS} FROM cases WHERE cnr > ? AND cnr < ? ORDER BY cnr LIMIT ?", (after, high, limit)
+    else:
+        query, params = f"SELECT {_COLUMNS} FROM cases WHERE cnr >= ? AND cnr < ? ORDER BY cnr LIMIT ?", (low, high, limit)
+    try:
+        return [_record(row) for row in _connect().execute(query, params)]
+    except sqlite3.Error as e:
+        print(f"Case store read failed: {e}")
+        return []
+
+
+def count_with_prefix(prefix: str) -> int:
+    if not prefix:
+        return 0
+    low, high = _prefix_range(prefix)
+    try:
+        return _connect().execute("SELECT COUNT(*) FROM cases WHERE cnr >= ? AND cnr < ?", (low, high)).fetchone()[0]
+    except sqlite3.Error as e:
+        print(f"Case store read failed: {e}")
+        return 0
+
+
+def is_empty() -> bool:
+    try:
+        return _connect().execute("SELECT 1 FROM cases LIMIT 1").fetchone() is None
+    except sqlite3.Error:
+        return True
+
+
+# ===============================
+# UPDATES
+# ===============================
+
+def _row(record: Dict, now: float) -> Optional[tuple]:
+    codes = parse_cnr(record.get("cnr", ""))
+    if codes is None or not valid_year(codes["year"]):
+        return None
+    record = {**record, "cnr": codes["cnr"]}
+    record.pop("synced_at", None)
+    dims = case_dimensions(record, codes)
+    return (
+        codes["cnr"], codes["state"], codes["district"], codes["establishment"], codes["year"],
+        record.get("case_type"), record.get("status"), record.get("filing_date"),
+        json.dumps(record, ensure_ascii=False, separators=(",", ":"), sort_keys=True), now,
+        dims["court_level"], dims["category"], dims["filing_month"], dims["pending"], dims["disposal_month"]
+    )
+
+
+def upsert_cases(records: Iterable[Dict]) -> Dict[str, int]:
+    """
+    Insert or update case records. Unchanged records are not rewritten.
+
+    Returns dict with 'changed' (inserted or modified) and 'skipped'
+    (records without a valid CNR, or filed in an implausible year).
+    """
+    now = time.time()
+    changed = skipped = 0
+    batch = []
+
+    def flush():
+        nonlocal changed
+        conn = _connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.executemany(
+                """
+                INSERT INTO cases (cnr, state, district, establishment, year, case_type, status, filing_date, data,
+                                   updated_at, court_level, category, filing_month, pending, disposal_month)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(cnr) DO UPDATE SET
+                    case_type = excluded.case_type,
+                    status = excluded.status,
+                    filing_date = excluded.filing_date,
+                    data = excluded.data,
+                    updated_at = excluded.updated_at,
+                    court_level = excluded.court_level,
+                    category = excluded.category,
+                    filing_month = excluded.filing_month,
+                    pending = excluded.pending,
+                    disposal_month = excluded.disposal_month
+                WHERE cases.data != excluded.data
+                """,
+                batch
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        changed += cursor.rowcount
+        batch.clear()
+
+    try:
+        for record in records:
+            row = _row(record, now)
+            if row is None:
+                skipped += 1
+                continue
+            batch.append(row)
+            if len(batch) >= WRITE_BATCH:
+                flush()
+        if batch:
+            flush()
+    except sqlite3.Error as e:
+        print(f"Case store write failed: {e}")
+    return {"changed": changed, "skipped": skipped}
+
+
+def delete_cases(cnrs: Iterable[str]) -> int:
+    try:
+        cursor = _connect().executemany("DELETE FROM cases WHERE cnr = ?", [(c.strip().upper(),) for c in cnrs])
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        print(f"Case store write failed: {e}")
+        return 0
+
+
+def _read_snapshot(path: str) -> Iterable[Dict]:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def import_snapshot(path: str) -> Dict[str, int]:
+    """Incrementally apply an NDJSON snapshot of case records (only changed rows are written)."""
+    start = time.perf_counter()
+    result = upsert_cases(_read_snapshot(path))
+    result["seconds"] = round(time.perf_counter() - start, 1)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Neethi case status store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("import", help="apply an NDJSON (.gz) snapshot").add_argument("path")
+    commands.add_parser("count", help="count records under a CNR prefix").add_argument("prefix")
+    commands.add_parser("rebuild-counts", help="recompute the NJDG counters from the records")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        print(import_snapshot(args.path))
+    elif args.command == "count":
+        print(count_with_prefix(args.prefix))
+    else:
+        rebuild_counts()
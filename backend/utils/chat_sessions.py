@@ -0,0 +1,379 @@
+"""
+Chat Sessions
+The WebSocket chat channel (/ws/chat): one connection per browser tab that
+carries any number of chat requests, streams their tokens as they are
+generated and lets the server push messages (progress notices, Tele-Law
+queue updates) without being asked. Conversation history is kept on the
+server per session, so clients send only the new message.
+
+Frames are JSON text. From the client:
+    {"type": "chat", "id": "r1", "message": "...", "timeout": 20}
+    {"type": "cancel", "id": "r1"}
+    {"type": "subscribe_queue", "ticket_id": "..."} / {"type": "unsubscribe_queue", "ticket_id": "..."}
+    {"type": "ping"} / {"type": "pong"}
+From the server:
+    {"type": "session", "session_id": "...", "resumed": false, "heartbeat": 25}
+    {"type": "status", "id": "r1", "stage": "retrieving" | "searching" | "generating" | "thinking", ...}
+    {"type": "token", "id": "r1", "text": "..."}
+    {"type": "done", "id": "r1", ...the /chat response fields}
+    {"type": "cancelled" | "error", "id": "r1", ...}   (rate limited: "code", "retry_after")
+    {"type": "queue", "ticket_id": "...", ...the ticket status}
+    {"type": "ping"} / {"type": "pong"}
+
+An idle connection costs two suspended coroutines and its session. Sessions
+live in the worker process that accepted them; reconnecting with
+?session_id= resumes the conversation if it lands on the same worker within
+SESSION_TTL, and starts a new one otherwise.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from backend.utils.deadline import Deadline
+from backend.utils.rate_limit import RateLimited
+
+# Seconds without traffic before the server pings; a client silent for
+# HEARTBEAT_MISSES intervals is considered gone
+HEARTBEAT_SECONDS = 25
+HEARTBEAT_MISSES = 3
+
+# Disconnected sessions are kept this long for resumption (seconds), up to MAX_SESSIONS
+SESSION_TTL = 30 * 60
+MAX_SESSIONS = 10000
+SWEEP_INTERVAL = 60
+
+# Messages of a conversation kept per session
+HISTORY_MESSAGES = 20
+
+# Per connection: chat requests in flight, watched queue tickets, largest client frame
+MAX_INFLIGHT = 3
+MAX_WATCHES = 5
+MAX_MESSAGE_CHARS = 8000
+
+# Outgoing frames queued for a client that is not reading (tokens are merged, not queued)
+MAX_PENDING_FRAMES = 256
+SEND_TIMEOUT = 30
+
+# "Still thinking" notices until the first token arrives (seconds)
+THINKING_NOTICE_SECONDS = 3
+THINKING_NOTICE_INTERVAL = 10
+
+# Application close codes
+CLOSE_HEARTBEAT_TIMEOUT = 4408
+CLOSE_SLOW_CONSUMER = 1013
+
+# answer(query, history, deadline, on_token, on_stage) -> response fields
+Answer = Callable[[str, List[Dict], Deadline, Callable[[str], None], Callable[[str], None]], Awaitable[Dict]]
+# watch_ticket(ticket_id) -> ticket statuses until it leaves the queue, or None for unknown tickets
+# (the iterator may instead raise LookupError when it cannot tell up front)
+WatchTicket = Callable[[str], Optional[AsyncIterator[Dict]]]
+
+
+class ChatSession:
+    __slots__ = ("session_id", "history", "connections", "last_seen")
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.history = deque(maxlen=HISTORY_MESSAGES)
+        self.connections = 0
+        self.last_seen = time.monotonic()
+
+    def add_turn(self, query: str, answer: str):
+        self.history.append({"role": "user", "content": query})
+        self.history.append({"role": "assistant", "content": answer})
+
+
+class SessionRegistry:
+    """Sessions of this process, oldest first. Used from the event loop only."""
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._swept_at = 0.0
+
+    def attach(self, session_id: Optional[str] = None) -> Tuple[ChatSession, bool]:
+        """The session to resume (if still known) or a new one; returns (session, resumed)."""
+        self.sweep()
+        session = self._sessions.get(session_id) if session_id else None
+        resumed = session is not None
+        if session is None:
+            session = ChatSession(uuid.uuid4().hex)
+            self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        session.connections += 1
+        return session, resumed
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """A session still known to this process, without attaching to it (POST /chat with a session_id)."""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_seen = time.monotonic()
+        return session
+
+    def detach(self, session: ChatSession):
+        session.connections -= 1
+        session.last_seen = time.monotonic()
+
+    def sweep(self, force: bool = False):
+        """Drop disconnected sessions past their TTL, then the oldest disconnected ones above the cap."""
+        now = time.monotonic()
+        if not force and now - self._swept_at < SWEEP_INTERVAL and len(self._sessions) < self.max_sessions:
+            return
+        self._swept_at = now
+        idle = [s for s in self._sessions.values() if s.connections == 0]
+        excess = len(self._sessions) - self.max_sessions + 1
+        for session in idle:
+            if now - session.last_seen > self.ttl or excess > 0:
+                del self._sessions[session.session_id]
+                excess -= 1
+
+    def get_stats(self) -> Dict:
+        return {
+            "sessions": len(self._sessions),
+            "connected": sum(1 for s in self._sessions.values() if s.connections)
+        }
+
+
+class ChatConnection:
+    """
+    One WebSocket: a reader that dispatches client frames and a writer that
+    sends everything queued for the client. Tokens for a request are merged
+    while the client is slow to read, so a stalled client costs memory
+    proportional to the answer rather than to the number of tokens; other
+    frames are queued up to MAX_PENDING_FRAMES before the connection is
+    closed.
+    """
+
+    def __init__(self, websocket: WebSocket, session: ChatSession, answer: Answer,
+                 watch_ticket: Optional[WatchTicket] = None):
+        self.websocket = websocket
+        self.session = session
+        self.answer = answer
+        self.watch_ticket = watch_ticket
+        self.closed = False
+        self._frames: deque = deque()
+        self._tokens: Dict[str, List[str]] = {}
+        self._wake = asyncio.Event()
+        self._overflow = False
+        self._requests: Dict[str, Tuple[asyncio.Task, Deadline]] = {}
+        self._streaming = set()
+        self._watches: Dict[str, asyncio.Task] = {}
+        self._last_received = time.monotonic()
+        self._last_sent = time.monotonic()
+
+    # Outgoing
+
+    def push(self, frame: Dict):
+        """Queue a frame for the client (after any tokens already pending for the same request)."""
+        if self.closed:
+            return
+        if len(self._frames) >= MAX_PENDING_FRAMES:
+            self._overflow = True
+        else:
+            request_id = frame.get("id")
+            if request_id in self._tokens:
+                self._frames.append(self._token_frame(request_id))
+            self._frames.append(frame)
+        self._wake.set()
+
+    def _token_frame(self, request_id: str) -> Dict:
+        return {"type": "token", "id": request_id, "text": "".join(self._tokens.pop(request_id))}
+
+    def _on_token(self, request_id: str, piece: str):
+        if self.closed or request_id not in self._requests:
+            return
+        self._streaming.add(request_id)
+        self._tokens.setdefault(request_id, []).append(piece)
+        self._wake.set()
+
+    async def _writer(self):
+        while not self.closed:
+            wait = HEARTBEAT_SECONDS - (time.monotonic() - self._last_sent)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=max(wait, 0.1))
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            now = time.monotonic()
+            if now - self._last_received > HEARTBEAT_SECONDS * HEARTBEAT_MISSES:
+                await self._close(CLOSE_HEARTBEAT_TIMEOUT, "heartbeat timeout")
+                return
+            if self._overflow:
+                await self._close(CLOSE_SLOW_CONSUMER, "client is not reading")
+                return
+            if not self._frames and not self._tokens and now - self._last_sent >= HEARTBEAT_SECONDS:
+                self._frames.append({"type": "ping"})
+            while self._frames or self._tokens:
+                frame = self._frames.popleft() if self._frames else self._token_frame(next(iter(self._tokens)))
+                try:
+                    await asyncio.wait_for(self.websocket.send_text(json.dumps(frame)), timeout=SEND_TIMEOUT)
+                except asyncio.TimeoutError:
+                    await self._close(CLOSE_SLOW_CONSUMER, "client is not reading")
+                    return
+                self._last_sent = time.monotonic()
+
+    async def _close(self, code: int, reason: str):
+        self.closed = True
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+    # Incoming
+
+    async def _reader(self):
+        while not self.closed:
+            text = await self.websocket.receive_text()
+            self._last_received = time.monotonic()
+            self._handle(text)
+
+    def _handle(self, text: str):
+        if len(text) > MAX_MESSAGE_CHARS:
+            self.push({"type": "error", "detail": f"Frames are limited to {MAX_MESSAGE_CHARS} characters"})
+            return
+        try:
+            message = json.loads(text)
+            kind = message.get("type")
+        except (ValueError, AttributeError):
+            self.push({"type": "error", "detail": "Frames must be JSON objects"})
+            return
+
+        if kind == "chat":
+            self._start_chat(message)
+        elif kind == "cancel":
+            self._cancel(str(message.get("id")))
+        elif kind == "subscribe_queue":
+            self._watch(str(message.get("ticket_id")))
+        elif kind == "unsubscribe_queue":
+            task = self._watches.pop(str(message.get("ticket_id")), None)
+            if task is not None:
+                task.cancel()
+        elif kind == "ping":
+            self.push({"type": "pong"})
+        elif kind != "pong":
+            self.push({"type": "error", "detail": f"Unknown frame type: {kind}"})
+
+    def _start_chat(self, message: Dict):
+        request_id = str(message.get("id") or uuid.uuid4().hex[:8])
+        query = message.get("message")
+        if not isinstance(query, str) or not query.strip():
+            self.push({"type": "error", "id": request_id, "detail": "message is required"})
+            return
+        if request_id in self._requests:
+            self.push({"type": "error", "id": request_id, "detail": "A request with this id is in progress"})
+            return
+        if len(self._requests) >= MAX_INFLIGHT:
+            self.push({"type": "error", "id": request_id, "code": "busy",
+                       "detail": f"At most {MAX_INFLIGHT} requests per connection at a time"})
+            return
+        timeout = message.get("timeout")
+        deadline = Deadline.from_header(str(timeout) if timeout is not None else None)
+        task = asyncio.ensure_future(self._chat(request_id, query, deadline))
+        self._requests[request_id] = (task, deadline)
+
+    async def _chat(self, request_id: str, query: str, deadline: Deadline):
+        loop = asyncio.get_running_loop()
+
+        def notice(delay):
+            return loop.call_later(delay, thinking)
+
+        def thinking():
+            nonlocal pending_notice
+            if request_id in self._requests and request_id not in self._streaming:
+                self.push({"type": "status", "id": request_id, "stage": "thinking", "message": "Still thinking…"})
+                pending_notice = notice(THINKING_NOTICE_INTERVAL)
+
+        def on_token(piece: str):
+            # Called from the generation thread
+            try:
+                loop.call_soon_threadsafe(self._on_token, request_id, piece)
+            except RuntimeError:
+                pass
+
+        def on_stage(stage: str):
+            self.push({"type": "status", "id": request_id, "stage": stage})
+
+        pending_notice = notice(THINKING_NOTICE_SECONDS)
+        try:
+            response = await self.answer(query, list(self.session.history), deadline, on_token, on_stage)
+            self.session.add_turn(query, response["response"])
+            self.push({"type": "done", "id": request_id, **response})
+        except asyncio.CancelledError:
+            raise
+        except RateLimited as e:
+            self.push({"type": "error", "id": request_id, "code": "rate_limited" if e.status == 429 else "busy",
+                       "detail": e.detail, "retry_after": e.retry_after})
+        except Exception as e:
+            print(f"WebSocket chat request failed: {e}")
+            self.push({"type": "error", "id": request_id, "detail": "Could not answer this message"})
+        finally:
+            pending_notice.cancel()
+            self._requests.pop(request_id, None)
+            self._streaming.discard(request_id)
+
+    def _cancel(self, request_id: str):
+        entry = self._requests.pop(request_id, None)
+        if entry is None:
+            return
+        task, deadline = entry
+        deadline.cancel()
+        task.cancel()
+        self._tokens.pop(request_id, None)
+        self.push({"type": "cancelled", "id": request_id})
+
+    def _watch(self, ticket_id: str):
+        if ticket_id in self._watches:
+            return
+        updates = self.watch_ticket(ticket_id) if self.watch_ticket is not None else None
+        if updates is None:
+            self.push({"type": "error", "ticket_id": ticket_id, "detail": "Queue ticket not found"})
+            return
+        if len(self._watches) >= MAX_WATCHES:
+            self.push({"type": "error", "ticket_id": ticket_id,
+                       "detail": f"At most {MAX_WATCHES} queue tickets per connection"})
+            return
+
+        async def forward():
+            try:
+                async for status in updates:
+                    self.push({"type": "queue", "ticket_id": ticket_id, **status})
+            except LookupError:
+                # Tickets held by another worker are only found to be unknown once asked for
+                self.push({"type": "error", "ticket_id": ticket_id, "detail": "Queue ticket not found"})
+            finally:
+                self._watches.pop(ticket_id, None)
+
+        self._watches[ticket_id] = asyncio.ensure_future(forward())
+
+    async def run(self, resumed: bool):
+        """Serve the (accepted) connection until either side closes it."""
+        self.push({"type": "session", "session_id": self.session.session_id, "resumed": resumed,
+                   "heartbeat": HEARTBEAT_SECONDS})
+        reader = asyncio.ensure_future(self._reader())
+        writer = asyncio.ensure_future(self._writer())
+        try:
+            await asyncio.wait({reader, writer}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self.closed = True
+            for task, deadline in list(self._requests.values()):
+                deadline.cancel()
+                task.cancel()
+            for task in [reader, writer, *self._watches.values()]:
+                task.cancel()
+            error = reader.exception() if reader.done() and not reader.cancelled() else None
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                print(f"WebSocket chat connection failed: {error}")
+
+
+_registry = SessionRegistry()
+
+
+def get_registry() -> SessionRegistry:
+    return _registry
@@ -0,0 +1,58 @@
+"""
+Request Deadlines
+A per-request time budget that is passed down through retrieval, scraping
+and generation, so each stage only uses the time that remains.
+"""
+
+import os
+import time
+from typing import Optional, Tuple
+
+# Default end-to-end budget for a /chat request (seconds)
+DEFAULT_DEADLINE_SECONDS = float(os.environ.get("NEETHI_CHAT_DEADLINE", "20"))
+
+# Bounds for a client-requested budget (X-Request-Timeout header)
+MIN_DEADLINE_SECONDS = 1.0
+MAX_DEADLINE_SECONDS = 60.0
+
+
+class Deadline:
+    """Absolute point in time (monotonic clock) by which a request must finish."""
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def from_header(cls, value: Optional[str], default: float = DEFAULT_DEADLINE_SECONDS) -> "Deadline":
+        """Build a deadline from an X-Request-Timeout header value (seconds), clamped to sane bounds."""
+        seconds = default
+        if value:
+            try:
+                seconds = float(value)
+            except ValueError:
+                pass
+        return cls(min(max(seconds, MIN_DEADLINE_SECONDS), MAX_DEADLINE_SECONDS))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float) -> float:
+        """The smaller of a stage's own timeout and the time left."""
+        return min(cap, self.remaining())
+
+    def timeouts(self, connect: float, read: float) -> Tuple[float, float]:
+        """Cap a (connect, read) timeout pair by the time left."""
+        remaining = self.remaining()
+        return (min(connect, remaining), min(read, remaining))
+
+    def cancel(self):
+        """Expire now: stages still running stop at their next deadline check."""
+        self.expires_at = time.monotonic()
+
+    def elapsed(self) -> float:
+        return self.budget - (self.expires_at - time.monotonic())
@@ -0,0 +1,117 @@
+"""
+Fast HTML Extraction Layer
+Declarative, selector-targeted extraction for the scrapers using lxml.
+
+Each scraper declares an extraction spec (a plain dict, compiled once at import
+with compile_spec) instead of walking a BeautifulSoup tree by hand:
+
+    compile_spec({
+        "xpaths": [...],          # evaluated in order, results concatenated
+        "output": "text",         # "text" (cleaned text per node) or "cells" (cleaned <td> texts per row)
+        "keywords": [...],        # optional: keep only texts containing one of these (lowercase)
+        "pattern": r"...",        # optional: keep only texts matching this regex
+        "prefilter": rb"...",     # optional: skip parsing entirely if the raw bytes don't match
+        "min_length": 0,          # optional: drop shorter texts
+        "limit": None             # optional: stop after this many results
+    })
+
+Pages are parsed straight from the response bytes; lxml detects the charset
+itself, so the page is never decoded to a Python str as a whole.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from lxml import etree, html
+
+_SPECIAL_CHARS = re.compile(r'[^\w\s.,;:!?()-]')
+
+
+def clean_text(text: str) -> str:
+    """Clean and normalize scraped text (collapse whitespace, drop special characters)."""
+    return _SPECIAL_CHARS.sub('', ' '.join(text.split())).strip()
+
+
+def class_xpath(tags: List[str], classes: List[str]) -> str:
+    """XPath selecting elements of the given tags (or any tag, '*') carrying any of the classes."""
+    class_test = " or ".join(
+        f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')" for cls in classes
+    )
+    return " | ".join(f"//{tag}[@class and ({class_test})]" for tag in tags)
+
+
+def compile_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Compile an extraction spec's XPath expressions and regexes once, up front."""
+    return {
+        "xpaths": [etree.XPath(expr) for expr in spec["xpaths"]],
+        "output": spec.get("output", "text"),
+        "keywords": spec.get("keywords"),
+        "pattern": re.compile(spec["pattern"], re.I) if spec.get("pattern") else None,
+        "prefilter": re.compile(spec["prefilter"], re.I) if spec.get("prefilter") else None,
+        "min_length": spec.get("min_length", 0),
+        "limit": spec.get("limit")
+    }
+
+
+def _node_text(node) -> str:
+    # XPath text() results are plain strings; elements need their descendant text
+    return node if isinstance(node, str) else node.text_content()
+
+
+def parse(raw: bytes) -> Optional[Any]:
+    """Parse raw HTML bytes into an lxml tree (None for an empty/unparseable page)."""
+    if not raw:
+        return None
+    try:
+        return html.fromstring(raw)
+    except (etree.ParserError, ValueError):
+        return None
+
+
+def _run(tree, raw: bytes, compiled: Dict[str, Any]) -> List[Any]:
+    if compiled["prefilter"] is not None and not compiled["prefilter"].search(raw):
+        return []
+    if tree is None:
+        return []
+
+    results = []
+    limit = compiled["limit"]
+    keywords = compiled["keywords"]
+    pattern = compiled["pattern"]
+    min_length = compiled["min_length"]
+
+    for xpath in compiled["xpaths"]:
+        for node in xpath(tree):
+            if compiled["output"] == "cells":
+                cells = [clean_text(td.text_content()) for td in node.iter('td')]
+                if cells:
+                    results.append(cells)
+            else:
+                raw_text = _node_text(node)
+                if pattern is not None and not pattern.search(raw_text):
+                    continue
+                text = clean_text(raw_text)
+                if min_length and len(text) <= min_length:
+                    continue
+                if keywords and not any(keyword in text.lower() for keyword in keywords):
+                    continue
+                results.append(text)
+
+            if limit is not None and len(results) >= limit:
+                return results
+
+    return results
+
+
+def extract(raw: bytes, specs: Dict[str, Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    Run several named (compiled) specs against one page, parsing it at most once.
+
+    The page is not parsed at all when every spec's prefilter rules it out.
+    """
+    needs_tree = any(
+        spec["prefilter"] is None or spec["prefilter"].search(raw)
+        for spec in specs.values()
+    )
+    tree = parse(raw) if needs_tree else None
+    return {name: _run(tree, raw, spec) for name, spec in specs.items()}
@@ -0,0 +1,219 @@
+"""
+Precomputed FAQ Answers
+Generated answers for the knowledge base FAQs (and their paraphrases),
+computed offline through the same retrieval + generation pipeline as
+/chat and served from memory.
+
+Every stored answer records a hash of each knowledge base document it was
+built from (the FAQ itself and the retrieved context). An answer whose
+documents have since changed is not served, and the indexer regenerates
+stale or missing answers in the background at startup. Build them by hand
+with:
+
+    python -m backend.tools.precompute_faq_answers [--force]
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+FAQ_ANSWERS_PATH = os.environ.get("NEETHI_FAQ_ANSWERS", "backend/data/faq_answers.json")
+
+# How often the stored file and the knowledge base are checked for changes (seconds)
+RELOAD_CHECK_INTERVAL = 5
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize(query: str) -> str:
+    """Lookup key for a question: lower case, no punctuation, single spaces."""
+    return " ".join(_PUNCTUATION.sub(" ", query.lower()).split())
+
+
+def document_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _kb_path() -> str:
+    from backend.utils.vector_db import KNOWLEDGE_BASE_PATH
+    return KNOWLEDGE_BASE_PATH
+
+
+def kb_document_hashes() -> Dict[str, str]:
+    """Hash of every knowledge base document as indexed, by document id."""
+    from backend.utils.vector_db import load_kb_documents
+    documents, ids, _ = load_kb_documents()
+    return {doc_id: document_hash(text) for doc_id, text in zip(ids, documents)}
+
+
+def kb_questions() -> List[Dict]:
+    """Each FAQ's document id, question and paraphrases."""
+    with open(_kb_path(), "r") as f:
+        faqs = json.load(f).get("faqs", [])
+    return [{"faq_id": f"faq_{i}", "question": faq["question"], "paraphrases": faq.get("paraphrases", [])}
+            for i, faq in enumerate(faqs)]
+
+
+class FAQAnswerStore:
+    def __init__(self, path: str = FAQ_ANSWERS_PATH):
+        self.path = path
+        self._entries: Dict[str, Dict] = {}       # every stored answer, by normalized question
+        self._fresh: Dict[str, Dict] = {}         # the ones still matching the knowledge base
+        self._by_faq: Dict[str, Dict] = {}        # fresh answers to the canonical FAQ questions, by document id
+        self._stamp = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _file_stamp(self):
+        stamps = []
+        for path in (self.path, _kb_path()):
+            try:
+                stat = os.stat(path)
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < RELOAD_CHECK_INTERVAL and self._stamp is not None:
+            return
+        self._checked_at = now
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+        with self._lock:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    entries = json.load(f).get("entries", {})
+            except (OSError, ValueError):
+                entries = {}
+            try:
+                hashes = kb_document_hashes()
+            except (OSError, ValueError):
+                hashes = {}
+            fresh = {key: entry for key, entry in entries.items() if self.is_fresh(entry, hashes)}
+            self._entries = entries
+            self._fresh = fresh
+            self._by_faq = {entry["faq_id"]: entry for entry in fresh.values() if entry.get("canonical")}
+            self._stamp = stamp
+
+    @staticmethod
+    def is_fresh(entry: Dict, hashes: Dict[str, str]) -> bool:
+        sources = entry.get("source_hashes") or {}
+        return bool(sources) and all(hashes.get(doc_id) == digest for doc_id, digest in sources.items())
+
+    def lookup(self, query: str) -> Optional[Dict]:
+        """The stored answer for this exact question (up to case and punctuation), if still valid."""
+        self._maybe_reload()
+        return self._fresh.get(normalize(query))
+
+    def for_document(self, doc_id: str) -> Optional[Dict]:
+        """The stored answer to the FAQ behind a knowledge base document, if still valid."""
+        self._maybe_reload()
+        return self._by_faq.get(doc_id)
+
+    def entries(self) -> Dict[str, Dict]:
+        self._maybe_reload()
+        return dict(self._entries)
+
+    def invalidate(self):
+        """Re-check every answer against the knowledge base on the next lookup."""
+        self._stamp = None
+        self._checked_at = 0.0
+
+    def save(self, entries: Dict[str, Dict]):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.tmp.{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+        self.invalidate()
+
+    def get_stats(self) -> Dict:
+        self._maybe_reload()
+        return {"stored": len(self._entries), "fresh": len(self._fresh)}
+
+
+_store = FAQAnswerStore()
+_refreshing = threading.Lock()
+
+
+def get_store() -> FAQAnswerStore:
+    return _store
+
+
+def precompute(force: bool = False, store: FAQAnswerStore = None) -> Dict[str, int]:
+    """
+    Generate answers for every FAQ question and paraphrase that has none
+    or whose source documents changed (all of them with force). Returns
+    counts of generated, kept and failed answers.
+    """
+    from backend.utils.ai_response import generate_response
+    from backend.utils.intent import get_intent
+    from backend.utils.vector_db import query_knowledge
+    from backend.utils.web_scraper import get_source_urls
+
+    store = store or _store
+    hashes = kb_document_hashes()
+    old = store.entries()
+    entries = {}
+    counts = {"generated": 0, "kept": 0, "failed": 0}
+
+    for faq in kb_questions():
+        for i, question in enumerate([faq["question"]] + faq["paraphrases"]):
+            key = normalize(question)
+            if key in entries:
+                continue                # a paraphrase that only differs in case or punctuation
+            current = old.get(key)
+            if current and not force and current.get("faq_id") == faq["faq_id"] and store.is_fresh(current, hashes):
+                entries[key] = current
+                counts["kept"] += 1
+                continue
+
+            intent = get_intent(question)
+            context = query_knowledge(question)
+            answer = generate_response(question, context, intent=intent)
+            if not answer:
+                counts["failed"] += 1
+                continue
+            source_ids = {faq["faq_id"]} | {doc["id"] for doc in context if doc.get("id") in hashes}
+            entries[key] = {
+                "faq_id": faq["faq_id"],
+                "question": question,
+                "canonical": i == 0,
+                "answer": answer,
+                "sources": list(dict.fromkeys(get_source_urls(question))),
+                "intent": intent,
+                "source_hashes": {doc_id: hashes[doc_id] for doc_id in sorted(source_ids) if doc_id in hashes},
+                "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            counts["generated"] += 1
+
+    if counts["generated"] or len(entries) != len(old):
+        store.save(entries)
+    return counts
+
+
+def refresh_in_background():
+    """Regenerate stale or missing answers in a thread, when an LLM backend is up (indexer process only)."""
+    def run():
+        from backend.utils.ai_response import check_ollama_status
+        if not _refreshing.acquire(blocking=False):
+            return
+        try:
+            if check_ollama_status():
+                counts = precompute()
+                print(f"FAQ answers: {counts['generated']} generated, {counts['kept']} up to date, "
+                      f"{counts['failed']} failed")
+        except Exception as e:
+            print(f"FAQ answer precomputation failed: {e}")
+        finally:
+            _refreshing.release()
+
+    threading.Thread(target=run, name="faq-answers", daemon=True).start()
@@ -0,0 +1,278 @@
+"""
+Shared HTTP Client for the Scrapers
+Pooled keep-alive connections per host, HTTP/2 where available,
+a bounded retry budget with backoff, and connection metrics.
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# HTTP/2 needs httpx with the h2 extra; otherwise pooled requests sessions (HTTP/1.1 keep-alive) are used
+try:
+    import httpx
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = os.environ.get("NEETHI_HTTP2", "1") != "0"
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Connections kept alive per host
+POOL_SIZE = 10
+
+# Attempts per request (first try + retries)
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 0.25   # seconds, doubled per retry
+BACKOFF_MAX = 2.0
+
+# Retry budget: each request earns a fraction of a retry token, each retry spends one.
+# Bounds retries to ~10% of traffic per host so a struggling origin isn't hammered.
+RETRY_BUDGET_RATIO = 0.1
+RETRY_BUDGET_MAX = 10.0
+
+RETRY_STATUSES = {429, 502, 503, 504}
+
+DEFAULT_TIMEOUT = (5.0, 10.0)  # (connect, read) seconds
+
+
+class FetchError(Exception):
+    """Raised when a request fails after exhausting its attempts or retry budget."""
+
+
+# ===============================
+# METRICS
+# ===============================
+
+_metrics_lock = threading.Lock()
+_metrics: Dict[str, Dict[str, Any]] = {}
+
+
+def _host_metrics(host: str) -> Dict[str, Any]:
+    metrics = _metrics.get(host)
+    if metrics is None:
+        metrics = _metrics.setdefault(host, {
+            "requests": 0,
+            "new_connections": 0,
+            "handshake_ms_total": 0.0,
+            "handshake_ms_max": 0.0,
+            "retries": 0,
+            "retry_budget_exhausted": 0,
+            "failures": 0,
+            "http_versions": {}
+        })
+    return metrics
+
+
+def _record_handshake(host: str, elapsed_ms: float):
+    with _metrics_lock:
+        metrics = _host_metrics(host)
+        metrics["new_connections"] += 1
+        metrics["handshake_ms_total"] += elapsed_ms
+        metrics["handshake_ms_max"] = max(metrics["handshake_ms_max"], elapsed_ms)
+
+
+def _record(host: str, key: str, http_version: Optional[str] = None):
+    with _metrics_lock:
+        metrics = _host_metrics(host)
+        metrics[key] += 1
+        if http_version:
+            metrics["http_versions"][http_version] = metrics["http_versions"].get(http_version, 0) + 1
+
+
+def get_metrics() -> Dict[str, Dict[str, Any]]:
+    """Per-host connection reuse and handshake statistics."""
+    with _metrics_lock:
+        report = {}
+        for host, m in _metrics.items():
+            reused = max(m["requests"] - m["new_connections"], 0)
+            report[host] = {
+                "requests": m["requests"],
+                "new_connections": m["new_connections"],
+                "connection_reuse_rate": round(reused / m["requests"], 3) if m["requests"] else None,
+                "avg_handshake_ms": round(m["handshake_ms_total"] / m["new_connections"], 1) if m["new_connections"] else None,
+                "max_handshake_ms": round(m["handshake_ms_max"], 1),
+                "retries": m["retries"],
+                "retry_budget_exhausted": m["retry_budget_exhausted"],
+                "failures": m["failures"],
+                "http_versions": dict(m["http_versions"])
+            }
+        return {"backend": "httpx-h2" if HTTP2_AVAILABLE else "requests", "hosts": report}
+
+
+# ===============================
+# requests BACKEND (HTTP/1.1 keep-alive)
+# ===============================
+# urllib3 connection classes that time TCP connect + TLS handshake
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _record_handshake(self.host, (time.perf_counter() - start) * 1000)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _record_handshake(self.host, (time.perf_counter() - start) * 1000)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool
+        }
+
+
+def _new_requests_session() -> requests.Session:
+    session = requests.Session()
+    # Retries are handled by our budgeted loop, not urllib3
+    adapter = _TimedAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# ===============================
+# HOST CLIENTS
+# ===============================
+
+class HostClient:
+    """Keep-alive connection pool and retry budget for a single host."""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.retry_tokens = RETRY_BUDGET_MAX
+        self._lock = threading.Lock()
+        if HTTP2_AVAILABLE:
+            self._client = httpx.Client(
+                http2=True,
+                verify=True,
+                limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+            )
+        else:
+            self._client = _new_requests_session()
+
+    def _earn_retry_token(self):
+        with self._lock:
+            self.retry_tokens = min(RETRY_BUDGET_MAX, self.retry_tokens + RETRY_BUDGET_RATIO)
+
+    def _spend_retry_token(self) -> bool:
+        with self._lock:
+            if self.retry_tokens >= 1:
+                self.retry_tokens -= 1
+                return True
+            return False
+
+    def _send(self, url: str, headers: Dict[str, str], timeout: Tuple[float, float]):
+        connect_timeout, read_timeout = timeout
+        if HTTP2_AVAILABLE:
+            handshake = {}
+
+            def trace(event: str, info: Dict):
+                if event == "connection.connect_tcp.started":
+                    handshake["start"] = time.perf_counter()
+                elif event in ("connection.start_tls.complete", "connection.connect_tcp.complete"):
+                    handshake["end"] = time.perf_counter()
+
+            response = self._client.get(
+                url,
+                headers=headers,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                extensions={"trace": trace}
+            )
+            if "start" in handshake and "end" in handshake:
+                _record_handshake(self.host, (handshake["end"] - handshake["start"]) * 1000)
+            return response, response.http_version
+
+        response = self._client.get(url, headers=headers, timeout=timeout, verify=True)
+        version = {10: "HTTP/1.0", 11: "HTTP/1.1"}.get(getattr(response.raw, "version", None))
+        return response, version
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Tuple[float, float] = DEFAULT_TIMEOUT, deadline=None):
+        """
+        GET with bounded retries; returns the response (any status) or raises FetchError.
+
+        With a deadline, each attempt's timeouts are capped by the time left and
+        no retry is started that couldn't finish in time.
+        """
+        self._earn_retry_token()
+        last_error = None
+
+        for attempt in range(MAX_ATTEMPTS):
+            if attempt:
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (attempt - 1))) * random.uniform(0.5, 1.0)
+                if deadline is not None and deadline.remaining() <= delay:
+                    last_error = last_error or FetchError("deadline exceeded")
+                    break
+                if not self._spend_retry_token():
+                    _record(self.host, "retry_budget_exhausted")
+                    break
+                _record(self.host, "retries")
+                time.sleep(delay)
+
+            attempt_timeout = timeout
+            if deadline is not None:
+                if deadline.expired:
+                    last_error = FetchError("deadline exceeded")
+                    break
+                attempt_timeout = deadline.timeouts(*timeout)
+
+            try:
+                response, version = self._send(url, headers or {}, attempt_timeout)
+            except Exception as e:  # requests / httpx transport errors
+                last_error = e
+                continue
+
+            _record(self.host, "requests", version)
+            if response.status_code in RETRY_STATUSES and attempt < MAX_ATTEMPTS - 1:
+                last_error = FetchError(f"HTTP {response.status_code}")
+                continue
+            return response
+
+        _record(self.host, "failures")
+        raise FetchError(f"GET {url} failed: {last_error}")
+
+
+_clients_lock = threading.Lock()
+_clients: Dict[str, HostClient] = {}
+_clients_pid = os.getpid()
+
+
+def client_for(url: str) -> HostClient:
+    """Return the shared client for a URL's host (re-created after a fork)."""
+    global _clients_pid
+    parts = urlsplit(url)
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            # Pooled sockets must not be shared with the parent process
+            _clients.clear()
+            _clients_pid = os.getpid()
+        client = _clients.get(parts.netloc)
+        if client is None:
+            # Metrics are keyed by hostname, matching what the connection classes see
+            client = _clients[parts.netloc] = HostClient(parts.hostname or parts.netloc)
+        return client
+
+
+def get(url: str, headers: Optional[Dict[str, str]] = None, timeout: Tuple[float, float] = DEFAULT_TIMEOUT, deadline=None):
+    """GET a URL through its host's pooled client."""
+    return client_for(url).get(url, headers=headers, timeout=timeout, deadline=deadline)
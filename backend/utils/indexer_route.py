@@ -0,0 +1,163 @@
+"""
+Indexer Routing
+Routes requests for state that lives in one process to the indexer worker.
+
+The Tele-Law matching engine (utils/matching.py) keeps its queue, lawyer
+availability and tickets in memory. Under backend/server.py every worker
+would otherwise keep its own copy, so one lawyer could be matched twice and
+a ticket created on one worker would be unknown to the others. Instead the
+master binds a Unix socket that only worker 0 (the indexer) listens on, and
+every other worker forwards INDEXER_ROUTES to it, streaming responses (SSE)
+back as they arrive. The receiving worker has already applied CORS and the
+client's rate limits, so forwarded requests are not charged again; it passes
+the client's identity (rate_limit.client_key) along in CLIENT_HEADER, which
+is only trusted on requests that came in over the socket.
+
+With a single process (`python -m backend.main`, or one worker) nothing is
+forwarded.
+"""
+
+import asyncio
+import json
+from typing import AsyncIterator, Dict
+
+from backend.utils.worker import indexer_socket, is_indexer
+
+INDEXER_ROUTES = ("/tele-law",)
+
+# Seconds to connect to the indexer (it may be restarting) and to wait for its response headers
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+
+# Not forwarded: per-connection headers, and Origin so only the receiving worker adds CORS headers
+HOP_HEADERS = {b"connection", b"keep-alive", b"transfer-encoding", b"upgrade", b"host", b"origin",
+               b"content-length"}
+
+# Client identity of a forwarded request, set by the receiving worker
+CLIENT_HEADER = b"x-neethi-client"
+
+_client = {"client": None}
+
+
+def _routed(path: str) -> bool:
+    return any(path == prefix or path.startswith(prefix + "/") for prefix in INDEXER_ROUTES)
+
+
+def should_forward(path: str) -> bool:
+    """True when this worker must hand the request to the indexer."""
+    return _routed(path) and not is_indexer() and indexer_socket() is not None
+
+
+def is_forwarded(scope) -> bool:
+    """A request that reached the indexer over its private socket (already admitted by another worker)."""
+    server = scope.get("server")
+    return server is not None and indexer_socket() is not None and server[0] == indexer_socket()
+
+
+def _get_client():
+    # Created on first use, i.e. in the worker after the fork
+    if _client["client"] is None:
+        import httpx
+        _client["client"] = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(uds=indexer_socket()),
+            base_url="http://indexer",
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        )
+    return _client["client"]
+
+
+async def _json_response(send, status: int, payload: Dict):
+    body = json.dumps(payload).encode()
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class IndexerRouteMiddleware:
+    """Forwards INDEXER_ROUTES from the other workers to the indexer (see module docstring)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not should_forward(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        await self._forward(scope, receive, send)
+
+    async def _forward(self, scope, receive, send):
+        import httpx
+        from backend.utils.rate_limit import client_key
+
+        body = b""
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        client = _get_client()
+        url = (scope.get("raw_path") or scope["path"].encode()).decode("latin-1")
+        if scope.get("query_string"):
+            url += "?" + scope["query_string"].decode("latin-1")
+        request = client.build_request(
+            scope["method"],
+            url,
+            headers=[(k, v) for k, v in scope["headers"] if k not in HOP_HEADERS and k != CLIENT_HEADER]
+                    + [(CLIENT_HEADER, client_key(scope).encode("latin-1"))],
+            content=body,
+        )
+
+        async def relay():
+            try:
+                response = await client.send(request, stream=True)
+            except httpx.TransportError as e:
+                print(f"Could not reach the indexer for {scope['path']}: {e}")
+                await _json_response(send, 503, {"detail": "Service temporarily unavailable, try again shortly"})
+                return
+            try:
+                await send({"type": "http.response.start", "status": response.status_code, "headers": [
+                    (k, v) for k, v in response.headers.raw if k.lower() not in HOP_HEADERS
+                ]})
+                async for chunk in response.aiter_raw():
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                await send({"type": "http.response.body", "body": b""})
+            finally:
+                await response.aclose()
+
+        async def disconnected():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        # Stop relaying (and so release the indexer's stream) when the client goes away
+        relaying = asyncio.ensure_future(relay())
+        watching = asyncio.ensure_future(disconnected())
+        try:
+            await asyncio.wait({relaying, watching}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            watching.cancel()
+            if not relaying.done():
+                relaying.cancel()
+            try:
+                await relaying
+            except asyncio.CancelledError:
+                pass
+
+
+async def ticket_statuses(ticket_id: str) -> AsyncIterator[Dict]:
+    """
+    A queue ticket's status updates read from the indexer's event stream (for
+    /ws/chat subscribers on other workers). Raises LookupError for unknown tickets.
+    """
+    async with _get_client().stream("GET", f"/tele-law/queue/{ticket_id}/events") as response:
+        if response.status_code == 404:
+            raise LookupError(ticket_id)
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith("data:"):
+                yield json.loads(line[len("data:"):])
+
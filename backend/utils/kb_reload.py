@@ -0,0 +1,118 @@
+"""
+Knowledge Base Reload
+Rebuilds the knowledge base index when knowledge_base.json changes, or when
+an admin asks for it, without restarting the server. The indexer process
+builds the new version in the background, checks it and switches every
+worker over (see build_kb_index in vector_db.py); requests keep being
+answered from the previous version until then.
+
+Other workers cannot build, so a reload requested on one of them is left
+for the indexer as a marker file next to the build record.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from backend.utils.vector_db import KB_INDEX_PATH, KNOWLEDGE_BASE_PATH, build_kb_index, retire_kb_collections
+
+# How often the knowledge base file and the reload marker are checked (seconds)
+WATCH_INTERVAL = 5
+
+RELOAD_REQUEST_PATH = f"{KB_INDEX_PATH}.reload"
+
+_reload_requested = threading.Event()
+_force = {"value": False}
+_watcher: threading.Thread = None
+_status: Dict = {"last_reload": None, "last_result": None, "last_error": None}
+
+
+def _file_stamp(path: str):
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+def reload_now(force: bool = False) -> Dict:
+    """Build and switch to the current knowledge base (indexer process only)."""
+    _status["last_reload"] = time.time()
+    try:
+        result = build_kb_index(force=force)
+    except Exception as e:
+        _status.update({"last_error": f"{type(e).__name__}: {e}"})
+        print(f"Knowledge base reload failed, still serving the previous version: {e}")
+        raise
+    _status.update({"last_result": result, "last_error": None})
+    if result["changed"]:
+        print(f"Knowledge base reloaded: {result['documents']} documents, {result['embedded']} embedded "
+              f"in {result['seconds']}s ({result['version']})")
+    return result
+
+
+def _take_request() -> Optional[bool]:
+    """Whether a reload was requested (and if it is forced), consuming the request."""
+    forced = None
+    if _reload_requested.is_set():
+        _reload_requested.clear()
+        forced = _force["value"]
+        _force["value"] = False
+    try:
+        with open(RELOAD_REQUEST_PATH, "r", encoding="utf-8") as f:
+            marker = json.load(f)
+        os.remove(RELOAD_REQUEST_PATH)
+        forced = bool(forced) or bool(marker.get("force"))
+    except (OSError, ValueError):
+        pass
+    return forced
+
+
+def _run_watcher():
+    built = seen = _file_stamp(KNOWLEDGE_BASE_PATH)
+    while True:
+        _reload_requested.wait(WATCH_INTERVAL)
+        current = _file_stamp(KNOWLEDGE_BASE_PATH)
+        forced = _take_request()
+        # An edited file is built once it has not changed for one interval
+        settled = current == seen
+        seen = current
+        if forced is not None or (current != built and settled):
+            built = current
+            try:
+                reload_now(force=bool(forced))
+            except Exception:
+                pass
+        try:
+            retire_kb_collections()
+        except Exception as e:
+            print(f"Retiring knowledge base builds failed: {e}")
+
+
+def start_watcher():
+    """Start the background watch thread (once, in the indexer process)."""
+    global _watcher
+    if _watcher is None or not _watcher.is_alive():
+        _watcher = threading.Thread(target=_run_watcher, name="kb-reload", daemon=True)
+        _watcher.start()
+
+
+def request_reload(force: bool = False, local: bool = True):
+    """
+    Ask for a reload: handled right away by the watcher in this process when
+    it is the indexer (local), else picked up by the indexer within WATCH_INTERVAL.
+    """
+    if local:
+        _force["value"] = _force["value"] or force
+        _reload_requested.set()
+        return
+    tmp = f"{RELOAD_REQUEST_PATH}.tmp.{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"force": force, "requested_at": time.time()}, f)
+    os.replace(tmp, RELOAD_REQUEST_PATH)
+
+
+def get_status() -> Dict:
+    return dict(_status)
@@ -0,0 +1,150 @@
+"""
+Knowledge Base Snapshots
+The knowledge base embeddings and documents exported from a build into one
+read-only file that every worker memory-maps, instead of each process
+loading its own copy of the Chroma index. Vectors are stored as int8 (one
+scale per vector) or float16, searched by brute force over NumPy views of
+the mapping, so N workers share a single page-cache copy and opening a
+snapshot costs an mmap.
+
+Layout (little-endian, sections 64-byte aligned):
+    header   magic, format, count, dim, dtype, section offsets
+    vectors  count x dim int8 | float16
+    scales   count float32    (int8: vector = int8 * scale)
+    norms    count float32    (squared length of each stored vector)
+    offsets  count + 1 uint64 (into the records blob)
+    records  one UTF-8 JSON {"id", "content", "metadata"} per document
+"""
+
+import json
+import mmap
+import os
+import struct
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+SNAPSHOT_DIR = os.environ.get("NEETHI_KB_SNAPSHOT_DIR", "backend/data/kb_snapshots")
+
+# Vector encoding of new snapshots: int8, float16, or off (search Chroma directly)
+SNAPSHOT_DTYPE = os.environ.get("NEETHI_KB_SNAPSHOT", "int8").lower()
+
+MAGIC = b"NKBSNAP\x00"
+FORMAT = 1
+_HEADER = struct.Struct("<8sIIII" + "Q" * 5)
+_DTYPES = {1: np.int8, 2: np.float16}
+_DTYPE_CODES = {"int8": 1, "float16": 2}
+_ALIGN = 64
+
+# Rows scored per block (bounds the float32 scratch space of a search)
+SEARCH_BLOCK_ROWS = 8192
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def snapshot_path(version: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{version}.{SNAPSHOT_DTYPE}.kbsnap")
+
+
+def write_snapshot(path: str, ids: Sequence[str], documents: Sequence[str], metadatas: Sequence[Dict],
+                   embeddings, dtype: str = SNAPSHOT_DTYPE) -> str:
+    """Write a snapshot atomically; returns its path."""
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    count, dim = vectors.shape
+    if dtype == "int8":
+        peak = np.abs(vectors).max(axis=1)
+        scales = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+        stored = np.rint(vectors / scales[:, None]).astype(np.int8)
+        restored = stored.astype(np.float32) * scales[:, None]
+    elif dtype == "float16":
+        scales = np.ones(count, dtype=np.float32)
+        stored = vectors.astype(np.float16)
+        restored = stored.astype(np.float32)
+    else:
+        raise ValueError(f"Unknown snapshot dtype: {dtype}")
+    norms = np.einsum("ij,ij->i", restored, restored).astype(np.float32)
+
+    records = [json.dumps({"id": doc_id, "content": doc, "metadata": meta}, ensure_ascii=False).encode("utf-8")
+               for doc_id, doc, meta in zip(ids, documents, metadatas)]
+    offsets = np.zeros(count + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(r) for r in records])
+
+    sections = [stored.tobytes(), scales.tobytes(), norms.tobytes(), offsets.tobytes(), b"".join(records)]
+    positions = []
+    position = _aligned(_HEADER.size)
+    for data in sections:
+        positions.append(position)
+        position = _aligned(position + len(data))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT, count, dim, _DTYPE_CODES[dtype], *positions))
+        for start, data in zip(positions, sections):
+            f.seek(start)
+            f.write(data)
+    os.replace(tmp, path)
+    return path
+
+
+class Snapshot:
+    """A read-only mapped snapshot. Every array is a view of the mapping; nothing is copied."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt, count, dim, dtype_code, *positions = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or fmt != FORMAT or dtype_code not in _DTYPES:
+            raise ValueError(f"{path} is not a knowledge base snapshot")
+        vectors_at, scales_at, norms_at, offsets_at, records_at = positions
+        self.count = count
+        self.dim = dim
+        self.dtype = np.dtype(_DTYPES[dtype_code])
+        buffer = self._mmap
+        self.vectors = np.frombuffer(buffer, self.dtype, count * dim, vectors_at).reshape(count, dim)
+        self.scales = np.frombuffer(buffer, np.float32, count, scales_at)
+        self.norms = np.frombuffer(buffer, np.float32, count, norms_at)
+        self.offsets = np.frombuffer(buffer, np.uint64, count + 1, offsets_at)
+        self._records_at = records_at
+
+    def record(self, i: int) -> Dict:
+        start = self._records_at + int(self.offsets[i])
+        end = self._records_at + int(self.offsets[i + 1])
+        return json.loads(self._mmap[start:end].decode("utf-8"))
+
+    def distances(self, query) -> np.ndarray:
+        """Squared L2 distance from the query to every stored vector (what Chroma reports)."""
+        query = np.asarray(query, dtype=np.float32)
+        dots = np.empty(self.count, dtype=np.float32)
+        for start in range(0, self.count, SEARCH_BLOCK_ROWS):
+            block = self.vectors[start:start + SEARCH_BLOCK_ROWS]
+            dots[start:start + len(block)] = (block.astype(np.float32) @ query) * self.scales[start:start + len(block)]
+        return np.maximum(self.norms - 2 * dots + float(query @ query), 0.0)
+
+    def search(self, query, n_results: int = 2) -> List[Dict]:
+        """Closest documents, best first, shaped like query_knowledge results."""
+        if self.count == 0:
+            return []
+        distances = self.distances(query)
+        n_results = min(n_results, self.count)
+        top = np.argpartition(distances, n_results - 1)[:n_results]
+        top = top[np.argsort(distances[top], kind="stable")]
+        return [{**self.record(int(i)), "distance": float(distances[i])} for i in top]
+
+    def get_stats(self) -> Dict:
+        return {"path": self.path, "documents": self.count, "dim": self.dim, "dtype": self.dtype.name,
+                "bytes": len(self._mmap)}
+
+
+def open_snapshot(path: Optional[str]) -> Optional[Snapshot]:
+    """Map a snapshot, or None when there is none (or it cannot be read)."""
+    if not path or SNAPSHOT_DTYPE == "off":
+        return None
+    try:
+        return Snapshot(path)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Knowledge base snapshot {path} not usable: {e}")
+        return None
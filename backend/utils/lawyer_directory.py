@@ -0,0 +1,188 @@
+"""
+Tele-Law Lawyer Directory
+In-memory index over the panel lawyer directory for filtered, paged lookups.
+
+Lawyers are stored once, in rating order, and addressed by their rank.
+Specialization tokens, languages and states each map to a boolean mask over
+the ranks, so a filtered query is a few vectorised ANDs followed by a slice
+of the matching ranks. Availability lives in its own mask that can be flipped
+per lawyer without touching the profiles, so reads never mutate shared state.
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Optional JSON file with the full panel directory (a list of lawyer dicts)
+LAWYERS_FILE = os.environ.get("NEETHI_LAWYERS_FILE", "")
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Per-lawyer fields kept out of the profile and held by the availability structures
+AVAILABILITY_FIELDS = ("available", "next_available")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"and", "of", "the", "law"}
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _query_tokens(text: str) -> List[str]:
+    """Query tokens without filler words, unless the query is only filler ("law")."""
+    tokens = _tokens(text)
+    return [t for t in tokens if t not in _STOPWORDS] or tokens
+
+
+def _sort_key(lawyer: Dict) -> Tuple:
+    return (-float(lawyer.get("rating") or 0), -int(lawyer.get("experience_years") or 0), lawyer["id"])
+
+
+class LawyerDirectory:
+    def __init__(self, lawyers: Iterable[Dict]):
+        lawyers = sorted(lawyers, key=_sort_key)
+        count = len(lawyers)
+
+        # Profiles in rank order, without the availability fields
+        self._profiles: List[Dict] = [
+            {k: v for k, v in lawyer.items() if k not in AVAILABILITY_FIELDS} for lawyer in lawyers
+        ]
+        self._rank_by_id: Dict[str, int] = {lawyer["id"]: rank for rank, lawyer in enumerate(lawyers)}
+
+        self._specialization: Dict[str, np.ndarray] = {}
+        self._language: Dict[str, np.ndarray] = {}
+        self._state: Dict[str, np.ndarray] = {}
+        for rank, lawyer in enumerate(lawyers):
+            for token in _tokens(lawyer.get("specialization", "")):
+                self._mask_for(self._specialization, token, count)[rank] = True
+            for language in lawyer.get("languages", []):
+                self._mask_for(self._language, language.lower(), count)[rank] = True
+            if lawyer.get("state"):
+                self._mask_for(self._state, lawyer["state"].lower(), count)[rank] = True
+
+        # Availability: a mask for filtering plus next-slot labels for busy lawyers
+        self._available = np.array([bool(lawyer.get("available")) for lawyer in lawyers], dtype=bool)
+        self._next_available: Dict[int, str] = {
+            rank: lawyer["next_available"] for rank, lawyer in enumerate(lawyers) if lawyer.get("next_available")
+        }
+        # Bumped on every availability change, so cached listings know they are stale
+        self.version = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _mask_for(index: Dict[str, np.ndarray], key: str, count: int) -> np.ndarray:
+        mask = index.get(key)
+        if mask is None:
+            mask = index[key] = np.zeros(count, dtype=bool)
+        return mask
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    # ---- lookups ----
+
+    def _view(self, rank: int) -> Dict:
+        """Fresh dict for one lawyer: profile plus current availability."""
+        lawyer = dict(self._profiles[rank])
+        available = bool(self._available[rank])
+        lawyer["available"] = available
+        lawyer["next_available"] = None if available else self._next_available.get(rank)
+        return lawyer
+
+    def lawyers(self) -> Iterator[Dict]:
+        """Every lawyer, best rated first."""
+        for rank in range(len(self._profiles)):
+            yield self._view(rank)
+
+    def get(self, lawyer_id: str) -> Optional[Dict]:
+        rank = self._rank_by_id.get(lawyer_id)
+        return None if rank is None else self._view(rank)
+
+    def _specialization_mask(self, specialization: str) -> np.ndarray:
+        """Every query token must match (as a prefix) a token of the lawyer's specialization."""
+        mask = np.ones(len(self._profiles), dtype=bool)
+        for token in _query_tokens(specialization):
+            token_mask = self._specialization.get(token)
+            if token_mask is None:
+                prefixed = [m for t, m in self._specialization.items() if t.startswith(token)]
+                token_mask = np.logical_or.reduce(prefixed) if prefixed else np.zeros_like(mask)
+            mask &= token_mask
+        return mask
+
+    def _match(self, specialization: Optional[str], language: Optional[str], state: Optional[str]) -> np.ndarray:
+        mask = np.ones(len(self._profiles), dtype=bool)
+        if specialization:
+            mask &= self._specialization_mask(specialization)
+        for index, value in ((self._language, language), (self._state, state)):
+            if value:
+                value_mask = index.get(value.strip().lower())
+                if value_mask is None:
+                    return np.zeros_like(mask)
+                mask &= value_mask
+        return mask
+
+    def search(
+        self,
+        specialization: Optional[str] = None,
+        language: Optional[str] = None,
+        state: Optional[str] = None,
+        available: Optional[bool] = None,
+        page: int = 1,
+        page_size: int = DEFAULT_PAGE_SIZE
+    ) -> Dict:
+        """
+        Filtered, rating-ordered page of lawyers.
+
+        Returns dict with 'total' (matches), 'available_now' (matches free now),
+        'page', 'page_size' and 'lawyers'.
+        """
+        page = max(1, page)
+        page_size = min(max(1, page_size), MAX_PAGE_SIZE)
+
+        mask = self._match(specialization, language, state)
+        available_mask = mask & self._available
+        if available is not None:
+            mask = available_mask if available else mask & ~self._available
+
+        ranks = np.flatnonzero(mask)
+        start = (page - 1) * page_size
+        return {
+            "total": int(ranks.size),
+            "available_now": int(np.count_nonzero(available_mask)),
+            "page": page,
+            "page_size": page_size,
+            "lawyers": [self._view(int(rank)) for rank in ranks[start:start + page_size]]
+        }
+
+    # ---- availability ----
+
+    def set_availability(self, lawyer_id: str, available: bool, next_available: Optional[str] = None) -> bool:
+        """Update one lawyer's availability; returns False for an unknown id."""
+        rank = self._rank_by_id.get(lawyer_id)
+        if rank is None:
+            return False
+        with self._lock:
+            self._available[rank] = available
+            if available or not next_available:
+                self._next_available.pop(rank, None)
+            else:
+                self._next_available[rank] = next_available
+            self.version += 1
+        return True
+
+    def available_count(self) -> int:
+        return int(np.count_nonzero(self._available))
+
+
+def load_lawyers(default: List[Dict], path: str = LAWYERS_FILE) -> List[Dict]:
+    """The panel directory from LAWYERS_FILE when configured, else the given default."""
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return default
@@ -0,0 +1,77 @@
+"""
+Live Content Index
+Periodically scrapes the live feeds and indexes them into the vector store,
+so freshness queries ("latest", "news", ...) are answered from local
+retrieval instead of synchronous web requests.
+"""
+
+import threading
+import time
+from typing import Dict, List
+
+from backend.utils import scrape_cache
+from backend.utils.vector_db import expire_live_items, index_live_items, query_live
+from backend.utils.web_scraper import get_live_items
+
+# Seconds between background refreshes of the live feeds
+REFRESH_INTERVAL = 30 * 60
+
+# Freshness queries only use live chunks fetched within this window
+FRESHNESS_WINDOW = 24 * 3600
+
+_refresh_requested = threading.Event()
+_refresher: threading.Thread = None
+_status: Dict = {"last_refresh": None, "last_indexed": 0, "last_expired": 0, "last_purged": 0}
+
+
+def refresh_live_index() -> Dict:
+    """Scrape every live feed once, index the items, drop expired chunks and purge old scrape cache entries."""
+    items = get_live_items()
+    fetched_at = time.time()
+    indexed = index_live_items(items, fetched_at=fetched_at) if items else 0
+    expired = expire_live_items()
+    purged = scrape_cache.purge_older_than(scrape_cache.RETENTION_SECONDS)
+    _status.update({"last_refresh": fetched_at, "last_indexed": indexed, "last_expired": expired,
+                    "last_purged": purged})
+    print(f"Live index refreshed: {indexed} chunks indexed, {expired} expired, {purged} cache entries purged.")
+    return dict(_status)
+
+
+def _run_refresher():
+    while True:
+        try:
+            refresh_live_index()
+        except Exception as e:
+            print(f"Live index refresh failed: {e}")
+        _refresh_requested.wait(REFRESH_INTERVAL)
+        _refresh_requested.clear()
+
+
+def start_refresher():
+    """Start the background refresh thread (once per process)."""
+    global _refresher
+    if _refresher is None or not _refresher.is_alive():
+        _refresher = threading.Thread(target=_run_refresher, name="live-index-refresher", daemon=True)
+        _refresher.start()
+
+
+def request_refresh():
+    """Ask the background refresher to run now instead of waiting for its interval."""
+    _refresh_requested.set()
+
+
+def search_live(query: str, max_age_seconds: float = FRESHNESS_WINDOW) -> Dict[str, List]:
+    """
+    Answer a freshness query from the live index.
+
+    Returns dict with 'content' and 'sources' keys, like scrape_for_query().
+    """
+    docs = query_live(query, max_age_seconds=max_age_seconds)
+    return {
+        "content": "\n".join(f"- {doc['content']}" for doc in docs),
+        "sources": list(dict.fromkeys(doc["metadata"]["url"] for doc in docs if doc["metadata"].get("url")))
+    }
+
+
+def get_status() -> Dict:
+    return dict(_status)
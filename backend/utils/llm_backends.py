@@ -0,0 +1,577 @@
+"""
+LLM Backends and Routing
+Generation backends behind one interface (Ollama, an OpenAI-compatible
+server such as llama.cpp / vLLM / LM Studio, and a deterministic stub for
+tests) and a router that picks a model per request.
+
+Routes are tried in order of preference: a route accepts a request by
+intent and prompt size, and among the accepting routes whose backend is up
+the first one wins unless its expected completion time — its queue of
+in-flight requests times its recent latency — is well above another's, or
+beyond the time the request has left. Latency, time to first token and
+token rate are tracked per route as moving averages.
+
+Configuration (environment):
+  NEETHI_LLM_BACKEND       ollama (default), openai or stub
+  NEETHI_LLM_MODEL         model for open-ended questions (default llama3:8b)
+  NEETHI_LLM_SMALL_MODEL   model for simple service guidance (default llama3.2:3b);
+                           set it empty to send everything to NEETHI_LLM_MODEL
+  OLLAMA_BASE_URL          default http://localhost:11434; a comma-separated list
+                           spreads generation over several Ollama hosts
+  NEETHI_OPENAI_BASE_URL   default http://localhost:8080/v1
+  NEETHI_OPENAI_API_KEY    sent as a bearer token when set
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+import requests
+
+OLLAMA_BASE_URLS = [url.strip() for url in os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434").split(",")
+                    if url.strip()]
+OLLAMA_BASE_URL = OLLAMA_BASE_URLS[0]
+OPENAI_BASE_URL = os.environ.get("NEETHI_OPENAI_BASE_URL", "http://localhost:8080/v1")
+
+# Default generation options (Ollama naming)
+DEFAULT_OPTIONS = {
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "num_predict": 500
+}
+
+# Intents whose answers are short service guidance, fine for a small model
+SIMPLE_INTENTS = frozenset({"case_status", "tele_law", "ecourts", "vacancies", "legal_aid"})
+
+# Prompts longer than this (characters) go to the large model
+SMALL_MODEL_MAX_PROMPT = 6000
+
+# How long a backend availability check is trusted (seconds)
+AVAILABILITY_TTL = 15
+# Longest an availability check may take (seconds); a request's deadline can shorten it
+CHECK_TIMEOUT = 5
+
+# Moving-average weight of the newest observation
+EWMA_ALPHA = 0.2
+
+# Prefer a later route only when the preferred one is expected to take this much longer
+SWITCH_FACTOR = 1.5
+# ... and by at least this many seconds
+MIN_SWITCH_SECONDS = 1.0
+
+# An Ollama host that fails is left out for this long before it is checked
+# again, doubling with each failed check up to EJECT_MAX_SECONDS
+EJECT_SECONDS = 5
+EJECT_MAX_SECONDS = 120
+
+# A session keeps to its Ollama host unless that host has this many more
+# requests outstanding than the least busy one
+AFFINITY_SLACK = 2
+
+
+class BackendError(Exception):
+    pass
+
+
+# ===============================
+# BACKENDS
+# ===============================
+
+class LLMBackend:
+    """
+    A model served somewhere. stream() yields the generated text piece by
+    piece and may record {'tokens': n, 'seconds': s} in usage when the
+    server reports them.
+    """
+
+    kind = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def stream(self, prompt: str, system: str, options: Dict, timeout: Tuple[float, float],
+               usage: Dict, session_id: Optional[str] = None) -> Iterator[str]:
+        raise NotImplementedError
+
+    def check(self, timeout: float) -> bool:
+        raise NotImplementedError
+
+    def warm_up(self, timeout: float):
+        """Load the model ahead of the first request, where the server loads models lazily."""
+
+    @property
+    def label(self) -> str:
+        return f"{self.kind}:{self.model}"
+
+
+class OllamaBackend(LLMBackend):
+    kind = "ollama"
+
+    def __init__(self, model: str, base_url: str = OLLAMA_BASE_URL):
+        super().__init__(model)
+        self.base_url = base_url.rstrip("/")
+        self._session = requests.Session()
+
+    def stream(self, prompt, system, options, timeout, usage, session_id=None):
+        payload = {"model": self.model, "prompt": prompt, "system": system, "stream": True, "options": options}
+        with self._session.post(f"{self.base_url}/api/generate", json=payload, stream=True, timeout=timeout) as response:
+            if response.status_code != 200:
+                raise BackendError(f"Ollama error: {response.status_code}")
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    if chunk.get("eval_count") and chunk.get("eval_duration"):
+                        usage.update(tokens=chunk["eval_count"], seconds=chunk["eval_duration"] / 1e9)
+                    return
+
+    def check(self, timeout):
+        response = self._session.get(f"{self.base_url}/api/tags", timeout=timeout)
+        if response.status_code != 200:
+            return False
+        names = [m.get("name", "") for m in response.json().get("models", [])]
+        return any(self.model in name for name in names)
+
+    def warm_up(self, timeout):
+        # A request without a prompt only loads the model
+        response = self._session.post(f"{self.base_url}/api/generate", json={"model": self.model},
+                                      timeout=(5, timeout))
+        if response.status_code != 200:
+            raise BackendError(f"Ollama error: {response.status_code}")
+
+
+class OllamaEndpoint:
+    """One host of an Ollama pool: its health, outstanding requests and recent latency."""
+
+    def __init__(self, backend: OllamaBackend):
+        self.backend = backend
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.latency: Optional[float] = None     # seconds per complete generation
+        self.healthy: Optional[bool] = None      # None until first checked
+        self.failures = 0                        # consecutive failed requests or checks
+        self.ejected_until = 0.0
+        self.checked_at = 0.0
+
+    def due_for_check(self, now: float) -> bool:
+        if self.healthy is False:
+            return now >= self.ejected_until
+        return self.healthy is None or now - self.checked_at > AVAILABILITY_TTL
+
+    def eject(self, now: float):
+        self.healthy = False
+        self.failures += 1
+        self.ejected_until = now + min(EJECT_SECONDS * 2 ** (self.failures - 1), EJECT_MAX_SECONDS)
+
+    def get_stats(self) -> Dict:
+        return {
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_seconds": round(self.latency, 3) if self.latency is not None else None,
+            "ejected_for_seconds": round(max(0.0, self.ejected_until - time.monotonic()), 1)
+                                   if self.healthy is False else None,
+        }
+
+
+class OllamaPool(LLMBackend):
+    """
+    One model served by several Ollama hosts. Each request goes to the host
+    expected to finish it soonest (outstanding requests times recent
+    latency), except that a session keeps to one host (rendezvous hashing
+    over the healthy hosts) so Ollama can reuse the prompt cache it holds for
+    the conversation, unless that host is AFFINITY_SLACK requests busier than
+    the least busy one. A host that fails is ejected and re-admitted once a
+    health check passes; a request whose host fails before producing any
+    text is retried on another host.
+    """
+
+    kind = "ollama"
+
+    def __init__(self, model: str, base_urls: List[str]):
+        super().__init__(model)
+        self.endpoints = [OllamaEndpoint(OllamaBackend(model, url)) for url in base_urls]
+        self._lock = threading.Lock()
+
+    @property
+    def label(self) -> str:
+        return f"{self.kind}:{self.model} x{len(self.endpoints)}"
+
+    def check(self, timeout):
+        """Check the hosts that are due (ejected ones once their time is up); True if any is healthy."""
+        now = time.monotonic()
+        due = [e for e in self.endpoints if e.due_for_check(now)]
+
+        def probe(endpoint: OllamaEndpoint) -> bool:
+            try:
+                return bool(endpoint.backend.check(timeout))
+            except (requests.RequestException, ValueError):
+                return False
+
+        if due:
+            with ThreadPoolExecutor(max_workers=len(due)) as executor:
+                results = list(executor.map(probe, due))
+            with self._lock:
+                for endpoint, ok in zip(due, results):
+                    endpoint.checked_at = now
+                    if ok:
+                        if endpoint.healthy is False:
+                            print(f"Ollama host {endpoint.backend.base_url} is back")
+                        endpoint.healthy = True
+                        endpoint.failures = 0
+                    else:
+                        endpoint.eject(now)
+        return any(e.healthy for e in self.endpoints)
+
+    def warm_up(self, timeout):
+        healthy = [e for e in self.endpoints if e.healthy]
+        if healthy:
+            with ThreadPoolExecutor(max_workers=len(healthy)) as executor:
+                list(executor.map(lambda e: e.backend.warm_up(timeout), healthy))
+
+    def _pick(self, session_id: Optional[str], tried: List[OllamaEndpoint]) -> Optional[OllamaEndpoint]:
+        with self._lock:
+            live = [e for e in self.endpoints if e.healthy and e not in tried]
+            if not live:
+                return None
+            measured = [e.latency for e in live if e.latency is not None]
+            typical = sum(measured) / len(measured) if measured else 1.0
+            chosen = min(live, key=lambda e: (e.outstanding + 1) * (e.latency or typical))
+            if session_id:
+                home = max(live, key=lambda e: hashlib.sha1(f"{session_id}|{e.backend.base_url}".encode()).digest())
+                if home.outstanding <= min(e.outstanding for e in live) + AFFINITY_SLACK:
+                    chosen = home
+            chosen.outstanding += 1
+            chosen.requests += 1
+            return chosen
+
+    def _finished(self, endpoint: OllamaEndpoint, seconds: float, complete: bool, failed: bool):
+        with self._lock:
+            endpoint.outstanding -= 1
+            if failed:
+                endpoint.errors += 1
+                endpoint.eject(time.monotonic())
+            elif complete:
+                endpoint.failures = 0
+                endpoint.latency = seconds if endpoint.latency is None else \
+                    endpoint.latency + EWMA_ALPHA * (seconds - endpoint.latency)
+
+    def stream(self, prompt, system, options, timeout, usage, session_id=None):
+        tried = []
+        while True:
+            endpoint = self._pick(session_id, tried)
+            if endpoint is None:
+                raise BackendError(f"No Ollama host available for {self.model}")
+            tried.append(endpoint)
+            started = time.monotonic()
+            produced = complete = failed = False
+            try:
+                for piece in endpoint.backend.stream(prompt, system, options, timeout, usage):
+                    produced = True
+                    yield piece
+                complete = True
+                return
+            except (requests.exceptions.ConnectionError, BackendError) as e:
+                failed = True
+                if produced:
+                    raise
+                print(f"Ollama host {endpoint.backend.base_url} failed ({e}), trying another")
+            finally:
+                self._finished(endpoint, time.monotonic() - started, complete, failed)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {e.backend.base_url: e.get_stats() for e in self.endpoints}
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Any server implementing /v1/chat/completions with streaming (llama.cpp, vLLM, LM Studio...)."""
+
+    kind = "openai"
+
+    def __init__(self, model: str, base_url: str = OPENAI_BASE_URL, api_key: Optional[str] = None):
+        super().__init__(model)
+        self.base_url = base_url.rstrip("/")
+        self._session = requests.Session()
+        api_key = api_key if api_key is not None else os.environ.get("NEETHI_OPENAI_API_KEY")
+        if api_key:
+            self._session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def stream(self, prompt, system, options, timeout, usage, session_id=None):
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "system", "content": system}, {"role": "user", "content": prompt}],
+            "stream": True,
+            "temperature": options.get("temperature"),
+            "top_p": options.get("top_p"),
+            "max_tokens": options.get("num_predict"),
+        }
+        with self._session.post(f"{self.base_url}/chat/completions", json=payload, stream=True, timeout=timeout) as response:
+            if response.status_code != 200:
+                raise BackendError(f"OpenAI-compatible server error: {response.status_code}")
+            for line in response.iter_lines():
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    return
+                choices = json.loads(data).get("choices") or [{}]
+                piece = (choices[0].get("delta") or {}).get("content")
+                if piece:
+                    yield piece
+
+    def check(self, timeout):
+        response = self._session.get(f"{self.base_url}/models", timeout=timeout)
+        if response.status_code != 200:
+            return False
+        ids = [m.get("id", "") for m in response.json().get("data", [])]
+        return not ids or any(self.model in model_id for model_id in ids)
+
+
+class StubBackend(LLMBackend):
+    """Deterministic answers without a model: the same prompt always gives the same text."""
+
+    kind = "stub"
+
+    def __init__(self, model: str = "stub", delay: float = 0.0):
+        super().__init__(model)
+        self.delay = delay
+
+    def stream(self, prompt, system, options, timeout, usage, session_id=None):
+        question = (prompt.split("User Question:", 1)[-1].strip().splitlines() or [""])[0]
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        words = f"[{self.model} {digest}] This is a stub answer to: {question}".split(" ")
+        for i, word in enumerate(words[:options.get("num_predict", len(words))]):
+            if self.delay:
+                time.sleep(self.delay)
+            yield word if i == 0 else " " + word
+
+    def check(self, timeout):
+        return True
+
+
+# ===============================
+# ROUTING
+# ===============================
+
+class Route:
+    def __init__(self, name: str, backend: LLMBackend, intents: Optional[FrozenSet[str]] = None,
+                 max_prompt_chars: Optional[int] = None, options: Optional[Dict] = None):
+        self.name = name
+        self.backend = backend
+        self.intents = intents
+        self.max_prompt_chars = max_prompt_chars
+        self.options = {**DEFAULT_OPTIONS, **(options or {})}
+
+        self._lock = threading.Lock()
+        self.inflight = 0
+        self.requests = 0
+        self.errors = 0
+        self.latency: Optional[float] = None        # seconds per complete generation
+        self.first_token: Optional[float] = None    # seconds until the first piece
+        self.tokens_per_second: Optional[float] = None
+        self._available: Optional[bool] = None
+        self._checked_at = 0.0
+
+    def accepts(self, intent: Optional[str], prompt_chars: int) -> bool:
+        if self.intents is not None and intent not in self.intents:
+            return False
+        return self.max_prompt_chars is None or prompt_chars <= self.max_prompt_chars
+
+    def available(self, timeout: float = CHECK_TIMEOUT, refresh: bool = False) -> bool:
+        now = time.monotonic()
+        if refresh or self._available is None or now - self._checked_at > AVAILABILITY_TTL:
+            if timeout <= 0:
+                # No time left to check: go by the last result
+                return bool(self._available)
+            try:
+                self._available = bool(self.backend.check(timeout))
+            except requests.Timeout:
+                if timeout < CHECK_TIMEOUT:
+                    # Cut short by a request's deadline: unusable for it, but not known to be down
+                    return False
+                self._available = False
+            except (requests.RequestException, ValueError):
+                self._available = False
+            self._checked_at = now
+        return self._available
+
+    def expected_seconds(self) -> Optional[float]:
+        """Time a request sent now is expected to take, queueing behind the ones in flight (None until measured)."""
+        if self.latency is None:
+            return None
+        return (self.inflight + 1) * self.latency
+
+    def _ewma(self, current: Optional[float], value: float) -> float:
+        return value if current is None else current + EWMA_ALPHA * (value - current)
+
+    def started(self):
+        with self._lock:
+            self.inflight += 1
+            self.requests += 1
+
+    def finished(self, seconds: float, first_token: Optional[float], tokens: int, usage: Dict,
+                 complete: bool, failed: bool):
+        with self._lock:
+            self.inflight -= 1
+            if failed:
+                self.errors += 1
+                self._available = None      # re-check before the next request
+                return
+            if first_token is not None:
+                self.first_token = self._ewma(self.first_token, first_token)
+            if usage.get("seconds"):
+                self.tokens_per_second = self._ewma(self.tokens_per_second, usage["tokens"] / usage["seconds"])
+            elif tokens and first_token is not None and seconds > first_token:
+                self.tokens_per_second = self._ewma(self.tokens_per_second, tokens / (seconds - first_token))
+            # Cut-short generations only say the latency is at least this long
+            if complete or self.latency is None or seconds > self.latency:
+                self.latency = self._ewma(self.latency, seconds)
+
+    def get_stats(self) -> Dict:
+        return {
+            "backend": self.backend.label,
+            "available": self._available,
+            "inflight": self.inflight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_seconds": round(self.latency, 3) if self.latency is not None else None,
+            "first_token_seconds": round(self.first_token, 3) if self.first_token is not None else None,
+            "tokens_per_second": round(self.tokens_per_second, 1) if self.tokens_per_second is not None else None,
+            **({"hosts": self.backend.get_stats()} if isinstance(self.backend, OllamaPool) else {}),
+        }
+
+
+class ModelRouter:
+    def __init__(self, routes: List[Route]):
+        self.routes = routes
+
+    def choose(self, intent: Optional[str], prompt: str, deadline=None) -> Optional[Route]:
+        """The route for a request, or None when no accepting backend is up (checked within the deadline)."""
+        candidates = [
+            r for r in self.routes
+            if r.accepts(intent, len(prompt))
+            and r.available(deadline.timeout(CHECK_TIMEOUT) if deadline is not None else CHECK_TIMEOUT)
+        ]
+        if not candidates:
+            return None
+        preferred = candidates[0]
+        expected = preferred.expected_seconds()
+        measured = [r for r in candidates if r.expected_seconds() is not None]
+        if expected is None or len(measured) < 2:
+            return preferred
+        fastest = min(measured, key=lambda r: r.expected_seconds())
+        quickest = fastest.expected_seconds()
+        if expected > quickest * SWITCH_FACTOR and expected - quickest > MIN_SWITCH_SECONDS:
+            return fastest
+        if deadline is not None and expected > deadline.remaining() and fastest is not preferred:
+            return fastest
+        return preferred
+
+    def generate(self, prompt: str, system: str, intent: Optional[str] = None, deadline=None,
+                 on_token: Optional[Callable[[str], None]] = None,
+                 session_id: Optional[str] = None) -> Tuple[Optional[str], bool, Optional[str]]:
+        """
+        Stream a generation from the chosen route until it finishes or the
+        deadline expires, passing each piece to on_token as it arrives.
+        session_id keeps a conversation on one host where the backend has
+        several. Returns (text, complete, route name); text is None if
+        nothing was generated.
+        """
+        route = self.choose(intent, prompt, deadline)
+        if route is None:
+            return None, False, None
+
+        parts = []
+        usage = {}
+        complete = False
+        failed = False
+        first_token = None
+        started = time.monotonic()
+        route.started()
+        try:
+            timeout = deadline.timeouts(5, 60) if deadline is not None else (5, 60)
+            for piece in route.backend.stream(prompt, system, route.options, timeout, usage, session_id):
+                if first_token is None:
+                    first_token = time.monotonic() - started
+                parts.append(piece)
+                if on_token is not None:
+                    on_token(piece)
+                if deadline is not None and deadline.expired:
+                    break
+            else:
+                complete = True
+        except requests.exceptions.ConnectionError:
+            print(f"{route.backend.label} is not reachable.")
+            failed = True
+        except requests.exceptions.Timeout:
+            print(f"{route.backend.label} request timed out.")
+        except Exception as e:
+            print(f"Error calling {route.backend.label}: {e}")
+            failed = True
+        finally:
+            route.finished(time.monotonic() - started, first_token, len(parts), usage, complete, failed)
+
+        text = "".join(parts)
+        return (text or None), complete, route.name
+
+    def any_available(self, timeout: float = CHECK_TIMEOUT) -> bool:
+        return any(route.available(timeout) for route in self.routes)
+
+    def warm_up(self, timeout: float) -> bool:
+        """Have every available backend load its model; True if any backend is up."""
+        up = False
+        for route in self.routes:
+            if not route.available():
+                continue
+            up = True
+            try:
+                route.backend.warm_up(timeout)
+            except (requests.RequestException, BackendError) as e:
+                print(f"Warming up {route.backend.label} failed: {e}")
+        return up
+
+    def get_stats(self) -> Dict:
+        return {route.name: route.get_stats() for route in self.routes}
+
+
+def _backend(kind: str, model: str) -> LLMBackend:
+    if kind == "openai":
+        return OpenAICompatibleBackend(model)
+    if kind == "stub":
+        return StubBackend(model)
+    if len(OLLAMA_BASE_URLS) > 1:
+        return OllamaPool(model, OLLAMA_BASE_URLS)
+    return OllamaBackend(model)
+
+
+def default_routes(kind: Optional[str] = None) -> List[Route]:
+    """Routes from the environment: the small model for simple guidance, the large one for everything."""
+    kind = (kind or os.environ.get("NEETHI_LLM_BACKEND", "ollama")).lower()
+    large = os.environ.get("NEETHI_LLM_MODEL", "llama3:8b")
+    small = os.environ.get("NEETHI_LLM_SMALL_MODEL", "llama3.2:3b")
+    routes = []
+    if small and small != large:
+        routes.append(Route("quick", _backend(kind, small), intents=SIMPLE_INTENTS,
+                            max_prompt_chars=SMALL_MODEL_MAX_PROMPT, options={"num_predict": 300}))
+    routes.append(Route("general", _backend(kind, large)))
+    return routes
+
+
+_router: Optional[ModelRouter] = None
+
+
+def get_router() -> ModelRouter:
+    global _router
+    if _router is None:
+        _router = ModelRouter(default_routes())
+    return _router
@@ -0,0 +1,380 @@
+"""
+Tele-Law Matching Engine
+In-process consultation queue that matches citizens to free panel lawyers.
+
+Waiting citizens hold a ticket in a FIFO queue keyed by what they asked for:
+(specialization, language), either of which may be "*", or a specific lawyer.
+Free lawyers sit in min-heaps (longest idle first) under every key they can
+serve, so a new ticket is matched with one heap pop. A lawyer that becomes
+free looks at the heads of the few queues it can serve and takes the oldest
+ticket. Heap entries go stale when a lawyer is taken through another key;
+they are skipped on pop (lazy deletion) and compacted when they pile up.
+
+Wait estimates come from an EWMA of measured session lengths. Ticket holders
+get position updates pushed through asyncio events (served as SSE by the API).
+A client may hold a few open tickets (waiting, or connected to a session
+that has not ended) at a time.
+
+All methods must be called from the event loop thread. The state is per
+process: under backend/server.py the other workers forward every Tele-Law
+request to the indexer (utils/indexer_route.py), so only its engine is used.
+"""
+
+import asyncio
+import heapq
+import secrets
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+from backend.utils.lawyer_directory import LawyerDirectory
+
+# Assumed consultation length until sessions have been measured (seconds)
+DEFAULT_SERVICE_SECONDS = 15 * 60
+
+# Weight of the newest sample in the service-time / wait-time averages
+EWMA_ALPHA = 0.2
+
+# Sessions not ended by the client are closed after this long
+MAX_SESSION_SECONDS = 60 * 60
+
+# Open tickets (waiting or in a session) one client may hold
+MAX_OPEN_TICKETS_PER_CLIENT = 3
+
+# Waiting tickets nobody has watched for this long are dropped
+ABANDON_SECONDS = 5 * 60
+
+# Finished tickets stay readable for this long
+TICKET_RETENTION_SECONDS = 10 * 60
+
+SWEEP_INTERVAL = 30
+
+ANY = "*"
+
+Key = Tuple[str, str]
+
+
+class TicketLimit(Exception):
+    """Raised when a client already holds MAX_OPEN_TICKETS_PER_CLIENT open tickets."""
+
+
+class Ticket:
+    def __init__(self, ticket_id: str, key: Key, seq: int):
+        self.id = ticket_id
+        self.key = key
+        self.seq = seq
+        self.status = "waiting"          # waiting | connected | cancelled | expired
+        self.position = 0
+        self.created_at = time.time()
+        self.enqueued_at = time.monotonic()
+        self.last_seen = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.session_id: Optional[str] = None
+        self.lawyer_id: Optional[str] = None
+        self.subscribers = 0
+        self.updated = asyncio.Event()
+
+    def notify(self):
+        self.updated.set()
+
+
+class Session:
+    def __init__(self, session_id: str, lawyer_id: str, ticket_id: Optional[str], length: float):
+        self.id = session_id
+        self.lawyer_id = lawyer_id
+        self.ticket_id = ticket_id
+        self.started_at = time.monotonic()
+        self.ends_by = self.started_at + length
+
+
+class LawyerState:
+    def __init__(self, lawyer: Dict, specialization: str):
+        self.id = lawyer["id"]
+        self.name = lawyer["name"]
+        self.specialization = specialization
+        self.languages = [language.lower() for language in lawyer.get("languages", [])]
+        self.free = False
+        self.free_since = 0.0
+        self.epoch = 0
+        self.session: Optional[Session] = None
+
+    def keys(self) -> List[Key]:
+        """Every ticket key this lawyer can serve (besides direct requests)."""
+        keys = [(ANY, ANY), (self.specialization, ANY)]
+        for language in self.languages:
+            keys += [(ANY, language), (self.specialization, language)]
+        return keys
+
+
+def _direct_key(lawyer_id: str) -> Key:
+    return ("lawyer", lawyer_id)
+
+
+def _clock_label(seconds_from_now: float) -> str:
+    return datetime.fromtimestamp(time.time() + seconds_from_now).strftime("%I:%M %p").lstrip("0")
+
+
+class MatchingEngine:
+    def __init__(self, directory: LawyerDirectory):
+        self.directory = directory
+        self.lawyers: Dict[str, LawyerState] = {}
+        self.specializations: Dict[str, str] = {}     # lower-case name -> key
+        self.eligible: Dict[Key, int] = {}            # lawyers able to serve each key
+        self.free_heaps: Dict[Key, List[Tuple[float, str, int]]] = {}
+        self.queues: Dict[Key, Deque[Ticket]] = {}
+        self.tickets: Dict[str, Ticket] = {}
+        self.sessions: Dict[str, Session] = {}
+        self.client_tickets: Dict[str, List[Ticket]] = {}
+        self._seq = 0
+        self.service_seconds = float(DEFAULT_SERVICE_SECONDS)
+        self.stats = {"matched": 0, "completed": 0, "cancelled": 0, "expired": 0, "avg_wait_seconds": 0.0}
+
+        for lawyer in directory.lawyers():
+            specialization = lawyer.get("specialization", "").lower()
+            self.specializations[specialization] = specialization
+            state = self.lawyers[lawyer["id"]] = LawyerState(lawyer, specialization)
+            for key in state.keys() + [_direct_key(state.id)]:
+                self.eligible[key] = self.eligible.get(key, 0) + 1
+            if lawyer["available"]:
+                self._release(state)
+            else:
+                # Already busy with a consultation we did not start; assume a typical length
+                self._start_session(state, None, length=DEFAULT_SERVICE_SECONDS)
+
+    # ---- request resolution ----
+
+    def _resolve_specialization(self, specialization: Optional[str]) -> str:
+        if not specialization:
+            return ANY
+        query = specialization.strip().lower()
+        if query in self.specializations:
+            return query
+        match = next((name for name in sorted(self.specializations) if query in name), None)
+        if match is None:
+            raise ValueError(f"No lawyers with specialization '{specialization}'")
+        return match
+
+    def _resolve_key(self, specialization: Optional[str], language: Optional[str]) -> Key:
+        key = (self._resolve_specialization(specialization), language.strip().lower() if language else ANY)
+        if not self.eligible.get(key):
+            raise ValueError("No lawyers match the requested specialization and language")
+        return key
+
+    # ---- free lawyer heaps ----
+
+    def _release(self, lawyer: LawyerState):
+        """Mark a lawyer free and make them findable under every key they serve."""
+        lawyer.free = True
+        lawyer.free_since = time.monotonic()
+        lawyer.epoch += 1
+        lawyer.session = None
+        entry = (lawyer.free_since, lawyer.id, lawyer.epoch)
+        for key in lawyer.keys():
+            heap = self.free_heaps.setdefault(key, [])
+            heapq.heappush(heap, entry)
+            if len(heap) > 4 * self.eligible[key] + 64:
+                self._compact(key)
+        self.directory.set_availability(lawyer.id, True)
+
+    def _compact(self, key: Key):
+        heap = [entry for entry in self.free_heaps[key] if self._is_live(entry)]
+        heapq.heapify(heap)
+        self.free_heaps[key] = heap
+
+    def _is_live(self, entry: Tuple[float, str, int]) -> bool:
+        lawyer = self.lawyers[entry[1]]
+        return lawyer.free and lawyer.epoch == entry[2]
+
+    def _pop_free(self, key: Key) -> Optional[LawyerState]:
+        heap = self.free_heaps.get(key)
+        while heap:
+            entry = heapq.heappop(heap)
+            if self._is_live(entry):
+                return self.lawyers[entry[1]]
+        return None
+
+    # ---- sessions ----
+
+    def _start_session(self, lawyer: LawyerState, ticket: Optional[Ticket], length: float = MAX_SESSION_SECONDS) -> Session:
+        lawyer.free = False
+        lawyer.epoch += 1
+        session_id = f"TL{datetime.now().strftime('%Y%m%d%H%M%S')}{secrets.token_hex(3).upper()}"
+        session = lawyer.session = self.sessions[session_id] = Session(
+            session_id, lawyer.id, ticket.id if ticket else None, length
+        )
+        self.directory.set_availability(lawyer.id, False, next_available=_clock_label(self.service_seconds))
+
+        if ticket is not None:
+            waited = time.monotonic() - ticket.enqueued_at
+            self.stats["matched"] += 1
+            self.stats["avg_wait_seconds"] += EWMA_ALPHA * (waited - self.stats["avg_wait_seconds"])
+            ticket.status = "connected"
+            ticket.session_id = session_id
+            ticket.lawyer_id = lawyer.id
+            ticket.finished_at = time.monotonic()
+            ticket.notify()
+        return session
+
+    def end_session(self, session_id: str) -> bool:
+        """Close a consultation, record its length and hand the lawyer to the next citizen."""
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        if session.ticket_id is not None:
+            length = time.monotonic() - session.started_at
+            self.service_seconds += EWMA_ALPHA * (length - self.service_seconds)
+            self.stats["completed"] += 1
+        self._lawyer_done(self.lawyers[session.lawyer_id])
+        return True
+
+    def _lawyer_done(self, lawyer: LawyerState):
+        ticket = self._next_ticket_for(lawyer)
+        if ticket is None:
+            self._release(lawyer)
+        else:
+            self._start_session(lawyer, ticket)
+
+    def _next_ticket_for(self, lawyer: LawyerState) -> Optional[Ticket]:
+        """Oldest waiting ticket this lawyer can serve."""
+        best_key = None
+        best_seq = None
+        for key in [_direct_key(lawyer.id)] + lawyer.keys():
+            queue = self.queues.get(key)
+            if queue and (best_seq is None or queue[0].seq < best_seq):
+                best_key, best_seq = key, queue[0].seq
+        if best_key is None:
+            return None
+        queue = self.queues[best_key]
+        ticket = queue.popleft()
+        if not queue:
+            del self.queues[best_key]
+        self._reindex(best_key)
+        return ticket
+
+    # ---- tickets ----
+
+    def _open_tickets(self, client: str) -> List[Ticket]:
+        """The client's tickets still waiting or in a session (forgetting the others)."""
+        tickets = [ticket for ticket in self.client_tickets.get(client, ())
+                   if ticket.status == "waiting" or (ticket.status == "connected" and ticket.session_id in self.sessions)]
+        if tickets:
+            self.client_tickets[client] = tickets
+        else:
+            self.client_tickets.pop(client, None)
+        return tickets
+
+    def request(self, lawyer_id: Optional[str] = None, specialization: Optional[str] = None,
+                language: Optional[str] = None, client: Optional[str] = None) -> Ticket:
+        """
+        Ask for a specific lawyer, or the first free one matching the filters.
+
+        Connects straight away when possible, otherwise queues the ticket.
+        Raises KeyError for an unknown lawyer, ValueError when no lawyer
+        could ever serve the request and TicketLimit when the client already
+        holds too many open tickets.
+        """
+        if client is not None and len(self._open_tickets(client)) >= MAX_OPEN_TICKETS_PER_CLIENT:
+            raise TicketLimit(client)
+        if lawyer_id is not None:
+            lawyer = self.lawyers.get(lawyer_id)
+            if lawyer is None:
+                raise KeyError(lawyer_id)
+            key = _direct_key(lawyer_id)
+            match = lawyer if lawyer.free else None
+        else:
+            key = self._resolve_key(specialization, language)
+            match = self._pop_free(key)
+
+        self._seq += 1
+        ticket = Ticket(secrets.token_urlsafe(9), key, self._seq)
+        self.tickets[ticket.id] = ticket
+        if client is not None:
+            self.client_tickets.setdefault(client, []).append(ticket)
+        if match is not None:
+            self._start_session(match, ticket)
+        else:
+            queue = self.queues.setdefault(key, deque())
+            queue.append(ticket)
+            ticket.position = len(queue) - 1
+        return ticket
+
+    def cancel(self, ticket_id: str) -> bool:
+        ticket = self.tickets.get(ticket_id)
+        if ticket is None or ticket.status != "waiting":
+            return False
+        self._drop(ticket, "cancelled")
+        return True
+
+    def _drop(self, ticket: Ticket, status: str):
+        queue = self.queues.get(ticket.key)
+        if queue is not None:
+            queue.remove(ticket)
+            if not queue:
+                del self.queues[ticket.key]
+            self._reindex(ticket.key)
+        ticket.status = status
+        ticket.finished_at = time.monotonic()
+        self.stats[status] += 1
+        ticket.notify()
+
+    def _reindex(self, key: Key):
+        """Refresh queue positions after the queue changed and wake every watcher."""
+        for position, ticket in enumerate(self.queues.get(key, ())):
+            ticket.position = position
+            ticket.notify()
+
+    def estimated_wait(self, ticket: Ticket) -> Optional[float]:
+        if ticket.status != "waiting":
+            return 0.0 if ticket.status == "connected" else None
+        lawyers = self.eligible.get(ticket.key, 0)
+        return round((ticket.position + 1) * self.service_seconds / lawyers) if lawyers else None
+
+    def snapshot(self, ticket: Ticket) -> Dict:
+        ticket.last_seen = time.monotonic()
+        status = {
+            "ticket_id": ticket.id,
+            "status": ticket.status,
+            "position": ticket.position + 1 if ticket.status == "waiting" else 0,
+            "queue_length": len(self.queues.get(ticket.key, ())),
+            "estimated_wait_seconds": self.estimated_wait(ticket)
+        }
+        if ticket.status == "connected":
+            lawyer = self.lawyers[ticket.lawyer_id]
+            status.update({"session_id": ticket.session_id, "lawyer_id": lawyer.id, "lawyer_name": lawyer.name})
+        return status
+
+    # ---- housekeeping ----
+
+    def sweep(self):
+        """Close overdue sessions, drop abandoned tickets and forget old finished ones."""
+        now = time.monotonic()
+        for session in [s for s in self.sessions.values() if s.ends_by <= now]:
+            self.sessions.pop(session.id, None)
+            self._lawyer_done(self.lawyers[session.lawyer_id])
+        for ticket in list(self.tickets.values()):
+            if ticket.status == "waiting":
+                if ticket.subscribers == 0 and now - ticket.last_seen > ABANDON_SECONDS:
+                    self._drop(ticket, "expired")
+            elif now - ticket.finished_at > TICKET_RETENTION_SECONDS:
+                del self.tickets[ticket.id]
+        for client in list(self.client_tickets):
+            self._open_tickets(client)
+
+    async def run_sweeper(self):
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Tele-Law queue sweep failed: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "avg_wait_seconds": round(self.stats["avg_wait_seconds"], 1),
+            "waiting": sum(len(queue) for queue in self.queues.values()),
+            "active_sessions": len(self.sessions),
+            "free_lawyers": sum(1 for lawyer in self.lawyers.values() if lawyer.free),
+            "service_seconds_ewma": round(self.service_seconds, 1)
+        }
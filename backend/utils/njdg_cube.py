@@ -0,0 +1,227 @@
+"""
+NJDG Statistics Cube
+Builds the /njdg/stats payload from the local case store.
+
+The case store keeps counters per (state, court level, civil/criminal,
+filing month, pending) and disposals per month, updated by triggers as
+cases are added, change status or are removed. This module loads those
+counters into dense numpy arrays and answers filtered queries by masking
+and summing them; age buckets and rates are computed at query time
+against the current month, so nothing ever rescans the case records.
+
+Each process holds its own copy and reloads it (a few thousand counter
+rows) when another connection has committed to the store.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.utils import case_store
+from backend.utils.case_store import CASE_CATEGORIES, COURT_LEVELS, STATE_NAMES
+
+# Pending-case age buckets in months: (name, lower bound, upper bound)
+AGE_BUCKETS: List[Tuple[str, int, int]] = [
+    ("under_1_year", 0, 12),
+    ("1_to_3_years", 12, 36),
+    ("3_to_5_years", 36, 60),
+    ("5_to_10_years", 60, 120),
+    ("above_10_years", 120, 10 ** 6),
+]
+
+# Window for the filing / disposal rates (months)
+RATE_WINDOW_MONTHS = 12
+
+TOP_STATES = 5
+
+_STATE_CODES = {name.lower(): code for code, name in STATE_NAMES.items()}
+
+
+def resolve_state(state: Optional[str]) -> Optional[str]:
+    """CNR state code for a state name or code ('Bihar' / 'BR'), None if unknown."""
+    if not state:
+        return None
+    value = state.strip()
+    if value.upper() in STATE_NAMES:
+        return value.upper()
+    return _STATE_CODES.get(value.lower())
+
+
+def _current_month() -> int:
+    now = datetime.now()
+    return now.year * 12 + now.month - 1
+
+
+class NJDGCube:
+    def __init__(self):
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._data_version = None
+        self._lock = threading.Lock()
+        # (states, first_month, counts[state, court, category, month, pending], disposals[state, court, category, month])
+        self._cube = ([], 0, np.zeros((0, len(COURT_LEVELS), len(CASE_CATEGORIES), 0, 2), dtype=np.int64),
+                      np.zeros((0, len(COURT_LEVELS), len(CASE_CATEGORIES), 0), dtype=np.int64))
+        self.loaded_at: Optional[float] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # A connection of our own: PRAGMA data_version only moves for commits made by other connections
+        if self._conn is None or self._pid != os.getpid():
+            case_store._connect()   # make sure the schema exists
+            self._conn = sqlite3.connect(case_store.CASE_STORE_PATH, check_same_thread=False, isolation_level=None)
+            self._pid = os.getpid()
+            self._data_version = None
+        return self._conn
+
+    def refresh(self) -> bool:
+        """Reload the counters if the store changed since the last load. Returns True if reloaded."""
+        with self._lock:
+            conn = self._connection()
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version:
+                return False
+            counts = conn.execute(
+                "SELECT state, court_level, category, filing_month, pending, count FROM case_counts WHERE count > 0"
+            ).fetchall()
+            disposals = conn.execute(
+                "SELECT state, court_level, category, disposal_month, count FROM disposal_counts WHERE count > 0"
+            ).fetchall()
+            self._cube = self._build(counts, disposals)
+            self._data_version = version
+            self.loaded_at = time.time()
+            return True
+
+    @staticmethod
+    def _build(counts, disposals):
+        states = sorted({row[0] for row in counts} | {row[0] for row in disposals})
+        state_index = {state: i for i, state in enumerate(states)}
+        court_index = {level: i for i, level in enumerate(COURT_LEVELS)}
+        category_index = {category: i for i, category in enumerate(CASE_CATEGORIES)}
+        months = [row[3] for row in counts] + [row[3] for row in disposals]
+        first = min(months) if months else 0
+        span = (max(months) - first + 1) if months else 0
+
+        count_cube = np.zeros((len(states), len(COURT_LEVELS), len(CASE_CATEGORIES), span, 2), dtype=np.int64)
+        if counts:
+            columns = list(zip(*counts))
+            np.add.at(count_cube, (
+                [state_index[s] for s in columns[0]], [court_index.get(c, 0) for c in columns[1]],
+                [category_index.get(c, 0) for c in columns[2]], np.array(columns[3]) - first,
+                np.array(columns[4], dtype=np.int64).clip(0, 1)
+            ), np.array(columns[5], dtype=np.int64))
+
+        disposal_cube = np.zeros(count_cube.shape[:4], dtype=np.int64)
+        if disposals:
+            columns = list(zip(*disposals))
+            np.add.at(disposal_cube, (
+                [state_index[s] for s in columns[0]], [court_index.get(c, 0) for c in columns[1]],
+                [category_index.get(c, 0) for c in columns[2]], np.array(columns[3]) - first
+            ), np.array(columns[4], dtype=np.int64))
+        return states, first, count_cube, disposal_cube
+
+    def is_empty(self) -> bool:
+        return self._cube[2].size == 0 or not self._cube[2].any()
+
+    def stats(self, state: Optional[str] = None, case_type: Optional[str] = None, court: Optional[str] = None) -> Dict:
+        """
+        The /njdg/stats payload, optionally filtered by state (name or code),
+        case type ('civil' / 'criminal') and court level ('district' / 'high_court').
+        Raises ValueError for an unknown filter value.
+        """
+        states, first, counts, disposals = self._cube
+
+        # 0/1 weights per axis; filtered-out cells are zeroed so every axis keeps its meaning
+        state_w = np.ones(len(states), dtype=np.int64)
+        if state:
+            code = resolve_state(state)
+            if code is None:
+                raise ValueError(f"Unknown state '{state}'")
+            state_w = np.array([s == code for s in states], dtype=np.int64)
+        category_w = np.ones(len(CASE_CATEGORIES), dtype=np.int64)
+        if case_type:
+            if case_type.lower() not in CASE_CATEGORIES:
+                raise ValueError("type must be 'civil' or 'criminal'")
+            category_w = np.array([c == case_type.lower() for c in CASE_CATEGORIES], dtype=np.int64)
+        court_w = np.ones(len(COURT_LEVELS), dtype=np.int64)
+        if court:
+            level = court.lower().replace(" ", "_")
+            level = "high_court" if level in ("high", "hc") else level
+            if level not in COURT_LEVELS:
+                raise ValueError("court must be 'district' or 'high_court'")
+            court_w = np.array([c == level for c in COURT_LEVELS], dtype=np.int64)
+
+        weights = state_w[:, None, None, None] * court_w[None, :, None, None] * category_w[None, None, :, None]
+        filed_cube = counts.sum(axis=4) * weights            # [state, court, category, month]
+        pending = counts[..., 1] * weights
+        disposed_cube = disposals * weights
+
+        by_court_category = pending.sum(axis=(0, 3))         # [court, category]
+        by_month = pending.sum(axis=(0, 1, 2))               # [month]
+        by_state = pending.sum(axis=(1, 2, 3))
+
+        now = _current_month()
+        months = first + np.arange(by_month.size)
+        ages = now - months
+        age_wise = {name: int(by_month[(ages >= low) & (ages < high)].sum()) for name, low, high in AGE_BUCKETS}
+
+        window = months > now - RATE_WINDOW_MONTHS
+        filed = int(filed_cube.sum(axis=(0, 1, 2))[window].sum())
+        disposed = int(disposed_cube.sum(axis=(0, 1, 2))[window].sum())
+        days = RATE_WINDOW_MONTHS * 365 / 12
+
+        def level(name: str) -> Dict[str, int]:
+            row = by_court_category[COURT_LEVELS.index(name)]
+            return {"pending": int(row.sum()), **{c: int(n) for c, n in zip(CASE_CATEGORIES, row.tolist())}}
+
+        pending_by_state = sorted(
+            ((STATE_NAMES.get(code, code), count) for code, count, w in zip(states, by_state.tolist(), state_w) if w),
+            key=lambda item: -item[1]
+        )
+
+        return {
+            "last_updated": datetime.fromtimestamp(self.loaded_at or time.time()).strftime("%Y-%m-%d %H:%M"),
+            "total_pending_cases": int(pending.sum()),
+            "district_courts": level("district"),
+            "high_courts": level("high_court"),
+            "disposal_rate": {
+                "daily_filing": round(filed / days),
+                "daily_disposal": round(disposed / days),
+                "disposal_percentage": round(disposed / filed * 100, 1) if filed else 0.0
+            },
+            "age_wise": age_wise,
+            "top_states": [{"name": name, "pending": count} for name, count in pending_by_state[:TOP_STATES]],
+            "pending_by_state": dict(pending_by_state)
+        }
+
+
+_cube = NJDGCube()
+
+
+def get_version() -> Optional[Tuple[float, int]]:
+    """
+    Identifies the statistics get_stats() would build right now (counters
+    load time and current month, which the age buckets depend on), or None
+    while the store holds no cases.
+    """
+    try:
+        _cube.refresh()
+    except sqlite3.Error as e:
+        print(f"NJDG counters could not be loaded: {e}")
+    if _cube.is_empty():
+        return None
+    return _cube.loaded_at, _current_month()
+
+
+def get_stats(state: Optional[str] = None, case_type: Optional[str] = None, court: Optional[str] = None) -> Optional[Dict]:
+    """NJDG statistics from the case store, or None while the store holds no cases."""
+    try:
+        _cube.refresh()
+    except sqlite3.Error as e:
+        print(f"NJDG counters could not be loaded: {e}")
+    if _cube.is_empty():
+        return None
+    return _cube.stats(state, case_type, court)
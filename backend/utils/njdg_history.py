@@ -0,0 +1,319 @@
+"""
+NJDG Statistics History
+Append-only columnar time-series store for NJDG statistics, so trends
+(pending-case growth, disposal rates) can be charted over years.
+
+Each tier is a directory holding one int64 file of sample timestamps and
+one float64 file per metric, all appended in step. Range queries memory-map
+the files and binary-search the timestamps, so they only touch the rows
+they return. Samples are rolled up from raw to hourly to daily means as
+each bucket completes, and every tier keeps its own retention.
+
+Only the indexer process records samples (see utils/worker.py); every
+worker can read.
+"""
+
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+HISTORY_DIR = os.environ.get("NEETHI_NJDG_HISTORY", "backend/data/njdg_history")
+
+# (name, bucket width in seconds, retention in seconds); raw samples are not bucketed
+TIERS: List[Tuple[str, int, int]] = [
+    ("raw", 0, 7 * 86400),
+    ("hourly", 3600, 180 * 86400),
+    ("daily", 86400, 20 * 365 * 86400),
+]
+
+# Seconds between samples taken by the background sampler
+SAMPLE_INTERVAL = 15 * 60
+
+# Compact a tier once it holds this much more than its retention
+COMPACT_SLACK = 0.25
+
+DEFAULT_MAX_POINTS = 500
+
+_TIMESTAMPS = "_timestamps.i64"
+_METRIC_NAME = re.compile(r"^[a-z0-9_.]+$")
+_NOT_SLUG = re.compile(r"[^a-z0-9_]+")
+
+_UNITS = {"cr": 10 ** 7, "crore": 10 ** 7, "l": 10 ** 5, "lakh": 10 ** 5, "lac": 10 ** 5, "k": 10 ** 3}
+_DISPLAY_NUMBER = re.compile(r"([0-9][0-9,]*(?:\.[0-9]+)?)\s*(cr|crore|lakh|lac|l|k)?\b", re.IGNORECASE)
+
+
+def parse_display_number(text: str) -> Optional[float]:
+    """Number from a portal display string such as '4.5 Cr' or '1,23,456'."""
+    match = _DISPLAY_NUMBER.search(text or "")
+    if not match:
+        return None
+    value = float(match.group(1).replace(",", ""))
+    return value * _UNITS.get((match.group(2) or "").lower(), 1)
+
+
+def flatten_stats(stats: Dict, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves of a /njdg/stats payload as 'section.field' metrics (keys slugified, e.g. 'tamil_nadu')."""
+    metrics = {}
+    for key, value in stats.items():
+        slug = _NOT_SLUG.sub("_", str(key).lower()).strip("_")
+        if not slug:
+            continue
+        name = prefix + slug
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, (int, float)):
+            metrics[name] = float(value)
+        elif isinstance(value, dict):
+            metrics.update(flatten_stats(value, f"{name}."))
+    # Scraped pages only carry display strings
+    if "total_pending_display" in stats and "total_pending_cases" not in metrics:
+        value = parse_display_number(stats["total_pending_display"])
+        if value is not None:
+            metrics["total_pending_cases"] = value
+    return {name: value for name, value in metrics.items() if _METRIC_NAME.match(name)}
+
+
+class Tier:
+    """One directory of equally long columns: timestamps plus a file per metric."""
+
+    def __init__(self, root: str, name: str, width: int, retention: int):
+        self.name = name
+        self.width = width
+        self.retention = retention
+        self.path = os.path.join(root, name)
+
+    def _file(self, metric: str) -> str:
+        return os.path.join(self.path, _TIMESTAMPS if metric is None else f"{metric}.f64")
+
+    def timestamps(self) -> np.ndarray:
+        path = self._file(None)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.memmap(path, dtype=np.int64, mode="r")
+
+    def metrics(self) -> List[str]:
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(name[:-4] for name in os.listdir(self.path) if name.endswith(".f64"))
+
+    def column(self, metric: str, length: int) -> np.ndarray:
+        """A metric column aligned to the first 'length' timestamps (NaN where missing)."""
+        path = self._file(metric)
+        values = np.memmap(path, dtype=np.float64, mode="r") if os.path.exists(path) and os.path.getsize(path) else \
+            np.zeros(0, dtype=np.float64)
+        if values.size >= length:
+            return values[:length]
+        return np.concatenate([values, np.full(length - values.size, np.nan)])
+
+    def last_timestamp(self) -> Optional[int]:
+        timestamps = self.timestamps()
+        return int(timestamps[-1]) if timestamps.size else None
+
+    def append(self, timestamps: np.ndarray, values: Dict[str, np.ndarray]):
+        """
+        Append rows. Metric columns are written before the timestamps, so readers never see a row half written.
+
+        Every file is first cut or padded to the committed row count: rows left
+        behind by an append that crashed before its timestamps were written are
+        dropped instead of shifting the new rows out of step.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        path = self._file(None)
+        length = os.path.getsize(path) // 8 if os.path.exists(path) else 0
+        if os.path.exists(path) and os.path.getsize(path) != length * 8:
+            os.truncate(path, length * 8)
+        for metric in set(self.metrics()) | set(values):
+            column = values.get(metric, np.full(timestamps.size, np.nan))
+            path = self._file(metric)
+            existing = os.path.getsize(path) // 8 if os.path.exists(path) else 0
+            if os.path.exists(path) and os.path.getsize(path) > length * 8:
+                os.truncate(path, length * 8)
+                existing = length
+            with open(path, "ab") as f:
+                if existing < length:
+                    np.full(length - existing, np.nan).tofile(f)
+                np.asarray(column, dtype=np.float64).tofile(f)
+        with open(self._file(None), "ab") as f:
+            np.asarray(timestamps, dtype=np.int64).tofile(f)
+
+    def read(self, metrics: List[str], start: int, end: int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        timestamps = self.timestamps()
+        lo, hi = np.searchsorted(timestamps, [start, end], side="left")
+        length = timestamps.size
+        return (np.array(timestamps[lo:hi]),
+                {metric: np.array(self.column(metric, length)[lo:hi]) for metric in metrics})
+
+    def compact(self, now: float):
+        """Drop rows older than the retention once enough have piled up (rewrites the tier)."""
+        timestamps = self.timestamps()
+        if not timestamps.size or timestamps[0] >= now - self.retention * (1 + COMPACT_SLACK):
+            return
+        keep = int(np.searchsorted(timestamps, now - self.retention, side="left"))
+        metrics = self.metrics()
+        columns = {metric: np.array(self.column(metric, timestamps.size)[keep:]) for metric in metrics}
+        kept = np.array(timestamps[keep:])
+        del timestamps
+
+        staging = Tier(os.path.dirname(self.path), f"{self.name}.new", self.width, self.retention)
+        shutil.rmtree(staging.path, ignore_errors=True)
+        staging.append(kept, columns)
+        old = f"{self.path}.old"
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(self.path, old)
+        os.replace(staging.path, self.path)
+        shutil.rmtree(old, ignore_errors=True)
+
+
+class HistoryStore:
+    def __init__(self, root: str = HISTORY_DIR):
+        self.root = root
+        self.tiers = [Tier(root, name, width, retention) for name, width, retention in TIERS]
+        self._lock = threading.Lock()
+
+    def tier(self, name: str) -> Tier:
+        return next(tier for tier in self.tiers if tier.name == name)
+
+    def record(self, metrics: Dict[str, float], timestamp: Optional[float] = None):
+        """Append one raw sample, then roll completed buckets up into the coarser tiers."""
+        timestamp = int(timestamp or time.time())
+        with self._lock:
+            raw = self.tiers[0]
+            last = raw.last_timestamp()
+            if last is not None and timestamp <= last:
+                return
+            raw.append(np.array([timestamp]), {name: np.array([value]) for name, value in metrics.items()})
+            for source, target in zip(self.tiers, self.tiers[1:]):
+                self._roll_up(source, target, timestamp)
+            for tier in self.tiers:
+                tier.compact(timestamp)
+
+    @staticmethod
+    def _roll_up(source: Tier, target: Tier, now: int):
+        """Average the source rows of every bucket that has ended and is not in the target yet."""
+        width = target.width
+        last = target.last_timestamp()
+        start = last + width if last is not None else 0
+        end = (now // width) * width                 # start of the bucket still in progress
+        if end <= start:
+            return
+        metrics = source.metrics()
+        timestamps, columns = source.read(metrics, start, end)
+        if not timestamps.size:
+            return
+        buckets = (timestamps // width) * width
+        bucket_starts, first_rows = np.unique(buckets, return_index=True)
+        means = {}
+        for metric, values in columns.items():
+            present = ~np.isnan(values)
+            sums = np.add.reduceat(np.where(present, values, 0.0), first_rows)
+            counts = np.add.reduceat(present.astype(np.int64), first_rows)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means[metric] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        target.append(bucket_starts, means)
+
+    def metrics(self) -> List[str]:
+        return sorted(set().union(*(tier.metrics() for tier in self.tiers)))
+
+    def query(self, metrics: List[str], start: float, end: float, resolution: str = "auto",
+              max_points: int = DEFAULT_MAX_POINTS) -> Dict:
+        """
+        Samples of the given metrics in [start, end).
+
+        'auto' resolution uses the finest tier that still covers the start of
+        the range and fits in max_points; results are further averaged into
+        at most max_points buckets.
+        """
+        now = time.time()
+        if resolution == "auto":
+            span = max(end - start, 1)
+            candidates = [t for t in self.tiers if start >= now - t.retention and (t.width or SAMPLE_INTERVAL) * max_points >= span]
+            tier = candidates[0] if candidates else self.tiers[-1]
+        else:
+            tier = self.tier(resolution)
+
+        for attempt in range(2):
+            try:
+                timestamps, columns = tier.read(metrics, int(start), int(end))
+                break
+            except (FileNotFoundError, ValueError):
+                # The tier was being compacted; it is back in place right after
+                timestamps, columns = np.zeros(0, dtype=np.int64), {metric: np.zeros(0) for metric in metrics}
+                time.sleep(0.05)
+
+        if timestamps.size > max_points:
+            step = int(np.ceil(timestamps.size / max_points))
+            first_rows = np.arange(0, timestamps.size, step)
+            timestamps = timestamps[first_rows]
+            for metric, values in columns.items():
+                present = ~np.isnan(values)
+                sums = np.add.reduceat(np.where(present, values, 0.0), first_rows)
+                counts = np.add.reduceat(present.astype(np.int64), first_rows)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    columns[metric] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+        times = timestamps.tolist()
+        return {
+            "resolution": tier.name,
+            "series": {
+                metric: [[t, None if np.isnan(v) else round(float(v), 3)] for t, v in zip(times, values.tolist())]
+                for metric, values in columns.items()
+            }
+        }
+
+
+_store = HistoryStore()
+_sampler: threading.Thread = None
+
+
+def get_store() -> HistoryStore:
+    return _store
+
+
+def take_sample() -> bool:
+    """Record the current statistics: case store counters when available, else the NJDG page."""
+    from backend.utils.njdg_cube import get_stats
+    from backend.utils.web_scraper import scrape_njdg_stats
+
+    stats = get_stats() or scrape_njdg_stats()
+    metrics = flatten_stats(stats) if stats else {}
+    if not metrics:
+        return False
+    _store.record(metrics)
+    return True
+
+
+def _run_sampler():
+    while True:
+        try:
+            take_sample()
+        except Exception as e:
+            print(f"NJDG history sample failed: {e}")
+        time.sleep(SAMPLE_INTERVAL)
+
+
+def start_sampler():
+    """Start the background sampling thread (indexer process only)."""
+    global _sampler
+    if _sampler is None or not _sampler.is_alive():
+        _sampler = threading.Thread(target=_run_sampler, name="njdg-history-sampler", daemon=True)
+        _sampler.start()
+
+
+def parse_time(value: Optional[str], default: float) -> float:
+    """Epoch seconds from a query parameter given as epoch seconds or an ISO date/time. Raises ValueError."""
+    if not value:
+        return default
+    try:
+        seconds = float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+    if not math.isfinite(seconds):
+        raise ValueError(f"Not a time: {value}")
+    return seconds
@@ -0,0 +1,139 @@
+"""
+Politeness Scheduler for Outbound Scraping
+Per-host token-bucket rate limits and concurrency caps, so bursts of user
+traffic never fan out into bursts against government portals.
+
+Limits are configured per DOJ_SOURCES entry (rate_limit, burst,
+max_concurrency, max_queue_wait) for the whole deployment; each worker
+process enforces its share of them. Concurrency slots are split exactly
+(see worker_share), and each worker gets the part of the rate and burst
+that matches its slots. A worker left without a slot (more workers than
+max_concurrency) refuses requests to that host straight away, so callers
+serve the last cached result.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict
+
+from backend.utils.worker import worker_count, worker_id, worker_share
+
+DEFAULT_POLICY = {
+    "rate_limit": 1.0,       # sustained requests per second
+    "burst": 3,              # requests allowed back-to-back
+    "max_concurrency": 2,    # simultaneous requests in flight
+    "max_queue_wait": 2.0,   # seconds a request may wait for a slot before giving up
+    "max_queued": 8          # waiting requests beyond this are rejected immediately
+}
+
+
+class HostBusy(Exception):
+    """Raised when a host's rate or concurrency budget can't admit a request in time."""
+
+
+class HostScheduler:
+    """Token bucket plus concurrency cap for a single host."""
+
+    def __init__(self, host: str, policy: Dict[str, Any], share: int = 1):
+        # With several workers each gets its share of the host's slots, and of the rate in proportion
+        self.host = host
+        cap = int(policy["max_concurrency"])
+        self.slots = worker_share(cap, share)
+        self.rate = float(policy["rate_limit"]) * self.slots / cap
+        self.burst = max(1.0, float(policy["burst"]) * self.slots / cap) if self.slots else 0.0
+        self.max_queue_wait = float(policy["max_queue_wait"])
+        self.max_queued = int(policy["max_queued"])
+        self._slots = threading.BoundedSemaphore(self.slots) if self.slots else None
+        if not self.slots:
+            print(f"⚠️ {host}: max_concurrency {cap} is below the {share} workers; "
+                  f"worker {worker_id()} will not fetch from it")
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self.stats = {"admitted": 0, "rejected": 0, "queued": 0, "in_flight": 0, "wait_ms_total": 0.0}
+
+    def _reserve_token(self) -> float:
+        """Take a token if one is available; otherwise return seconds until the next one."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def _reject(self, reason: str):
+        with self._lock:
+            self.stats["rejected"] += 1
+        raise HostBusy(f"{self.host}: {reason}")
+
+    @contextmanager
+    def slot(self, max_wait: float = None):
+        """Hold a concurrency slot and a rate token for the duration of one request."""
+        max_wait = self.max_queue_wait if max_wait is None else min(max_wait, self.max_queue_wait)
+        start = time.monotonic()
+        if self._slots is None:
+            self._reject("no share of the host's budget on this worker")
+
+        with self._lock:
+            if self.stats["queued"] >= self.max_queued:
+                self.stats["rejected"] += 1
+                raise HostBusy(f"{self.host}: queue full")
+            self.stats["queued"] += 1
+
+        try:
+            if not self._slots.acquire(timeout=max(max_wait, 0)):
+                self._reject("concurrency limit")
+            try:
+                while True:
+                    wait = self._reserve_token()
+                    if not wait:
+                        break
+                    if time.monotonic() + wait - start > max_wait:
+                        self._reject("rate limit")
+                    time.sleep(wait)
+            except HostBusy:
+                self._slots.release()
+                raise
+        finally:
+            with self._lock:
+                self.stats["queued"] -= 1
+
+        with self._lock:
+            self.stats["admitted"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["wait_ms_total"] += (time.monotonic() - start) * 1000
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stats["in_flight"] -= 1
+            self._slots.release()
+
+
+_schedulers_lock = threading.Lock()
+_schedulers: Dict[str, HostScheduler] = {}
+
+
+def scheduler_for(host: str, policy: Dict[str, Any] = None) -> HostScheduler:
+    """Return the scheduler for a host, created from its source policy on first use."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(host)
+        if scheduler is None:
+            merged = {**DEFAULT_POLICY, **{k: v for k, v in (policy or {}).items() if k in DEFAULT_POLICY}}
+            scheduler = _schedulers[host] = HostScheduler(host, merged, share=worker_count())
+        return scheduler
+
+
+def get_stats() -> Dict[str, Dict[str, Any]]:
+    """Admission statistics per host."""
+    with _schedulers_lock:
+        report = {}
+        for host, scheduler in _schedulers.items():
+            stats = dict(scheduler.stats)
+            wait_ms_total = stats.pop("wait_ms_total")
+            stats["avg_wait_ms"] = round(wait_ms_total / stats["admitted"], 1) if stats["admitted"] else None
+            report[host] = stats
+        return report
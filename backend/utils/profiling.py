@@ -0,0 +1,452 @@
+"""
+Profiling and Memory Tracking
+Opt-in diagnostics for a running server, exposed through the /debug
+endpoints in main.py (enabled only when NEETHI_DEBUG_TOKEN is set).
+
+- CPU: a sampling profiler that records the Python stacks of every thread
+  at a fixed interval, for one request (X-Profile header, or a random
+  NEETHI_PROFILE_RATE share of requests) or for the whole process over a
+  few seconds. Profiles are written in the folded-stack format read by
+  flamegraph.pl, speedscope and inferno. A request profile is a profile of
+  the whole process for the request's duration: other requests running at
+  the same time (on the event loop or in the threadpool) are in it too, so
+  profile on a quiet worker or read the stacks by their handler frames.
+- Memory: tracemalloc snapshots, diffs between them and folded allocation
+  stacks, plus estimates of the large in-process structures (embedding
+  model, caches, indexes) next to the process RSS.
+
+Everything here is per process: under backend/server.py each worker keeps
+its own snapshots, and profile files from all workers land in one
+directory.
+"""
+
+import gc
+import hmac
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+DEBUG_TOKEN = os.environ.get("NEETHI_DEBUG_TOKEN", "")
+
+# Share of requests profiled without being asked to (0 disables)
+PROFILE_RATE = float(os.environ.get("NEETHI_PROFILE_RATE", "0"))
+
+PROFILE_DIR = os.environ.get("NEETHI_PROFILE_DIR", "backend/data/profiles")
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+
+# Profile files kept (oldest are deleted)
+MAX_PROFILES = 50
+
+# Longest on-demand whole-process profile (seconds)
+MAX_PROFILE_SECONDS = 60
+
+# tracemalloc snapshots kept in memory
+MAX_SNAPSHOTS = 10
+
+# Leaf frames of a thread that is only waiting (idle pool workers, the event loop's select)
+_IDLE_LEAVES = {("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get")}
+
+
+def token_valid(token: Optional[str]) -> bool:
+    return bool(DEBUG_TOKEN) and token is not None and hmac.compare_digest(token, DEBUG_TOKEN)
+
+
+# ===============================
+# CPU SAMPLING
+# ===============================
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+class StackSampler:
+    """Samples every other thread's Python stack into folded-stack counts."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = None
+        self.duration = 0.0
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                code = frame.f_code
+                if not self.include_idle and (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)).replace(";", ",").replace(" ", "_"))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self) -> "StackSampler":
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "StackSampler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.time() - self.started_at
+        return self
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+_profile_lock = threading.Lock()
+_sequence = itertools.count()
+
+
+def _safe(text: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in text).strip("_")[:60]
+
+
+def new_profile_id(label: str) -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_sequence)}-{_safe(label)}.folded"
+
+
+def save_profile(sampler: StackSampler, profile_id: str) -> str:
+    """Write a finished profile under its id (the file name) and drop the oldest beyond MAX_PROFILES."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, profile_id), "w", encoding="utf-8") as f:
+        f.write(sampler.folded())
+    for old in sorted(os.listdir(PROFILE_DIR))[:-MAX_PROFILES]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, old))
+        except OSError:
+            pass
+    return profile_id
+
+
+def list_profiles() -> List[Dict]:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        path = os.path.join(PROFILE_DIR, name)
+        if name.endswith(".folded") and os.path.isfile(path):
+            profiles.append({"id": name, "bytes": os.path.getsize(path), "created": os.path.getmtime(path)})
+    return profiles
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    """Path of a stored profile, None for unknown ids (or anything that is not a plain file name)."""
+    if os.path.basename(profile_id) != profile_id or not profile_id.endswith(".folded"):
+        return None
+    path = os.path.join(PROFILE_DIR, profile_id)
+    return path if os.path.isfile(path) else None
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the process from a request's start until the last byte of its
+    response is sent, when it carries X-Profile with a valid X-Debug-Token or
+    is picked at NEETHI_PROFILE_RATE. Every thread is sampled, so concurrent
+    requests show up as well (see the module docstring). One request is
+    profiled at a time; the profile id is returned in the X-Profile-Id
+    response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _wanted(self, scope) -> bool:
+        if not DEBUG_TOKEN and not PROFILE_RATE:
+            return False
+        headers = dict(scope.get("headers") or [])
+        asked = headers.get(b"x-profile", b"").lower() in (b"1", b"true", b"yes")
+        if asked:
+            token = headers.get(b"x-debug-token")
+            return token_valid(token.decode("latin-1") if token else None)
+        return PROFILE_RATE > 0 and not scope["path"].startswith("/debug") and random.random() < PROFILE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope) or not _profile_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = StackSampler().start()
+        # The id goes out in the response headers; the file is written once the body is sent
+        profile_id = new_profile_id(f"{scope['method']}-{scope['path']}")
+        finished = False
+
+        def finish():
+            nonlocal finished
+            if not finished:
+                finished = True
+                sampler.stop()
+                _profile_lock.release()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) +
+                           [(b"x-profile-id", profile_id.encode())]}
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                finish()
+                save_profile(sampler, profile_id)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
+
+
+def profile_process(seconds: float) -> str:
+    """Sample the whole process for a number of seconds (blocking); returns the profile id."""
+    seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+    with _profile_lock:
+        sampler = StackSampler().start()
+        time.sleep(seconds)
+        sampler.stop()
+    return save_profile(sampler, new_profile_id(f"process-{seconds:g}s"))
+
+
+# ===============================
+# TRACEMALLOC
+# ===============================
+
+_snapshots: Dict[int, tracemalloc.Snapshot] = {}
+_snapshot_ids = itertools.count(1)
+_snapshot_lock = threading.Lock()
+
+# Allocations made by the tracing machinery itself
+_TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def tracemalloc_start(frames: int = 25) -> Dict:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(max(1, min(frames, 100)))
+    return tracemalloc_status()
+
+
+def tracemalloc_stop() -> Dict:
+    tracemalloc.stop()
+    with _snapshot_lock:
+        _snapshots.clear()
+    return tracemalloc_status()
+
+
+def tracemalloc_status() -> Dict:
+    current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+    return {
+        "tracing": tracemalloc.is_tracing(),
+        "frames": tracemalloc.get_traceback_limit(),
+        "traced_bytes": current,
+        "peak_bytes": peak,
+        "snapshots": sorted(_snapshots),
+        "pid": os.getpid(),
+    }
+
+
+def _stat_dict(stat) -> Dict:
+    frame = stat.traceback[0]
+    entry = {"file": frame.filename, "line": frame.lineno, "bytes": stat.size, "count": stat.count}
+    if hasattr(stat, "size_diff"):
+        entry.update(bytes_diff=stat.size_diff, count_diff=stat.count_diff)
+    return entry
+
+
+def take_snapshot(top: int = 25, group_by: str = "lineno") -> Dict:
+    """Snapshot the traced allocations; returns its id and the largest allocation sites."""
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not running; start it first")
+    snapshot = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+    with _snapshot_lock:
+        snapshot_id = next(_snapshot_ids)
+        _snapshots[snapshot_id] = snapshot
+        for old in sorted(_snapshots)[:-MAX_SNAPSHOTS]:
+            del _snapshots[old]
+    stats = snapshot.statistics(group_by)
+    return {
+        "id": snapshot_id,
+        "pid": os.getpid(),
+        "total_bytes": sum(stat.size for stat in stats),
+        "top": [_stat_dict(stat) for stat in stats[:top]],
+    }
+
+
+def _snapshot(snapshot_id: int) -> tracemalloc.Snapshot:
+    snapshot = _snapshots.get(snapshot_id)
+    if snapshot is None:
+        raise KeyError(f"No snapshot {snapshot_id} in process {os.getpid()}")
+    return snapshot
+
+
+def diff_snapshots(base: int, target: Optional[int] = None, top: int = 25, group_by: str = "lineno") -> Dict:
+    """Growth from snapshot 'base' to 'target' (a new snapshot when omitted), largest first."""
+    if target is None:
+        target = take_snapshot(top=0)["id"]
+    stats = _snapshot(target).compare_to(_snapshot(base), group_by)
+    return {
+        "base": base,
+        "target": target,
+        "pid": os.getpid(),
+        "bytes_diff": sum(stat.size_diff for stat in stats),
+        "top": [_stat_dict(stat) for stat in stats[:top]],
+    }
+
+
+def snapshot_folded(snapshot_id: int) -> str:
+    """A snapshot's live allocations as folded stacks weighted by bytes (a memory flamegraph)."""
+    counts: Counter = Counter()
+    for stat in _snapshot(snapshot_id).statistics("traceback"):
+        frames = [f"{os.path.basename(f.filename)}:{f.lineno}".replace(";", ",") for f in stat.traceback]
+        counts[";".join(frames)] += stat.size
+    return "".join(f"{stack} {size}\n" for stack, size in counts.most_common())
+
+
+# ===============================
+# MEMORY ACCOUNTING
+# ===============================
+
+def approx_size(obj, limit: int = 200000) -> int:
+    """Deep size estimate of an object graph (containers, strings, numpy arrays), visiting at most limit objects."""
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack and len(seen) < limit:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        nbytes = getattr(item, "nbytes", None)
+        if isinstance(nbytes, int) and not isinstance(item, (str, bytes)):
+            total += nbytes
+            continue
+        total += sys.getsizeof(item, 0)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, "__dict__") and not isinstance(item, type):
+            stack.append(vars(item))
+        elif hasattr(item, "__slots__"):
+            stack.extend(getattr(item, name) for name in item.__slots__ if hasattr(item, name))
+    return total
+
+
+def model_bytes(function) -> Optional[int]:
+    """Parameter bytes of the model(s) behind a Chroma sentence-transformer embedding function."""
+    model = getattr(function, "_model", None)
+    models = [model] if model is not None else list(getattr(function, "models", {}).values())
+    total = 0
+    for model in models:
+        if model is not None and hasattr(model, "parameters"):
+            total += sum(p.numel() * p.element_size() for p in model.parameters())
+    return total or None
+
+
+def _model_bytes() -> Optional[int]:
+    from backend.utils import vector_db
+    return model_bytes(vector_db.embedding_func)
+
+
+def _kb_snapshot_bytes() -> Optional[int]:
+    from backend.utils import vector_db
+    snapshot = vector_db.get_snapshot()
+    return snapshot.get_stats()["bytes"] if snapshot is not None else None
+
+
+def _scrape_cache_bytes() -> int:
+    from backend.utils import web_scraper
+    return approx_size(web_scraper._cache)
+
+
+def _response_cache_bytes() -> int:
+    from backend.utils.response_cache import get_cache
+    cache = get_cache()
+    with cache._lock:
+        return sum(len(e.body) + len(e.gzipped or b"") for e in cache._entries.values())
+
+
+def _lawyer_directory_bytes() -> int:
+    from backend import services
+    return approx_size(services._directory) if services._directory is not None else 0
+
+
+def _njdg_cube_bytes() -> int:
+    from backend.utils import njdg_cube
+    return approx_size(njdg_cube._cube._cube)
+
+
+def _matching_bytes() -> int:
+    from backend import services
+    engine = getattr(services, "_engine", None)
+    return approx_size(engine) if engine is not None else 0
+
+
+_probes: Dict[str, Callable[[], Optional[int]]] = {
+    "embedding_model": _model_bytes,
+    "kb_snapshot": _kb_snapshot_bytes,
+    "scrape_cache": _scrape_cache_bytes,
+    "response_cache": _response_cache_bytes,
+    "lawyer_directory": _lawyer_directory_bytes,
+    "njdg_cube": _njdg_cube_bytes,
+    "matching_engine": _matching_bytes,
+}
+
+
+def register_probe(name: str, probe: Callable[[], Optional[int]]):
+    """Add a named estimate (bytes) to the memory report."""
+    _probes[name] = probe
+
+
+def process_memory() -> Dict:
+    """RSS, PSS and dirty/shared bytes of this process (peak RSS where /proc is unavailable)."""
+    memory = {"pid": os.getpid()}
+    try:
+        with open(f"/proc/{os.getpid()}/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss", "Private_Dirty", "Shared_Clean"):
+                    memory[key.lower() + "_bytes"] = int(value.split()[0]) * 1024
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memory["peak_rss_bytes"] = peak if sys.platform == "darwin" else peak * 1024
+    return memory
+
+
+def memory_report() -> Dict:
+    """Process memory plus the estimated size of each large in-process structure."""
+    components = {}
+    for name, probe in _probes.items():
+        try:
+            components[name] = probe()
+        except Exception as e:
+            components[name] = None
+            print(f"Memory probe {name} failed: {e}")
+    return {
+        "process": process_memory(),
+        "components": components,
+        "gc": {"objects": len(gc.get_objects()), "counts": gc.get_count(), "frozen": gc.get_freeze_count()},
+        "tracemalloc": tracemalloc_status(),
+    }
@@ -0,0 +1,325 @@
+"""
+API Rate Limiting
+Per-client token buckets and fair-share admission, so one client calling
+/chat or the scraping endpoints in a loop cannot take every LLM or scraper
+slot and slow everyone else down.
+
+Requests fall into classes, each with its own budget per client:
+    chat     /chat and chat messages on /ws/chat   (LLM generation)
+    scrape   /case-status, /njdg/stats             (may scrape a live portal)
+    default  everything else (health, readiness, metrics, debug and admin are exempt)
+A client is its API key when it sends a configured one (X-API-Key), else
+its address. A client whose bucket is empty gets 429 with Retry-After.
+
+The expensive classes also cap the requests in progress, overall and per
+client. Requests over the cap wait, and are admitted in fair-share order:
+the client with the fewest requests in progress first, then the longest
+waiting. A heavy client therefore queues behind itself, not in front of
+everyone else. When the queue is full, the heaviest client's newest request
+is dropped (429). A request that waits longer than max_queue_wait gets 503.
+
+Each worker process enforces the limits in memory, with no coordination
+between workers. A client's token bucket and its in-progress cap are whole
+on every worker: a client's keep-alive connection stays on one worker, so
+that worker gives it the full budget (a client spreading its connections
+over N workers can get up to N times it). The overall in-progress cap is
+for the whole deployment and split exactly across the workers
+(worker_share), each keeping at least one slot so that no worker turns a
+class away outright. All state belongs to the event loop, so no locks are
+needed.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional, Tuple
+
+from backend.utils import indexer_route
+from backend.utils.worker import worker_count, worker_share
+
+ENABLED = os.environ.get("NEETHI_RATE_LIMIT", "1") != "0"
+
+# Comma-separated API keys that get their own budgets; other clients are identified by address
+API_KEYS = {key.strip() for key in os.environ.get("NEETHI_API_KEYS", "").split(",") if key.strip()}
+
+# Identify clients by the first X-Forwarded-For address (only behind a trusted reverse proxy)
+TRUST_PROXY = os.environ.get("NEETHI_TRUST_PROXY", "0") == "1"
+
+POLICIES = {
+    "chat": {
+        "rate_limit": 0.2,        # sustained requests per second per client
+        "burst": 6,               # requests a client may make back-to-back
+        "max_concurrency": 4,     # requests in progress, all clients
+        "max_per_client": 2,      # requests in progress per client
+        "max_queue_wait": 15.0,   # seconds a request may wait for a slot
+        "max_queued": 32          # waiting requests, all clients
+    },
+    "scrape": {"rate_limit": 0.5, "burst": 10, "max_concurrency": 8, "max_per_client": 3,
+               "max_queue_wait": 5.0, "max_queued": 64},
+    "default": {"rate_limit": 5.0, "burst": 50, "max_concurrency": None},
+}
+
+CLASS_ROUTES = (("/chat", "chat"), ("/case-status", "scrape"), ("/njdg/stats", "scrape"))
+EXEMPT_ROUTES = ("/health", "/ready", "/metrics", "/debug", "/admin")
+
+# Buckets kept per class; the least recently seen are dropped first (an idle
+# client's bucket refills to full anyway, which is what a new one starts at)
+MAX_CLIENTS = 50000
+
+
+class RateLimited(Exception):
+    """A request refused by its client's budget (429) or because the server is busy (503)."""
+
+    def __init__(self, detail: str, retry_after: float, status: int = 429):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.status = status
+
+
+def _under(path: str, prefix: str) -> bool:
+    return path == prefix or path.startswith(prefix + "/")
+
+
+def request_class(path: str) -> Optional[str]:
+    """The budget a path is charged to, or None when it is exempt."""
+    if any(_under(path, prefix) for prefix in EXEMPT_ROUTES):
+        return None
+    for prefix, kind in CLASS_ROUTES:
+        if _under(path, prefix):
+            return kind
+    return "default"
+
+
+def client_key(scope) -> str:
+    headers = dict(scope.get("headers") or [])
+    if indexer_route.is_forwarded(scope) and indexer_route.CLIENT_HEADER in headers:
+        return headers[indexer_route.CLIENT_HEADER].decode("latin-1")
+    api_key = headers.get(b"x-api-key", b"").decode("latin-1")
+    if api_key in API_KEYS:
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:12]
+    forwarded = headers.get(b"x-forwarded-for")
+    if TRUST_PROXY and forwarded:
+        return "ip:" + forwarded.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class ClassLimiter:
+    """Token buckets per client and the fair-share gate for one request class (see module docstring)."""
+
+    def __init__(self, kind: str, policy: Dict, share: int = 1):
+        # Only the overall in-progress cap is split across the `share` workers; per-client limits are whole
+        self.kind = kind
+        self.rate = float(policy["rate_limit"])
+        self.burst = max(1.0, float(policy["burst"]))
+        cap = policy.get("max_concurrency")
+        self.slots = max(1, worker_share(int(cap), share)) if cap else None
+        self.max_per_client = max(1, int(policy.get("max_per_client") or cap or 1))
+        self.max_queue_wait = float(policy.get("max_queue_wait", 0))
+        self.max_queued = int(policy.get("max_queued", 0))
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()   # client -> [tokens, updated]
+        self._active: Dict[str, int] = {}
+        self._waiting: Dict[str, Deque[Tuple[int, asyncio.Future]]] = {}
+        self._queued = 0
+        self._in_use = 0
+        self._arrivals = 0
+        self.stats = {"admitted": 0, "limited": 0, "dropped": 0, "timed_out": 0, "wait_ms_total": 0.0}
+
+    # Token buckets
+
+    def take_token(self, client: str) -> float:
+        """Spend one of the client's tokens; returns 0, or the seconds until one is available."""
+        now = time.monotonic()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [self.burst, now]
+            if len(self._buckets) > MAX_CLIENTS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.rate
+
+    # Fair-share gate
+
+    def _may_start(self, client: str) -> bool:
+        return self._in_use < self.slots and self._active.get(client, 0) < self.max_per_client
+
+    def _start(self, client: str):
+        self._in_use += 1
+        self._active[client] = self._active.get(client, 0) + 1
+
+    def _grant_waiting(self):
+        """Hand free slots to waiting requests: fewest in progress first, then the longest waiting."""
+        while self._in_use < self.slots:
+            best = None
+            for client, waiters in self._waiting.items():
+                if self._active.get(client, 0) < self.max_per_client:
+                    rank = (self._active.get(client, 0), waiters[0][0])
+                    if best is None or rank < best[0]:
+                        best = (rank, client)
+            if best is None:
+                return
+            client = best[1]
+            future = self._dequeue(client)
+            self._start(client)
+            future.set_result(None)
+
+    def _dequeue(self, client: str, future: asyncio.Future = None) -> asyncio.Future:
+        """Remove a client's waiting request (its oldest, or the given one)."""
+        waiters = self._waiting[client]
+        if future is None:
+            future = waiters.popleft()[1]
+        else:
+            waiters.remove(next(entry for entry in waiters if entry[1] is future))
+        if not waiters:
+            del self._waiting[client]
+        self._queued -= 1
+        return future
+
+    def _make_room(self, client: str):
+        """Queue full: drop the newest request of the client with the most waiting (possibly this one)."""
+        heaviest = max(self._waiting, key=lambda c: len(self._waiting[c]))
+        self.stats["dropped"] += 1
+        if len(self._waiting[heaviest]) <= len(self._waiting.get(client, ())):
+            raise RateLimited(f"Too many {self.kind} requests waiting", self.max_queue_wait)
+        future = self._waiting[heaviest][-1][1]
+        self._dequeue(heaviest, future)
+        future.set_exception(RateLimited(f"Too many {self.kind} requests waiting", self.max_queue_wait))
+
+    async def acquire(self, client: str):
+        """Admit one request of the client, waiting for a slot if needed. Raises RateLimited."""
+        wait = self.take_token(client)
+        if wait:
+            self.stats["limited"] += 1
+            raise RateLimited(f"Too many {self.kind} requests, slow down", wait)
+        if self.slots is None or self._may_start(client):
+            if self.slots is not None:
+                self._start(client)
+            self.stats["admitted"] += 1
+            return
+
+        if self._queued >= self.max_queued:
+            self._make_room(client)
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._arrivals += 1
+        self._waiting.setdefault(client, deque()).append((self._arrivals, future))
+        self._queued += 1
+        try:
+            await asyncio.wait({future}, timeout=self.max_queue_wait)
+        except asyncio.CancelledError:
+            if future.done():
+                if future.exception() is None:
+                    self.release(client)
+            else:
+                self._dequeue(client, future)
+            raise
+        if not future.done():
+            self._dequeue(client, future)
+            self.stats["timed_out"] += 1
+            raise RateLimited("Server busy, try again shortly", self.max_queue_wait, status=503)
+        future.result()
+        self.stats["admitted"] += 1
+        self.stats["wait_ms_total"] += (time.monotonic() - started) * 1000
+
+    def release(self, client: str):
+        if self.slots is None:
+            return
+        self._in_use -= 1
+        remaining = self._active.get(client, 1) - 1
+        if remaining:
+            self._active[client] = remaining
+        else:
+            self._active.pop(client, None)
+        self._grant_waiting()
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        wait_ms_total = stats.pop("wait_ms_total")
+        stats.update({
+            "clients": len(self._buckets),
+            "in_progress": self._in_use if self.slots is not None else None,
+            "waiting": self._queued,
+            "avg_wait_ms": round(wait_ms_total / stats["admitted"], 1) if stats["admitted"] else None,
+        })
+        return stats
+
+
+_limiters: Dict[str, ClassLimiter] = {}
+
+
+def limiter_for(kind: str) -> ClassLimiter:
+    """The limiter of a request class, created on first use (after the worker is forked)."""
+    limiter = _limiters.get(kind)
+    if limiter is None:
+        limiter = _limiters[kind] = ClassLimiter(kind, POLICIES[kind], share=worker_count())
+    return limiter
+
+
+@asynccontextmanager
+async def admit(client: str, kind: str):
+    """Hold an admission of the given class for the duration of the block. Raises RateLimited."""
+    if not ENABLED:
+        yield
+        return
+    limiter = limiter_for(kind)
+    await limiter.acquire(client)
+    try:
+        yield
+    finally:
+        limiter.release(client)
+
+
+def get_stats() -> Dict[str, Dict]:
+    """Admission statistics per request class."""
+    return {kind: limiter.get_stats() for kind, limiter in _limiters.items()}
+
+
+class RateLimitMiddleware:
+    """Charges every HTTP request and WebSocket handshake to its client's budget (see module docstring)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        kind = request_class(scope["path"]) if scope["type"] in ("http", "websocket") else None
+        if indexer_route.is_forwarded(scope):
+            # Already charged by the worker that received it
+            kind = None
+        if not ENABLED or kind is None or scope.get("method") == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        client = client_key(scope)
+        admitted = False
+        try:
+            async with admit(client, kind):
+                admitted = True
+                await self.app(scope, receive, send)
+        except RateLimited as e:
+            if admitted:
+                raise
+            await self._reject(scope, send, e)
+
+    @staticmethod
+    async def _reject(scope, send, error: RateLimited):
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 1013, "reason": error.detail})
+            return
+        body = json.dumps({"detail": error.detail, "retry_after": error.retry_after}).encode()
+        await send({"type": "http.response.start", "status": error.status, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(error.retry_after).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,127 @@
+"""
+Response Cache
+Pre-serialized JSON bodies for endpoints whose content changes rarely
+(/njdg/stats, /tele-law/lawyers, rule-based /chat answers).
+
+Each entry is keyed by the request (path and parameters) and tagged with a
+version of the data it was built from — the case store reload time, the
+scrape cache timestamp, the lawyer directory's availability version. A
+request whose version matches reuses the stored bytes (and their gzip
+form), and clients revalidating with If-None-Match get a 304 without a
+body. When the version moves on the entry is rebuilt.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Entries kept per process (least recently used are dropped)
+MAX_ENTRIES = 512
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+
+
+def dumps(payload: Any) -> bytes:
+    """Compact JSON, identical in shape to FastAPI's default response encoding."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class CachedBody:
+    __slots__ = ("version", "body", "gzipped", "etag")
+
+    def __init__(self, version: Hashable, payload: Any):
+        self.version = version
+        self.body = dumps(payload)
+        self.gzipped = gzip.compress(self.body, GZIP_LEVEL) if len(self.body) >= GZIP_MIN_BYTES else None
+        # Weak: the same tag stands for the plain and the gzip representation
+        self.etag = f'W/"{hashlib.blake2b(self.body, digest_size=12).hexdigest()}"'
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, version: Hashable, build: Callable[[], Any]) -> CachedBody:
+        """The cached body for key at this data version, building and storing it on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = CachedBody(version, build())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" and "x" match
+    def opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+    return any(opaque(tag) == opaque(etag) for tag in if_none_match.split(","))
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def respond(entry: CachedBody, headers, cache_control: str, conditional: bool = True) -> Response:
+    """
+    Response for a cached body given the request headers: 304 when the
+    client's If-None-Match already names it, else the (gzip) bytes.
+    """
+    response_headers = {"ETag": entry.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if conditional and _etag_matches(headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=response_headers)
+    if entry.gzipped is not None and _accepts_gzip(headers.get("accept-encoding")):
+        return Response(entry.gzipped, media_type="application/json",
+                        headers={**response_headers, "Content-Encoding": "gzip"})
+    return Response(entry.body, media_type="application/json", headers=response_headers)
+
+
+_cache = ResponseCache()
+
+
+def get_cache() -> ResponseCache:
+    return _cache
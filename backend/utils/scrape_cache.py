@@ -0,0 +1,155 @@
+"""
+Persistent Scrape Cache
+SQLite-backed store for raw scraped pages and their parsed results,
+shared by every backend worker and kept across restarts.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+CACHE_DB_PATH = os.environ.get("NEETHI_SCRAPE_CACHE", "backend/data/scrape_cache.sqlite3")
+
+# How long a writer waits on a lock held by another worker before giving up
+BUSY_TIMEOUT_MS = 5000
+
+# Entries not revalidated for this long are purged by the indexer's live refresher
+RETENTION_SECONDS = int(os.environ.get("NEETHI_SCRAPE_CACHE_RETENTION", 7 * 86400))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    cache_key     TEXT PRIMARY KEY,
+    url           TEXT NOT NULL,
+    status        INTEGER NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    raw           BLOB,
+    parsed        TEXT,
+    fetched_at    REAL NOT NULL,
+    validated_at  REAL NOT NULL
+)
+"""
+
+# One connection per thread (sqlite3 connections are not thread-safe),
+# re-opened after a fork so children never share a parent's handle.
+_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "pid", None) == os.getpid():
+        return conn
+
+    os.makedirs(os.path.dirname(CACHE_DB_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(CACHE_DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    # WAL lets readers in other processes proceed while one worker writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(_SCHEMA)
+    _local.conn = conn
+    _local.pid = os.getpid()
+    return conn
+
+
+def get_entry(cache_key: str) -> Optional[Dict[str, Any]]:
+    """Return the stored entry for a key (fresh or stale), or None."""
+    try:
+        row = _connect().execute(
+            "SELECT url, status, etag, last_modified, raw, parsed, fetched_at, validated_at "
+            "FROM pages WHERE cache_key = ?",
+            (cache_key,)
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"Scrape cache read failed: {e}")
+        return None
+
+    if row is None:
+        return None
+
+    return {
+        "url": row[0],
+        "status": row[1],
+        "etag": row[2],
+        "last_modified": row[3],
+        "raw": row[4],
+        "parsed": json.loads(row[5]) if row[5] is not None else None,
+        "fetched_at": row[6],
+        "validated_at": row[7]
+    }
+
+
+def is_fresh(entry: Dict[str, Any], max_age_seconds: float) -> bool:
+    """An entry is fresh if it was downloaded or revalidated recently."""
+    return time.time() - entry["validated_at"] < max_age_seconds
+
+
+def store_response(
+    cache_key: str,
+    url: str,
+    raw: bytes,
+    parsed: Any,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    status: int = 200
+):
+    """Store a freshly downloaded page together with its parsed result."""
+    now = time.time()
+    try:
+        _connect().execute(
+            """
+            INSERT INTO pages (cache_key, url, status, etag, last_modified, raw, parsed, fetched_at, validated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(cache_key) DO UPDATE SET
+                url = excluded.url,
+                status = excluded.status,
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                raw = excluded.raw,
+                parsed = excluded.parsed,
+                fetched_at = excluded.fetched_at,
+                validated_at = excluded.validated_at
+            """,
+            (cache_key, url, status, etag, last_modified, raw,
+             json.dumps(parsed) if parsed is not None else None, now, now)
+        )
+    except sqlite3.Error as e:
+        print(f"Scrape cache write failed: {e}")
+
+
+def mark_validated(cache_key: str):
+    """Record that the origin confirmed the stored page is unchanged (HTTP 304)."""
+    try:
+        _connect().execute(
+            "UPDATE pages SET validated_at = ? WHERE cache_key = ?",
+            (time.time(), cache_key)
+        )
+    except sqlite3.Error as e:
+        print(f"Scrape cache write failed: {e}")
+
+
+def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Build If-None-Match / If-Modified-Since headers from a stored entry."""
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def purge_older_than(max_age_seconds: float) -> int:
+    """Delete entries not revalidated within the given window. Returns rows removed."""
+    try:
+        cursor = _connect().execute(
+            "DELETE FROM pages WHERE validated_at < ?",
+            (time.time() - max_age_seconds,)
+        )
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        print(f"Scrape cache purge failed: {e}")
+        return 0
@@ -1,29 +1,165 @@
 import chromadb
 from chromadb.utils import embedding_functions
+import hashlib
 import json
 import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from backend.utils.kb_snapshot import SNAPSHOT_DIR, SNAPSHOT_DTYPE, open_snapshot, snapshot_path, write_snapshot
 
 # Initialize components
 # Ensure directory exists or let Chroma handle it
 CHROMA_DATA_PATH = "backend/data/chroma_db"
-client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
 
-# Use a lightweight model for local embedding
-embedding_func = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
+# Use a lightweight model for local embedding. Loaded at import so a pre-forking
+# server (backend/server.py) loads it once and workers share its pages.
+embedding_func = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=EMBEDDING_MODEL_NAME)
 
-collection = client.get_or_create_collection(
-    name="doj_knowledge",
-    embedding_function=embedding_func
-)
+# Each build of the knowledge base is its own collection, "doj_knowledge_<hash>_<time>";
+# this file names the one to serve. Without it the original "doj_knowledge" is used.
+KB_COLLECTION_PREFIX = "doj_knowledge"
+KB_INDEX_PATH = "backend/data/kb_index.json"
 
-def initialize_db():
-    print("Initializing Knowledge Base...")
+# How often each process checks KB_INDEX_PATH for a new build (seconds)
+KB_INDEX_CHECK_INTERVAL = 2
+
+# Superseded collections are deleted this long after the switch, once no query can still be using them
+KB_RETIRE_AFTER = 120
+
+# Documents re-queried against a new build before it goes live
+KB_VALIDATION_SAMPLE = 10
+
+# The Chroma client holds SQLite connections and threads, which must not cross a
+# fork, so it is opened lazily in each process.
+_chroma = {"pid": None, "client": None, "collection": None, "kb_version": None, "snapshot": None,
+           "snapshot_path": None, "live_collection": None}
+_chroma_lock = threading.Lock()
+_kb_checked = {"at": 0.0, "stamp": None}
+_swap_listeners: List[Callable[[str], None]] = []
+
+def read_kb_index() -> Dict:
+    """The current build record ({} before the first build)."""
     try:
-        with open("backend/data/knowledge_base.json", "r") as f:
-            data = json.load(f)
-    except FileNotFoundError:
-        print("Error: knowledge_base.json not found.")
-        return
+        with open(KB_INDEX_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_kb_index(index: Dict):
+    tmp = f"{KB_INDEX_PATH}.tmp.{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp, KB_INDEX_PATH)
+
+def _kb_index_stamp():
+    try:
+        stat = os.stat(KB_INDEX_PATH)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+def _open_chroma():
+    if _chroma["pid"] == os.getpid():
+        return _chroma
+    with _chroma_lock:
+        if _chroma["pid"] == os.getpid():
+            return _chroma
+        client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
+        index = read_kb_index()
+        kb_version = index.get("collection", KB_COLLECTION_PREFIX)
+        _chroma.update({
+            "pid": os.getpid(),
+            "client": client,
+            "collection": client.get_or_create_collection(
+                name=kb_version,
+                embedding_function=embedding_func
+            ),
+            "kb_version": kb_version,
+            # Mapped embeddings of the build, searched instead of the collection when present
+            "snapshot": open_snapshot(index.get("snapshot")),
+            "snapshot_path": index.get("snapshot"),
+            # Scraped live content (news, announcements, service blurbs) lives in its own
+            # collection so it can expire independently of the curated knowledge base
+            "live_collection": client.get_or_create_collection(
+                name="doj_live",
+                embedding_function=embedding_func
+            )
+        })
+    return _chroma
+
+def get_collection():
+    """This process's handle on the knowledge base build currently being served."""
+    chroma = _open_chroma()
+    now = time.monotonic()
+    if now - _kb_checked["at"] >= KB_INDEX_CHECK_INTERVAL:
+        _kb_checked["at"] = now
+        stamp = _kb_index_stamp()
+        if stamp != _kb_checked["stamp"]:
+            _kb_checked["stamp"] = stamp
+            index = read_kb_index()
+            version = index.get("collection", KB_COLLECTION_PREFIX)
+            if version != chroma["kb_version"] or index.get("snapshot") != chroma["snapshot_path"]:
+                swap_collection(version)
+    return chroma["collection"]
+
+def get_snapshot():
+    """The mapped snapshot of the build being served, if it has one (call after get_collection)."""
+    return _chroma["snapshot"]
+
+def get_kb_version() -> Optional[str]:
+    return _chroma["kb_version"] if _chroma["pid"] == os.getpid() else None
+
+def add_swap_listener(listener: Callable[[str], None]):
+    """Call listener(version) whenever this process switches to another knowledge base build."""
+    _swap_listeners.append(listener)
+
+def swap_collection(version: str):
+    """
+    Serve another knowledge base build from now on. The handle is replaced
+    in one assignment: queries already running finish on the build they
+    started with, and none of them wait for the switch.
+    """
+    chroma = _open_chroma()
+    index = read_kb_index()
+    path = index.get("snapshot") if index.get("collection") == version else None
+    with _chroma_lock:
+        if chroma["kb_version"] == version and chroma["snapshot_path"] == path:
+            return
+        try:
+            collection = chroma["client"].get_collection(name=version, embedding_function=embedding_func)
+        except Exception as e:
+            print(f"Knowledge base build {version} could not be opened: {e}")
+            return
+        chroma.update({"collection": collection, "kb_version": version,
+                       "snapshot": open_snapshot(path), "snapshot_path": path})
+    print(f"Serving knowledge base build {version}" + (f" from {path}" if chroma["snapshot"] else ""))
+    for listener in _swap_listeners:
+        try:
+            listener(version)
+        except Exception as e:
+            print(f"Knowledge base swap listener failed: {e}")
+
+def get_live_collection():
+    return _open_chroma()["live_collection"]
+
+# Live items are dropped this long after they were last seen on the source page
+LIVE_ITEM_TTL_SECONDS = 24 * 3600
+
+# Live chunks farther than this (squared L2 on normalized embeddings) are not relevant enough
+LIVE_MAX_DISTANCE = 1.5
+
+LIVE_CHUNK_CHARS = 500
+LIVE_CHUNK_OVERLAP = 50
+
+KNOWLEDGE_BASE_PATH = "backend/data/knowledge_base.json"
+
+def load_kb_documents(path: str = KNOWLEDGE_BASE_PATH):
+    """The knowledge base as (documents, ids, metadatas), exactly as indexed. Raises FileNotFoundError."""
+    with open(path, "r") as f:
+        data = json.load(f)
 
     documents = []
     ids = []
@@ -34,25 +170,176 @@ def initialize_db():
         doc_text = f"{scheme['name']}: {scheme['description']} Benefits: {', '.join(scheme.get('benefits', []))}"
         documents.append(doc_text)
         ids.append(f"scheme_{scheme['id']}")
-        metadatas.append({"type": "scheme", "url": scheme.get("url", "")})
+        metadatas.append({"type": "scheme", "url": scheme.get("url", ""), "scheme": scheme["id"]})
         
     # Process FAQs
     for i, faq in enumerate(data.get("faqs", [])):
         doc_text = f"Q: {faq['question']} A: {faq['answer']}"
         documents.append(doc_text)
         ids.append(f"faq_{i}") 
-        metadatas.append({"type": "faq", "intent": faq.get("intent", "info")})
-        
-    # Add to collection
-    if documents:
-        collection.upsert(
-            documents=documents,
-            ids=ids,
-            metadatas=metadatas
-        )
-    print(f"Indexed {len(documents)} documents into ChromaDB.")
+        # The curated answer on its own, for answering a close match directly
+        metadatas.append({"type": "faq", "intent": faq.get("intent", "info"), "answer": faq["answer"],
+                          "url": faq.get("url", "")})
+    return documents, ids, metadatas
+
+def kb_content_hash(documents: List[str], ids: List[str], metadatas: List[Dict]) -> str:
+    payload = json.dumps([ids, documents, metadatas], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+def _check_documents(documents: List[str], ids: List[str]):
+    if not documents:
+        raise ValueError("the knowledge base has no documents")
+    if len(set(ids)) != len(ids):
+        raise ValueError("the knowledge base has duplicate document ids")
+    empty = [doc_id for doc_id, text in zip(ids, documents) if not text.strip()]
+    if empty:
+        raise ValueError(f"empty documents: {', '.join(empty)}")
+
+def _check_build(collection, documents: List[str], ids: List[str]):
+    """Every document is stored and a sample of them retrieves itself."""
+    if collection.count() != len(ids):
+        raise ValueError(f"{collection.count()} of {len(ids)} documents indexed")
+    step = max(1, len(ids) // KB_VALIDATION_SAMPLE)
+    sample = list(range(0, len(ids), step))[:KB_VALIDATION_SAMPLE]
+    results = collection.query(query_texts=[documents[i] for i in sample], n_results=min(3, len(ids)))
+    missing = [ids[i] for i, found in zip(sample, results["ids"]) if ids[i] not in found]
+    if missing:
+        raise ValueError(f"documents not retrievable: {', '.join(missing)}")
+
+def _reused_embeddings(current, ids: List[str], documents: List[str]) -> Dict[str, List[float]]:
+    """Embeddings from the build being served for documents whose text is unchanged."""
+    try:
+        existing = current.get(ids=ids, include=["documents", "embeddings"])
+    except Exception:
+        return {}
+    text = dict(zip(ids, documents))
+    return {doc_id: embedding for doc_id, doc, embedding in
+            zip(existing["ids"], existing["documents"], existing["embeddings"]) if text.get(doc_id) == doc}
+
+def _export_snapshot(collection, version: str) -> Optional[str]:
+    """Write the snapshot of a build (from what the collection stores) and check it; None when disabled."""
+    if SNAPSHOT_DTYPE == "off":
+        return None
+    stored = collection.get(include=["documents", "metadatas", "embeddings"])
+    path = write_snapshot(snapshot_path(version), stored["ids"], stored["documents"], stored["metadatas"],
+                          stored["embeddings"])
+    snapshot = open_snapshot(path)
+    if snapshot is None or snapshot.count != len(stored["ids"]):
+        raise ValueError(f"snapshot {path} could not be read back")
+    step = max(1, snapshot.count // KB_VALIDATION_SAMPLE)
+    for i in range(0, snapshot.count, step)[:KB_VALIDATION_SAMPLE]:
+        found = [hit["id"] for hit in snapshot.search(stored["embeddings"][i], 3)]
+        if stored["ids"][i] not in found:
+            raise ValueError(f"document {stored['ids'][i]} not retrievable from the snapshot")
+    return path
+
+def build_kb_index(force: bool = False, path: str = KNOWLEDGE_BASE_PATH) -> Dict:
+    """
+    Build the knowledge base into a new collection, check it and switch
+    every process over to it (indexer process only). Unchanged content is
+    not rebuilt unless forced, and only new or edited documents are embedded.
+    Raises ValueError (with the current build left in place) when the file
+    or the new build is invalid.
+    """
+    documents, ids, metadatas = load_kb_documents(path)
+    _check_documents(documents, ids)
+    content_hash = kb_content_hash(documents, ids, metadatas)
+    index = read_kb_index()
+    chroma = _open_chroma()
+    if not force and index.get("hash") == content_hash:
+        current = index.get("snapshot")
+        if SNAPSHOT_DTYPE != "off" and not (current and current == snapshot_path(index["collection"])
+                                            and os.path.exists(current)):
+            # First start with snapshots enabled (or another dtype): export the build being served
+            path = _export_snapshot(get_collection(), index["collection"])
+            _write_kb_index({**index, "snapshot": path})
+            swap_collection(index["collection"])
+        return {"changed": False, "version": index["collection"], "documents": len(ids)}
+
+    started = time.monotonic()
+    version = f"{KB_COLLECTION_PREFIX}_{content_hash}_{int(time.time())}"
+    client = chroma["client"]
+    collection = client.create_collection(name=version, embedding_function=embedding_func)
+    try:
+        reused = _reused_embeddings(get_collection(), ids, documents)
+        pending = [i for i, doc_id in enumerate(ids) if doc_id not in reused]
+        computed = embedding_func([documents[i] for i in pending]) if pending else []
+        embeddings = [reused.get(doc_id) for doc_id in ids]
+        for i, embedding in zip(pending, computed):
+            embeddings[i] = embedding
+        collection.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+        _check_build(collection, documents, ids)
+        snapshot = _export_snapshot(collection, version)
+    except Exception:
+        client.delete_collection(name=version)
+        raise
+
+    retired = index.get("retired", [])
+    previous = index.get("collection", KB_COLLECTION_PREFIX)
+    if previous != version:
+        retired.append({"collection": previous, "at": time.time()})
+    _write_kb_index({
+        "collection": version,
+        "hash": content_hash,
+        "documents": len(ids),
+        "embedded": len(pending),
+        "snapshot": snapshot,
+        "built_at": time.time(),
+        "retired": retired
+    })
+    swap_collection(version)
+    retire_kb_collections()
+    return {"changed": True, "version": version, "documents": len(ids), "embedded": len(pending),
+            "seconds": round(time.monotonic() - started, 3)}
+
+def retire_kb_collections():
+    """Delete superseded knowledge base builds once KB_RETIRE_AFTER has passed (indexer process only)."""
+    index = read_kb_index()
+    if not index:
+        return
+    now = time.time()
+    keep = [entry for entry in index.get("retired", []) if now - entry["at"] < KB_RETIRE_AFTER]
+    live = {index["collection"]} | {entry["collection"] for entry in keep}
+    client = _open_chroma()["client"]
+    for collection in client.list_collections():
+        name = collection if isinstance(collection, str) else collection.name
+        if name.startswith(KB_COLLECTION_PREFIX) and name not in live:
+            client.delete_collection(name=name)
+            print(f"Deleted retired knowledge base build {name}")
+    if os.path.isdir(SNAPSHOT_DIR):
+        for name in os.listdir(SNAPSHOT_DIR):
+            path = os.path.join(SNAPSHOT_DIR, name)
+            if name.split(".")[0] not in live or (name.split(".")[0] == index["collection"]
+                                                  and path != index.get("snapshot")):
+                os.remove(path)
+    if len(keep) != len(index.get("retired", [])):
+        _write_kb_index({**index, "retired": keep})
+
+def initialize_db():
+    print("Initializing Knowledge Base...")
+    try:
+        result = build_kb_index()
+    except FileNotFoundError:
+        print("Error: knowledge_base.json not found.")
+        return
+    except (KeyError, ValueError) as e:
+        print(f"Error: knowledge base not indexed: {e}")
+        return
+    if result["changed"]:
+        print(f"Indexed {result['documents']} documents into ChromaDB ({result['embedded']} embedded).")
+    else:
+        print(f"Knowledge base unchanged: {result['documents']} documents in {result['version']}.")
 
 def query_knowledge(query_text, n_results=2):
+    """
+    Closest knowledge base documents, best first, each with its 'id' and
+    'distance' (squared L2 on normalized embeddings: 0 identical, 2 unrelated).
+    """
+    # One handle for the whole query: a knowledge base swap meanwhile does not affect it
+    collection = get_collection()
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.search(embedding_func([query_text])[0], n_results)
     results = collection.query(
         query_texts=[query_text],
         n_results=n_results
@@ -60,11 +347,111 @@ def query_knowledge(query_text, n_results=2):
     # Format results for easier consumption
     parsed_results = []
     if results['documents']:
+        distances = results.get('distances') or [[None] * len(results['documents'][0])]
         for i, doc in enumerate(results['documents'][0]):
             meta = results['metadatas'][0][i]
+            parsed_results.append({
+                "id": results['ids'][0][i],
+                "content": doc,
+                "metadata": meta,
+                "distance": distances[0][i]
+            })
+    return parsed_results
+
+def warm_up():
+    """Open this process's Chroma client and run one query so the first real request is fast."""
+    query_knowledge("How to check my case status?", n_results=1)
+
+# ===============================
+# LIVE (SCRAPED) CONTENT
+# ===============================
+
+def chunk_text(text: str, max_chars: int = LIVE_CHUNK_CHARS, overlap: int = LIVE_CHUNK_OVERLAP) -> List[str]:
+    """Split text into overlapping chunks, breaking on whitespace where possible."""
+    if len(text) <= max_chars:
+        return [text]
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_chars, len(text))
+        if end < len(text):
+            space = text.rfind(" ", start + overlap, end)
+            if space > start:
+                end = space
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return [c for c in chunks if c]
+
+def index_live_items(items: List[Dict], fetched_at: Optional[float] = None, ttl_seconds: float = LIVE_ITEM_TTL_SECONDS) -> int:
+    """
+    Chunk, embed and upsert scraped items into the live collection.
+
+    Items need 'source', 'url' and 'text' (and optionally 'kind'). Chunk ids are
+    content hashes, so re-scraping an unchanged item only refreshes its timestamps.
+    Returns the number of chunks upserted.
+    """
+    fetched_at = fetched_at or time.time()
+    documents, ids, metadatas = [], [], []
+    seen = set()
+
+    for item in items:
+        for chunk in chunk_text(item["text"]):
+            chunk_id = "live_" + hashlib.sha1(f"{item['source']}|{chunk}".encode("utf-8")).hexdigest()[:20]
+            if chunk_id in seen:
+                continue
+            seen.add(chunk_id)
+            documents.append(chunk)
+            ids.append(chunk_id)
+            metadatas.append({
+                "type": "live",
+                "kind": item.get("kind", "news"),
+                "source": item["source"],
+                "url": item.get("url", ""),
+                "fetched_at": fetched_at,
+                "expires_at": fetched_at + ttl_seconds
+            })
+
+    if documents:
+        get_live_collection().upsert(documents=documents, ids=ids, metadatas=metadatas)
+    return len(documents)
+
+def expire_live_items(now: Optional[float] = None) -> int:
+    """Delete live chunks past their TTL. Returns the number removed."""
+    where = {"expires_at": {"$lt": now or time.time()}}
+    expired = get_live_collection().get(where=where, include=[])["ids"]
+    if expired:
+        get_live_collection().delete(ids=expired)
+    return len(expired)
+
+def query_live(query_text: str, max_age_seconds: float = LIVE_ITEM_TTL_SECONDS, n_results: int = 3) -> List[Dict]:
+    """Retrieve relevant live chunks fetched within max_age_seconds (and not expired)."""
+    now = time.time()
+    try:
+        results = get_live_collection().query(
+            query_texts=[query_text],
+            n_results=n_results,
+            where={"$and": [
+                {"fetched_at": {"$gte": now - max_age_seconds}},
+                {"expires_at": {"$gt": now}}
+            ]}
+        )
+    except Exception as e:
+        # Empty collection / no rows matching the recency filter
+        print(f"Live index query failed: {e}")
+        return []
+
+    parsed_results = []
+    if results['documents']:
+        for i, doc in enumerate(results['documents'][0]):
+            distance = results['distances'][0][i]
+            if distance > LIVE_MAX_DISTANCE:
+                continue
             parsed_results.append({
                 "content": doc,
-                "metadata": meta
+                "metadata": results['metadatas'][0][i],
+                "distance": distance
             })
     return parsed_results
 
@@ -3,17 +3,26 @@ Web Scraper for DoJ-related websites
 Fetches real-time information from official government sources
 """
 
-import requests
-from bs4 import BeautifulSoup
-from typing import Dict, Optional, List
+from typing import Any, Callable, Dict, Optional, List
 from datetime import datetime, timedelta
-import re
+from urllib.parse import urlsplit
+import threading
 
-# Simple in-memory cache
+from backend.utils import http_client, politeness, scrape_cache
+from backend.utils.extract import clean_text, class_xpath, compile_spec, extract
+
+# Simple in-memory cache (per-process front for the persistent scrape cache)
 _cache: Dict[str, Dict] = {}
 CACHE_DURATION = timedelta(hours=1)
 
+# Fetches in progress in this process, so concurrent callers share one upstream request
+_inflight: Dict[str, threading.Event] = {}
+_inflight_lock = threading.Lock()
+
 # Target websites for scraping
+# connect_timeout / read_timeout (seconds) apply to each attempt against that source;
+# rate_limit / burst / max_concurrency / max_queue_wait are the per-host politeness
+# policy (see backend/utils/politeness.py)
 DOJ_SOURCES = {
     "doj": {
         "url": "https://doj.gov.in",
@@ -21,30 +30,81 @@ DOJ_SOURCES = {
         "selectors": {
             "news": ".news-item, .latest-news li",
             "schemes": ".scheme-item, .services-list li"
-        }
+        },
+        "connect_timeout": 3.05,
+        "read_timeout": 10,
+        "rate_limit": 1.0,
+        "burst": 3,
+        "max_concurrency": 2,
+        "max_queue_wait": 2
     },
     "ecourts": {
         "url": "https://ecourts.gov.in",
         "name": "eCourts",
-        "info_url": "https://ecourts.gov.in/ecourts_home/"
+        "info_url": "https://ecourts.gov.in/ecourts_home/",
+        "connect_timeout": 3.05,
+        "read_timeout": 10,
+        "rate_limit": 1.0,
+        "burst": 3,
+        "max_concurrency": 2,
+        "max_queue_wait": 2
+    },
+    "ecourts_services": {
+        "url": "https://services.ecourts.gov.in/ecourtindia_v6/",
+        "name": "eCourts Services",
+        "connect_timeout": 3.05,
+        "read_timeout": 10,
+        "rate_limit": 0.5,
+        "burst": 2,
+        "max_concurrency": 2,
+        "max_queue_wait": 2
+    },
+    "njdg": {
+        "url": "https://njdg.ecourts.gov.in/njdgnew/index.php",
+        "name": "National Judicial Data Grid",
+        "connect_timeout": 5,
+        "read_timeout": 15,
+        "rate_limit": 0.5,
+        "burst": 2,
+        "max_concurrency": 1,
+        "max_queue_wait": 2
     },
     "telelaw": {
         "url": "https://www.tele-law.in",
-        "name": "Tele-Law Service"
+        "name": "Tele-Law Service",
+        "connect_timeout": 3.05,
+        "read_timeout": 10,
+        "rate_limit": 1.0,
+        "burst": 3,
+        "max_concurrency": 2,
+        "max_queue_wait": 2
     },
     "nalsa": {
         "url": "https://nalsa.gov.in",
-        "name": "NALSA - Legal Aid"
+        "name": "NALSA - Legal Aid",
+        "connect_timeout": 3.05,
+        "read_timeout": 10,
+        "rate_limit": 1.0,
+        "burst": 3,
+        "max_concurrency": 2,
+        "max_queue_wait": 2
     }
 }
 
+# Scrape cache keys of the list-valued pages (the "_items" suffix keeps entries
+# stored as joined text by older versions from being served as lists)
+DOJ_NEWS_KEY = "doj_news_items"
+ECOURTS_INFO_KEY = "ecourts_info_items"
+# The case status page is one fixed URL, so it is cached once rather than per CNR
+CASE_STATUS_KEY = "ecourts_case_status"
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
     "Accept-Language": "en-US,en;q=0.5"
 }
 
-def get_cached(key: str) -> Optional[str]:
+def get_cached(key: str) -> Optional[Any]:
     """Get cached data if not expired."""
     if key in _cache:
         entry = _cache[key]
@@ -52,152 +112,220 @@ def get_cached(key: str) -> Optional[str]:
             return entry["data"]
     return None
 
-def set_cache(key: str, data: str):
+def cache_version(key: str) -> Optional[float]:
+    """When the cached data for key was stored, or None if there is none fresh."""
+    entry = _cache.get(key)
+    if entry and datetime.now() - entry["timestamp"] < CACHE_DURATION:
+        return entry["timestamp"].timestamp()
+    return None
+
+def set_cache(key: str, data: Any):
     """Cache data with timestamp."""
     _cache[key] = {
         "data": data,
         "timestamp": datetime.now()
     }
 
-def clean_text(text: str) -> str:
-    """Clean and normalize scraped text."""
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text)
-    # Remove special characters but keep basic punctuation
-    text = re.sub(r'[^\w\s.,;:!?()-]', '', text)
-    return text.strip()
+def source_timeout(source: str) -> tuple:
+    """(connect, read) timeout for a DOJ_SOURCES entry."""
+    config = DOJ_SOURCES.get(source, {})
+    return (config.get("connect_timeout", 3.05), config.get("read_timeout", 10))
 
-def scrape_doj_news() -> Optional[str]:
-    """Scrape latest news from DoJ website."""
-    cache_key = "doj_news"
+def fetch_and_parse(cache_key: str, url: str, parse: Callable[[bytes], Any], source: str, deadline=None) -> Optional[Any]:
+    """
+    Fetch a page through the persistent scrape cache and return its parsed result.
+
+    Fresh entries are served without touching the network. Stale entries are
+    revalidated with If-None-Match / If-Modified-Since; a 304 reuses the stored
+    parsed result without re-parsing. Concurrent callers for the same key share
+    one upstream request, and requests the host's politeness budget can't admit
+    (or that fail, or run out of deadline) are served the last known result instead.
+    """
     cached = get_cached(cache_key)
     if cached:
         return cached
-    
+
+    entry = scrape_cache.get_entry(cache_key)
+    max_age = CACHE_DURATION.total_seconds()
+    if entry and scrape_cache.is_fresh(entry, max_age):
+        if entry["parsed"]:
+            set_cache(cache_key, entry["parsed"])
+        return entry["parsed"]
+
+    with _inflight_lock:
+        done = _inflight.get(cache_key)
+        leader = done is None
+        if leader:
+            done = _inflight[cache_key] = threading.Event()
+
+    if not leader:
+        # Another request is already refreshing this page; wait for its result
+        connect_timeout, read_timeout = source_timeout(source)
+        max_wait = DOJ_SOURCES.get(source, {}).get("max_queue_wait", 2) + connect_timeout + read_timeout
+        done.wait(deadline.timeout(max_wait) if deadline is not None else max_wait)
+        result = get_cached(cache_key)
+        if result:
+            return result
+        entry = scrape_cache.get_entry(cache_key)
+        return entry["parsed"] if entry else None
+
+    try:
+        return _refresh(cache_key, url, parse, source, entry, deadline)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(cache_key, None)
+        done.set()
+
+def _refresh(cache_key: str, url: str, parse: Callable[[bytes], Any], source: str, entry: Optional[Dict], deadline=None) -> Optional[Any]:
+    if deadline is not None and deadline.expired:
+        return entry["parsed"] if entry else None
+
+    scheduler = politeness.scheduler_for(urlsplit(url).hostname, DOJ_SOURCES.get(source))
     try:
-        response = requests.get(
-            "https://doj.gov.in",
-            headers=HEADERS,
-            timeout=10,
-            verify=True
+        with scheduler.slot(max_wait=deadline.remaining() if deadline is not None else None):
+            response = http_client.get(
+                url,
+                headers={**HEADERS, **scrape_cache.conditional_headers(entry)},
+                timeout=source_timeout(source),
+                deadline=deadline
+            )
+    except politeness.HostBusy as e:
+        print(f"Skipping fetch of {url}: {e}")
+        return entry["parsed"] if entry else None
+    except http_client.FetchError as e:
+        print(f"Error fetching {url}: {e}")
+        # Serve the last known result rather than nothing
+        return entry["parsed"] if entry else None
+
+    if response.status_code == 304 and entry:
+        scrape_cache.mark_validated(cache_key)
+        parsed = entry["parsed"]
+    elif response.status_code == 200:
+        parsed = parse(response.content)
+        scrape_cache.store_response(
+            cache_key,
+            url,
+            response.content,
+            parsed,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified")
         )
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Try to find news/announcements sections
-            news_items = []
-            
-            # Look for common news selectors
-            for selector in ['.news-ticker', '.marquee', '.latest-news', '.announcements']:
-                elements = soup.select(selector)
-                for el in elements:
-                    text = clean_text(el.get_text())
-                    if len(text) > 20:
-                        news_items.append(text)
-            
-            if news_items:
-                result = "Latest from DoJ:\n" + "\n- ".join(news_items[:5])
-                set_cache(cache_key, result)
-                return result
-                
+    else:
+        return entry["parsed"] if entry else None
+
+    if parsed:
+        set_cache(cache_key, parsed)
+    return parsed
+
+# ===============================
+# EXTRACTION SPECS
+# ===============================
+# What each scraper pulls out of its page (see backend/utils/extract.py)
+
+DOJ_NEWS_SPECS = {
+    "news": compile_spec({
+        # One XPath per selector so items keep the selector priority order
+        "xpaths": [class_xpath(["*"], [cls]) for cls in ['news-ticker', 'marquee', 'latest-news', 'announcements']],
+        "min_length": 20,
+        "limit": 5
+    })
+}
+
+ECOURTS_INFO_SPECS = {
+    "services": compile_spec({
+        "xpaths": ["//h2 | //h3 | //h4"],
+        "keywords": ['service', 'case', 'filing', 'court'],
+        "limit": 5
+    })
+}
+
+CASE_DETAILS_SPECS = {
+    # These selectors are hypothetical; real eCourts markup differs
+    "rows": compile_spec({
+        "xpaths": ["//table[@id='caseDetails']//tr"],
+        "output": "cells",
+        "prefilter": rb"caseDetails"
+    })
+}
+
+NJDG_STATS_SPECS = {
+    "stats": compile_spec({
+        "xpaths": [
+            "//div[contains(@class, 'stat') or contains(@class, 'count') or contains(@class, 'number')]"
+            " | //span[contains(@class, 'stat') or contains(@class, 'count') or contains(@class, 'number')]"
+        ],
+        "keywords": ['pending', 'disposed', 'total', 'civil', 'criminal']
+    }),
+    "pending_total": compile_spec({
+        "xpaths": ["//text()[not(ancestor::script) and not(ancestor::style)]"],
+        "pattern": r'\d+[,\s]*\d*\s*(Cr|crore|lakh)',
+        "prefilter": rb'\d+[,\s]*\d*\s*(Cr|crore|lakh)',
+        "limit": 1
+    })
+}
+
+def _parse_doj_news(raw: bytes) -> Optional[List[str]]:
+    return extract(raw, DOJ_NEWS_SPECS)["news"] or None
+
+def _doj_news_items(deadline=None) -> Optional[List[str]]:
+    return fetch_and_parse(DOJ_NEWS_KEY, DOJ_SOURCES["doj"]["url"], _parse_doj_news, "doj", deadline)
+
+def scrape_doj_news(deadline=None) -> Optional[str]:
+    """Scrape latest news from DoJ website."""
+    try:
+        news_items = _doj_news_items(deadline)
+        if news_items:
+            return "Latest from DoJ:\n" + "\n- ".join(news_items)
     except Exception as e:
         print(f"Error scraping DoJ: {e}")
     
     return None
 
-def scrape_ecourts_info() -> Optional[str]:
+def _parse_ecourts_info(raw: bytes) -> Optional[List[str]]:
+    return extract(raw, ECOURTS_INFO_SPECS)["services"] or None
+
+def _ecourts_info_items(deadline=None) -> Optional[List[str]]:
+    return fetch_and_parse(ECOURTS_INFO_KEY, DOJ_SOURCES["ecourts"]["info_url"], _parse_ecourts_info, "ecourts", deadline)
+
+def scrape_ecourts_info(deadline=None) -> Optional[str]:
     """Scrape eCourts service information."""
-    cache_key = "ecourts_info"
-    cached = get_cached(cache_key)
-    if cached:
-        return cached
-    
     try:
-        response = requests.get(
-            "https://ecourts.gov.in/ecourts_home/",
-            headers=HEADERS,
-            timeout=10,
-            verify=True
-        )
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Extract service information
-            info_parts = []
-            
-            # Look for service descriptions
-            for heading in soup.find_all(['h2', 'h3', 'h4']):
-                text = clean_text(heading.get_text())
-                if any(keyword in text.lower() for keyword in ['service', 'case', 'filing', 'court']):
-                    info_parts.append(text)
-            
-            if info_parts:
-                result = "eCourts Services:\n- " + "\n- ".join(info_parts[:5])
-                set_cache(cache_key, result)
-                return result
-                
+        info_parts = _ecourts_info_items(deadline)
+        if info_parts:
+            return "eCourts Services:\n- " + "\n- ".join(info_parts)
     except Exception as e:
         print(f"Error scraping eCourts: {e}")
     
     return None
 
 
-def scrape_case_status(cnr: str) -> Optional[Dict]:
+def _parse_case_details(raw: bytes) -> Optional[Dict]:
+    case_info = {}
+    for cells in extract(raw, CASE_DETAILS_SPECS)["rows"]:
+        if len(cells) >= 2:
+            case_info[cells[0].lower().replace(' ', '_')] = cells[1]
+    return case_info or None
+
+def scrape_case_status(cnr: str, deadline=None) -> Optional[Dict]:
     """
     Attempt to scrape case status from eCourts by CNR number.
     Falls back to mock data if scraping fails.
     
     CNR Format: XXYYNNNNNNNNNNNNNNNN (State + District + 14 digits + Year)
     """
-    cache_key = f"case_{cnr}"
-    cached = get_cached(cache_key)
-    if cached:
-        return cached
-    
     # Validate CNR format (basic validation)
     if not cnr or len(cnr) < 16:
         return None
     
     try:
-        # eCourts case search URL
-        search_url = "https://services.ecourts.gov.in/ecourtindia_v6/"
-        
         # Note: eCourts requires complex session handling and CAPTCHA
         # This is a best-effort attempt that will likely be blocked
-        session = requests.Session()
-        
-        response = session.get(
-            search_url,
-            headers=HEADERS,
-            timeout=10,
-            verify=True
+        case_info = fetch_and_parse(
+            CASE_STATUS_KEY, DOJ_SOURCES["ecourts_services"]["url"], _parse_case_details, "ecourts_services", deadline
         )
         
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Look for case status elements (these selectors are hypothetical)
-            # Real implementation would need to handle eCourts specific structure
-            case_info = {}
-            
-            # Try to find case details
-            case_table = soup.find('table', {'id': 'caseDetails'})
-            if case_table:
-                rows = case_table.find_all('tr')
-                for row in rows:
-                    cells = row.find_all('td')
-                    if len(cells) >= 2:
-                        key = clean_text(cells[0].get_text())
-                        value = clean_text(cells[1].get_text())
-                        case_info[key.lower().replace(' ', '_')] = value
-                
-                if case_info:
-                    case_info['cnr'] = cnr
-                    case_info['source'] = 'ecourts_live'
-                    set_cache(cache_key, case_info)
-                    return case_info
+        if case_info:
+            return {**case_info, 'cnr': cnr, 'source': 'ecourts_live'}
                     
     except Exception as e:
         print(f"Error scraping eCourts case status: {e}")
@@ -206,51 +334,33 @@ def scrape_case_status(cnr: str) -> Optional[Dict]:
     return None
 
 
-def scrape_njdg_stats() -> Optional[Dict]:
+def _parse_njdg_stats(raw: bytes) -> Optional[Dict]:
+    found = extract(raw, NJDG_STATS_SPECS)
+    
+    stats = {
+        "source": "njdg_live",
+        "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M")
+    }
+    
+    for text in found["stats"]:
+        stats[text.split()[0].lower()] = text
+    
+    # The main pending cases number (e.g. "4.5 Cr")
+    if found["pending_total"]:
+        stats['total_pending_display'] = found["pending_total"][0]
+    
+    if len(stats) > 2:  # More than just source and timestamp
+        return stats
+    return None
+
+def scrape_njdg_stats(deadline=None) -> Optional[Dict]:
     """
     Scrape National Judicial Data Grid statistics.
     Returns pending case counts and disposal rates.
     """
-    cache_key = "njdg_stats"
-    cached = get_cached(cache_key)
-    if cached:
-        return cached
-    
     try:
         # NJDG main page
-        response = requests.get(
-            "https://njdg.ecourts.gov.in/njdgnew/index.php",
-            headers=HEADERS,
-            timeout=15,
-            verify=True
-        )
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            stats = {
-                "source": "njdg_live",
-                "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M")
-            }
-            
-            # Try to extract statistics from the page
-            # NJDG typically displays stats in specific containers
-            stat_containers = soup.find_all(['div', 'span'], class_=re.compile(r'stat|count|number'))
-            
-            for container in stat_containers:
-                text = clean_text(container.get_text())
-                # Look for numbers with "Cr" (crore) or large numbers
-                if any(keyword in text.lower() for keyword in ['pending', 'disposed', 'total', 'civil', 'criminal']):
-                    stats[text.split()[0].lower()] = text
-            
-            # Try to find the main pending cases number
-            pending_element = soup.find(text=re.compile(r'\d+[,\s]*\d*\s*(Cr|crore|lakh)', re.I))
-            if pending_element:
-                stats['total_pending_display'] = clean_text(pending_element)
-            
-            if len(stats) > 2:  # More than just source and timestamp
-                set_cache(cache_key, stats)
-                return stats
+        return fetch_and_parse("njdg_stats", DOJ_SOURCES["njdg"]["url"], _parse_njdg_stats, "njdg", deadline)
                 
     except Exception as e:
         print(f"Error scraping NJDG: {e}")
@@ -259,9 +369,10 @@ def scrape_njdg_stats() -> Optional[Dict]:
     return None
 
 
-def scrape_for_query(query: str) -> Dict[str, str]:
+def scrape_for_query(query: str, deadline=None) -> Dict[str, str]:
     """
     Scrape relevant information based on user query.
+    With a deadline, sources that can't be fetched in time are skipped.
     
     Returns dict with 'content' and 'sources' keys.
     """
@@ -275,13 +386,13 @@ def scrape_for_query(query: str) -> Dict[str, str]:
     
     # Determine which sources to scrape based on query
     if any(word in query_lower for word in ['news', 'latest', 'update', 'announcement', 'new']):
-        doj_news = scrape_doj_news()
+        doj_news = scrape_doj_news(deadline)
         if doj_news:
             content_parts.append(doj_news)
             results["sources"].append("https://doj.gov.in")
     
     if any(word in query_lower for word in ['ecourt', 'case', 'status', 'filing', 'e-court']):
-        ecourts_info = scrape_ecourts_info()
+        ecourts_info = scrape_ecourts_info(deadline)
         if ecourts_info:
             content_parts.append(ecourts_info)
             results["sources"].append("https://ecourts.gov.in")
@@ -291,6 +402,25 @@ def scrape_for_query(query: str) -> Dict[str, str]:
     
     return results
 
+def get_live_items() -> List[Dict[str, str]]:
+    """
+    Fetch every live feed as individual items for indexing.
+
+    Each item has 'source' (DOJ_SOURCES key), 'kind', 'url' and 'text'.
+    """
+    feeds = [
+        ("doj", "news", DOJ_SOURCES["doj"]["url"], _doj_news_items),
+        ("ecourts", "service", DOJ_SOURCES["ecourts"]["info_url"], _ecourts_info_items)
+    ]
+    items = []
+    for source, kind, url, fetch in feeds:
+        try:
+            for text in fetch() or []:
+                items.append({"source": source, "kind": kind, "url": url, "text": text})
+        except Exception as e:
+            print(f"Error collecting live items from {source}: {e}")
+    return items
+
 def get_source_urls(query: str) -> List[str]:
     """Get relevant source URLs based on query keywords."""
     query_lower = query.lower()
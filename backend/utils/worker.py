@@ -0,0 +1,59 @@
+"""
+Worker Role Helpers
+How this process was started by the pre-forking server (backend/server.py).
+
+Outside the server (e.g. `python -m backend.main`) the single process is
+worker 0 of 1 and acts as the indexer.
+"""
+
+import os
+from typing import Optional
+
+# Set by backend/server.py for each forked worker
+WORKER_ID_ENV = "NEETHI_WORKER_ID"
+WORKER_COUNT_ENV = "NEETHI_WORKERS"
+INDEXER_ENV = "NEETHI_INDEXER"
+READY_FD_ENV = "NEETHI_READY_FD"
+INDEXER_SOCKET_ENV = "NEETHI_INDEXER_SOCKET"
+
+
+def worker_id() -> int:
+    return int(os.environ.get(WORKER_ID_ENV, "0"))
+
+
+def worker_count() -> int:
+    return max(1, int(os.environ.get(WORKER_COUNT_ENV, "1")))
+
+
+def worker_share(total: int, share: int = None) -> int:
+    """
+    This worker's part of a deployment-wide integer budget (concurrency slots,
+    per-client caps) split across `share` workers (default: all of them).
+
+    The remainder goes to the lowest worker ids, so the parts add up to exactly
+    the total: with more workers than units, the workers beyond it get 0.
+    """
+    share = worker_count() if share is None else max(1, share)
+    return total // share + (1 if worker_id() % share < total % share else 0)
+
+
+def is_indexer() -> bool:
+    """Only the designated indexer writes to the vector store and runs background refreshers."""
+    return os.environ.get(INDEXER_ENV, "1") == "1"
+
+
+def indexer_socket() -> Optional[str]:
+    """Unix socket only the indexer listens on, for requests other workers route to it (see utils/indexer_route.py)."""
+    return os.environ.get(INDEXER_SOCKET_ENV) or None
+
+
+def notify_ready():
+    """Tell the server master this worker finished warm-up and can take traffic."""
+    fd = os.environ.pop(READY_FD_ENV, None)
+    if fd is None:
+        return
+    try:
+        os.write(int(fd), b"1")
+        os.close(int(fd))
+    except OSError as e:
+        print(f"Could not signal readiness: {e}")
@@ -0,0 +1,98 @@
+// Persistent chat channel to the backend (/ws/chat), shared by the chat views.
+// The server keeps the conversation, so only the new message is sent; answers
+// stream in as tokens. Requests fall back to POST /chat when the socket is down,
+// sending the last turns kept here (the session may live in another worker).
+// A request whose answer had started streaming is not resent (it would be
+// generated twice); it fails, and the view keeps the partial text.
+
+const API_BASE = 'http://localhost:8000'
+const WS_URL = API_BASE.replace(/^http/, 'ws') + '/ws/chat'
+
+let socket = null
+let sessionId = null
+let nextId = 1
+const pending = new Map()
+
+// Recent turns, mirrored from the answers received (same cap as the server's session history)
+const HISTORY_MESSAGES = 20
+const history = []
+
+function addTurn(message, answer) {
+    history.push({ role: 'user', content: message }, { role: 'assistant', content: answer })
+    history.splice(0, Math.max(0, history.length - HISTORY_MESSAGES))
+}
+
+function handleFrame(frame) {
+    const request = frame.id ? pending.get(frame.id) : null
+    switch (frame.type) {
+        case 'session':
+            sessionId = frame.session_id
+            break
+        case 'ping':
+            socket?.send(JSON.stringify({ type: 'pong' }))
+            break
+        case 'token':
+            request?.onToken?.(frame.text)
+            break
+        case 'status':
+            request?.onStatus?.(frame)
+            break
+        case 'done':
+            pending.delete(frame.id)
+            request?.resolve(frame)
+            break
+        case 'error':
+        case 'cancelled':
+            pending.delete(frame.id)
+            request?.reject(new Error(frame.detail || frame.type))
+            break
+        default:
+            break
+    }
+}
+
+function connect() {
+    if (socket && socket.readyState <= WebSocket.OPEN) return socket
+    const ws = new WebSocket(sessionId ? `${WS_URL}?session_id=${sessionId}` : WS_URL)
+    ws.onmessage = event => handleFrame(JSON.parse(event.data))
+    ws.onclose = () => {
+        if (socket === ws) socket = null
+        for (const request of pending.values()) request.reject(new Error('Connection closed'))
+        pending.clear()
+    }
+    socket = ws
+    return ws
+}
+
+async function postChat(message) {
+    const response = await fetch(`${API_BASE}/chat`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ message, history, session_id: sessionId })
+    })
+    if (!response.ok) throw new Error('Network error')
+    return response.json()
+}
+
+// Resolves with the /chat response fields; onToken receives generated text as it arrives
+export function sendChat(message, { onToken, onStatus } = {}) {
+    const id = String(nextId++)
+    const frame = JSON.stringify({ type: 'chat', id, message })
+    let streamed = false
+    const onStreamedToken = text => {
+        streamed = true
+        onToken?.(text)
+    }
+    return new Promise((resolve, reject) => {
+        const ws = connect()
+        pending.set(id, { onToken: onStreamedToken, onStatus, resolve, reject })
+        if (ws.readyState === WebSocket.OPEN) ws.send(frame)
+        else ws.addEventListener('open', () => ws.send(frame), { once: true })
+    }).catch(error => {
+        if (error.message === 'Connection closed' && !streamed) return postChat(message)
+        throw error
+    }).then(result => {
+        addTurn(message, result.response)
+        return result
+    })
+}
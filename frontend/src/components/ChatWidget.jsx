@@ -1,6 +1,5 @@
 import { useState, useRef, useEffect } from 'react'
-
-const API_BASE = 'http://localhost:8000'
+import { sendChat } from '../chatSocket'
 
 export default function ChatWidget() {
     const [isOpen, setIsOpen] = useState(false)
@@ -25,21 +24,22 @@ export default function ChatWidget() {
         setInput('')
         setIsLoading(true)
 
+        // The answer streams into one bot message, replaced by the final text when done
+        let streamed = ''
+        const showAnswer = (message, replace) => setMessages(prev =>
+            replace ? [...prev.slice(0, -1), message] : [...prev, message])
+
         try {
-            const response = await fetch(`${API_BASE}/chat`, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ message: userMessage })
+            const data = await sendChat(userMessage, {
+                onToken: text => {
+                    showAnswer({ sender: 'bot', text: streamed + text, streaming: true }, streamed !== '')
+                    streamed += text
+                }
             })
-            if (!response.ok) throw new Error('Network error')
-            const data = await response.json()
-            setMessages(prev => [...prev, {
-                sender: 'bot',
-                text: data.response,
-                sources: data.sources
-            }])
+            showAnswer({ sender: 'bot', text: data.response, sources: data.sources }, streamed !== '')
         } catch {
-            setMessages(prev => [...prev, {
+            // A partly streamed answer stays, as it was when the connection dropped
+            setMessages(prev => [...(streamed ? [...prev.slice(0, -1), { sender: 'bot', text: streamed }] : prev), {
                 sender: 'bot',
                 text: "I'm having trouble connecting. Please try again or visit the full Neethi page."
             }])
@@ -70,7 +70,7 @@ export default function ChatWidget() {
                                 {msg.text}
                             </div>
                         ))}
-                        {isLoading && (
+                        {isLoading && !messages[messages.length - 1].streaming && (
                             <div className="widget-msg bot">
                                 <span className="widget-typing">
                                     <span></span><span></span><span></span>
@@ -1,18 +1,50 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 
 const API_BASE = 'http://localhost:8000'
 
+// Give the lawyer (or the queue place) back, also when the page is closed mid-consultation
+function release(consultation) {
+    if (!consultation) return
+    const options = { keepalive: true }
+    if (consultation.session_id) {
+        fetch(`${API_BASE}/tele-law/sessions/${consultation.session_id}/end`, { ...options, method: 'POST' }).catch(() => {})
+    } else if (consultation.ticket_id) {
+        fetch(`${API_BASE}/tele-law/queue/${consultation.ticket_id}`, { ...options, method: 'DELETE' }).catch(() => {})
+    }
+}
+
 export default function TeleLaw() {
     const [lawyers, setLawyers] = useState(null)
     const [loading, setLoading] = useState(true)
     const [connecting, setConnecting] = useState(null)
+    // The open consultation or queue ticket: { lawyer_id, ticket_id, session_id?, status }
+    const [consultation, setConsultation] = useState(null)
+    const consultationRef = useRef(null)
+    const eventsRef = useRef(null)
 
-    useEffect(() => {
+    const loadLawyers = () =>
         fetch(`${API_BASE}/tele-law/lawyers`)
             .then(r => r.json())
             .then(data => setLawyers(data))
             .catch(() => setLawyers({ error: true }))
             .finally(() => setLoading(false))
+
+    useEffect(() => {
+        loadLawyers()
+    }, [])
+
+    useEffect(() => {
+        consultationRef.current = consultation
+    }, [consultation])
+
+    useEffect(() => {
+        const onPageHide = () => release(consultationRef.current)
+        window.addEventListener('pagehide', onPageHide)
+        return () => {
+            window.removeEventListener('pagehide', onPageHide)
+            eventsRef.current?.close()
+            release(consultationRef.current)
+        }
     }, [])
 
     const connectToLawyer = async (id) => {
@@ -21,6 +53,25 @@ export default function TeleLaw() {
             const res = await fetch(`${API_BASE}/tele-law/connect/${id}`, { method: 'POST' })
             const data = await res.json()
             alert(data.message)
+            if (data.ticket_id && data.status === 'connected') {
+                setConsultation({ lawyer_id: id, ticket_id: data.ticket_id, session_id: data.session_id, status: 'connected' })
+            } else if (data.events_url) {
+                setConsultation({ lawyer_id: id, ticket_id: data.ticket_id, status: 'waiting' })
+                // Queued: the server pushes position updates until a lawyer is free
+                const events = eventsRef.current = new EventSource(`${API_BASE}${data.events_url}`)
+                events.addEventListener('status', (e) => {
+                    const status = JSON.parse(e.data)
+                    if (status.status === 'connected') {
+                        alert(`Connecting you with ${status.lawyer_name}...`)
+                        setConsultation({ lawyer_id: id, ticket_id: status.ticket_id, session_id: status.session_id, status: 'connected' })
+                    } else if (status.status !== 'waiting') {
+                        setConsultation(null)
+                    }
+                    if (status.status !== 'waiting') events.close()
+                })
+                events.onerror = () => events.close()
+            }
+            loadLawyers()
         } catch {
             alert('Connection failed. Please try again.')
         } finally {
@@ -28,6 +79,13 @@ export default function TeleLaw() {
         }
     }
 
+    const finishConsultation = () => {
+        eventsRef.current?.close()
+        release(consultation)
+        setConsultation(null)
+        setTimeout(loadLawyers, 300)
+    }
+
     return (
         <div className="page-telelaw">
             <section className="page-hero" style={{ '--hero-color': '#065f46' }}>
@@ -106,14 +164,20 @@ export default function TeleLaw() {
                                         <span className={`avail-badge ${lawyer.available ? 'online' : 'offline'}`}>
                                             {lawyer.available ? '● Available' : `Next: ${lawyer.next_available}`}
                                         </span>
-                                        <button
-                                            className={`connect-button ${lawyer.available ? '' : 'queue'}`}
-                                            onClick={() => connectToLawyer(lawyer.id)}
-                                            disabled={connecting === lawyer.id}
-                                        >
-                                            {connecting === lawyer.id ? 'Connecting...' :
-                                                lawyer.available ? '📞 Connect Now' : '📋 Join Queue'}
-                                        </button>
+                                        {consultation?.lawyer_id === lawyer.id ? (
+                                            <button className="connect-button queue" onClick={finishConsultation}>
+                                                {consultation.status === 'connected' ? '⏹ End Consultation' : '✖ Leave Queue'}
+                                            </button>
+                                        ) : (
+                                            <button
+                                                className={`connect-button ${lawyer.available ? '' : 'queue'}`}
+                                                onClick={() => connectToLawyer(lawyer.id)}
+                                                disabled={connecting === lawyer.id || consultation !== null}
+                                            >
+                                                {connecting === lawyer.id ? 'Connecting...' :
+                                                    lawyer.available ? '📞 Connect Now' : '📋 Join Queue'}
+                                            </button>
+                                        )}
                                     </div>
                                 </div>
                             ))}
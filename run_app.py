@@ -1,35 +1,129 @@
-import subprocess
-import time
+"""
+Neethi launcher.
+
+    python run_app.py                  # development: backend + Vite dev server
+    python run_app.py --production     # supervised backend (see Supervisor)
+
+Every process is started in its own process group on POSIX, so stopping it
+also stops whatever it spawned (npm's Vite child, the server's workers).
+"""
+
+import argparse
+import json
 import os
 import signal
+import socket
+import subprocess
 import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+from backend.server import GRACEFUL_TIMEOUT, READY_TIMEOUT, RESTART_BACKOFF_MAX, RESTART_BACKOFF_MIN
+
+POSIX = os.name == "posix"
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+FRONTEND_DIR = os.path.join(PROJECT_ROOT, "frontend")
+
+# Startup reports, one JSON line per (re)start of the backend
+TIMINGS_PATH = "backend/data/startup_timings.jsonl"
+
+# Seconds a stopping process group gets before SIGKILL (the server drains its workers first)
+STOP_TIMEOUT = GRACEFUL_TIMEOUT + 5
+
+# Liveness: the backend is restarted when /ready stops answering this many times in a row
+LIVENESS_INTERVAL = 10
+LIVENESS_TIMEOUT = 5
+LIVENESS_FAILURES = 3
+
+
+# ===============================
+# PROCESSES
+# ===============================
+
+def start(cmd: List[str], cwd: str = PROJECT_ROOT) -> subprocess.Popen:
+    """Start a command in a new process group."""
+    if POSIX:
+        return subprocess.Popen(cmd, cwd=cwd, start_new_session=True)
+    # npm is a .cmd script on Windows and needs the shell
+    return subprocess.Popen(cmd, cwd=cwd, shell=cmd[0] == "npm",
+                            creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+
+
+def _group_alive(pgid: int) -> bool:
+    try:
+        os.killpg(pgid, 0)
+        return True
+    except (ProcessLookupError, PermissionError):
+        return False
+
+
+def stop(process: Optional[subprocess.Popen], timeout: float = STOP_TIMEOUT):
+    """SIGTERM a process group, SIGKILL whatever is left of it after the timeout."""
+    if process is None:
+        return
+    if not POSIX:
+        if process.poll() is None:
+            subprocess.call(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        process.wait()
+        return
+    pgid = process.pid
+    try:
+        os.killpg(pgid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        process.poll()
+        if process.returncode is not None and not _group_alive(pgid):
+            return
+        time.sleep(0.1)
+    print(f"Process group {pgid} did not stop in {timeout:.0f}s; killing")
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+
+def sd_notify(state: str):
+    """Report state to systemd (Type=notify units); a no-op elsewhere."""
+    address = os.environ.get("NOTIFY_SOCKET")
+    if not address or not hasattr(socket, "AF_UNIX"):
+        return
+    if address.startswith("@"):
+        address = "\0" + address[1:]
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.connect(address)
+            sock.sendall(state.encode())
+    except OSError as e:
+        print(f"Could not notify systemd: {e}")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ===============================
+# DEVELOPMENT
+# ===============================
 
 def run_commands():
-    # Define commands
     backend_cmd = [sys.executable, "-m", "backend.main"]
     frontend_cmd = ["npm", "run", "dev"]
-    
-    # Paths
-    project_root = os.getcwd()
-    frontend_dir = os.path.join(project_root, "frontend")
 
     print("🚀 Starting DoJ Virtual Assistant...")
-    
-    # Start Backend
     print("🔹 Launching Backend (FastAPI)...")
-    backend_process = subprocess.Popen(
-        backend_cmd, 
-        cwd=project_root,
-        shell=False # Better for signal handling
-    )
-
-    # Start Frontend
+    backend_process = start(backend_cmd)
     print("🔹 Launching Frontend (Vite)...")
-    frontend_process = subprocess.Popen(
-        frontend_cmd, 
-        cwd=frontend_dir,
-        shell=True # Needed for npm on Windows
-    )
+    frontend_process = start(frontend_cmd, cwd=FRONTEND_DIR)
 
     print("\n✅ Systems are booting up!")
     print("   Backend: http://localhost:8000")
@@ -39,22 +133,207 @@ def run_commands():
     try:
         while True:
             time.sleep(1)
-            # Check if processes are still alive
             if backend_process.poll() is not None:
                 print("❌ Backend stopped unexpectedly.")
                 break
-            # Note: frontend_process with shell=True is harder to poll accurately on Windows without extra logic,
-            # but usually Ctrl+C propagates well enough for dev tools.
-            
+            if frontend_process.poll() is not None:
+                print("❌ Frontend stopped unexpectedly.")
+                break
     except KeyboardInterrupt:
-        print("\n🛑 Stopping servers...")
-        backend_process.terminate()
-        # Frontend (npm) might need shell specific kill or just reliance on parent signal
-        # On Windows, shell=True spawns a distinct process tree.
-        subprocess.call(["taskkill", "/F", "/T", "/PID", str(frontend_process.pid)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        
-        backend_process.wait()
-        print("Servers stopped.")
+        pass
+
+    print("\n🛑 Stopping servers...")
+    stop(frontend_process)
+    stop(backend_process)
+    print("Servers stopped.")
+
+
+# ===============================
+# PRODUCTION SUPERVISOR
+# ===============================
+
+class Supervisor:
+    """
+    Runs the backend (the pre-forking backend.server on POSIX, which itself
+    restarts crashed workers) and keeps it up:
+      - it is advertised (log line, --ready-file, systemd READY=1) only once
+        GET /ready passes: embedding model loaded, knowledge base indexed,
+        LLM warm-up done (and an LLM up, with --require-llm);
+      - a backend that exits, fails to become ready within READY_TIMEOUT or
+        stops answering is restarted, with the same doubling back-off as
+        the server's workers (one that is up and only waiting for an LLM,
+        with --require-llm, is left running);
+      - every start is timed by phase and appended to TIMINGS_PATH.
+    SIGTERM / SIGINT stop it cleanly; SIGHUP is passed to the server for a
+    rolling restart of its workers.
+    """
+
+    def __init__(self, host: str, port: int, workers: int, require_llm: bool = False,
+                 ready_file: Optional[str] = None, timings_path: str = TIMINGS_PATH):
+        self.port = port
+        self.require_llm = require_llm
+        self.ready_file = ready_file
+        self.timings_path = timings_path
+        self.ready_url = f"http://127.0.0.1:{port}/ready"
+        if POSIX:
+            self.cmd = [sys.executable, "-m", "backend.server", "--host", host, "--port", str(port),
+                        "--workers", str(workers)]
+        else:
+            print("⚠️ No fork on this platform: running a single backend.main process on port 8000")
+            self.cmd = [sys.executable, "-m", "backend.main"]
+            self.ready_url = "http://127.0.0.1:8000/ready"
+        self.process: Optional[subprocess.Popen] = None
+        self.stopping = False
+        self.backoff = RESTART_BACKOFF_MIN
+        self.starts = 0
+
+    def probe(self, timeout: float) -> Tuple[Optional[int], Dict]:
+        """GET /ready: (status, body), or (None, {}) when the server does not answer."""
+        try:
+            with urllib.request.urlopen(self.ready_url, timeout=timeout) as response:
+                return response.status, json.loads(response.read() or b"{}")
+        except urllib.error.HTTPError as e:
+            try:
+                return e.code, json.loads(e.read() or b"{}")
+            except ValueError:
+                return e.code, {}
+        except (OSError, ValueError):
+            return None, {}
+
+    def _sleep(self, seconds: float):
+        deadline = time.monotonic() + seconds
+        while not self.stopping and time.monotonic() < deadline:
+            time.sleep(min(0.2, deadline - time.monotonic()))
+
+    def _advertise(self, ready: bool):
+        if self.ready_file:
+            if ready:
+                with open(self.ready_file, "w") as f:
+                    f.write(str(self.process.pid))
+            elif os.path.exists(self.ready_file):
+                os.remove(self.ready_file)
+        sd_notify("READY=1\nSTATUS=Serving" if ready else "STATUS=Restarting backend")
+
+    def launch(self) -> bool:
+        """Start the backend and wait until it is ready; False if it exits or times out first."""
+        self.starts += 1
+        started = time.monotonic()
+        self.process = start(self.cmd)
+        print(f"🔹 Backend started (pid {self.process.pid}), waiting for readiness...")
+        first_response = None
+        waiting_for_llm = False
+        while not self.stopping:
+            elapsed = time.monotonic() - started
+            if self.process.poll() is not None:
+                print(f"❌ Backend exited with status {self.process.returncode} during startup")
+                return False
+            if elapsed > READY_TIMEOUT and not waiting_for_llm:
+                print(f"❌ Backend not ready within {READY_TIMEOUT}s")
+                return False
+            status, body = self.probe(timeout=2)
+            if status is not None and first_response is None:
+                first_response = elapsed
+            if status == 200 and (body.get("checks", {}).get("llm") or not self.require_llm):
+                self.report(elapsed, first_response, body)
+                return True
+            if status == 200 and not waiting_for_llm:
+                # Up and only missing the LLM: a restart would not bring one up, so keep waiting
+                waiting_for_llm = True
+                print("⏳ Backend up; waiting for an LLM backend (--require-llm)")
+                sd_notify("STATUS=Waiting for an LLM backend")
+            time.sleep(0.5)
+        return False
+
+    def report(self, ready_seconds: float, first_response: Optional[float], body: Dict):
+        record = {
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "start": self.starts,
+            "first_response_seconds": round(first_response, 3) if first_response is not None else None,
+            "ready_seconds": round(ready_seconds, 3),
+            "phases": body.get("phases", {}),
+            "checks": body.get("checks", {}),
+        }
+        print(f"✅ Backend ready in {ready_seconds:.1f}s (first response {record['first_response_seconds']}s)")
+        for phase, seconds in record["phases"].items():
+            print(f"   {phase:<20} {seconds:.2f}s")
+        if not record["checks"].get("llm"):
+            print("   ⚠️ No LLM available - serving fallback responses")
+        try:
+            os.makedirs(os.path.dirname(self.timings_path) or ".", exist_ok=True)
+            with open(self.timings_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"Could not record startup timings: {e}")
+
+    def watch(self):
+        """Return when the backend exits or stops answering (or the supervisor is stopping)."""
+        failures = 0
+        next_probe = time.monotonic() + LIVENESS_INTERVAL
+        while not self.stopping:
+            if self.process.poll() is not None:
+                print(f"❌ Backend exited with status {self.process.returncode}")
+                return
+            if time.monotonic() >= next_probe:
+                status, _ = self.probe(timeout=LIVENESS_TIMEOUT)
+                failures = 0 if status is not None else failures + 1
+                if failures >= LIVENESS_FAILURES:
+                    print(f"❌ Backend has not answered for {failures} checks")
+                    return
+                next_probe = time.monotonic() + LIVENESS_INTERVAL
+            time.sleep(0.5)
+
+    def _forward_hup(self, *_):
+        if self.process is not None and self.process.poll() is None:
+            self.process.send_signal(signal.SIGHUP)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, "stopping", True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, "stopping", True))
+        if POSIX:
+            signal.signal(signal.SIGHUP, self._forward_hup)
+
+        print("🚀 Starting Neethi backend (supervised)...")
+        while not self.stopping:
+            started = time.monotonic()
+            if self.launch():
+                print(f"🚀 Serving on http://localhost:{self.port}")
+                self._advertise(True)
+                self.watch()
+                self._advertise(False)
+            stop(self.process)
+            if self.stopping:
+                break
+            # Back off while the backend keeps failing soon after starting
+            if time.monotonic() - started >= RESTART_BACKOFF_MAX:
+                self.backoff = RESTART_BACKOFF_MIN
+            print(f"⚠️ Restarting backend in {self.backoff:.0f}s")
+            self._sleep(self.backoff)
+            self.backoff = min(self.backoff * 2, RESTART_BACKOFF_MAX)
+
+        print("\n🛑 Stopping backend...")
+        stop(self.process)
+        if self.ready_file and os.path.exists(self.ready_file):
+            os.remove(self.ready_file)
+        print("Backend stopped.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start Neethi (development) or supervise the backend (production)")
+    parser.add_argument("--production", action="store_true", help="supervised, readiness-gated backend only")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("NEETHI_WORKERS", "2")))
+    parser.add_argument("--require-llm", action="store_true", help="not ready until an LLM backend is up")
+    parser.add_argument("--ready-file", help="created while the backend is ready (for load balancer checks)")
+    parser.add_argument("--timings", default=TIMINGS_PATH, help="startup timings log (JSON lines)")
+    args = parser.parse_args()
+
+    if args.production:
+        Supervisor(args.host, args.port, max(1, args.workers), args.require_llm, args.ready_file, args.timings).run()
+    else:
+        run_commands()
+
 
 if __name__ == "__main__":
-    run_commands()
+    main()